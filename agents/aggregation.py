@@ -0,0 +1,372 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agents.data_store import CsvTail, read_appended
+
+# Derived dimension: calendar month of the date column
+MONTH = "month"
+
+
+_NAT = np.datetime64("NaT", "ns")
+_NAT_INT = _NAT.view(np.int64)
+
+
+@dataclass
+class GroupStats:
+    """Per-group sum / non-null count / row count of the value column, plus date range."""
+    keys: pd.Index
+    sums: np.ndarray
+    counts: np.ndarray
+    sizes: np.ndarray
+    date_min: Optional[np.ndarray] = None
+    date_max: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def sum_series(self) -> pd.Series:
+        return pd.Series(self.sums, index=self.keys)
+
+    def mean_series(self) -> pd.Series:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(self.sums / self.counts, index=self.keys)
+
+    def top(self, n: Optional[int] = None) -> pd.Series:
+        """Groups by descending sum (ties keep key order)."""
+        order = np.argsort(-self.sums, kind="stable")
+        if n is not None:
+            order = order[:n]
+        return pd.Series(self.sums[order], index=self.keys[order])
+
+    def merge(self, other: "GroupStats") -> "GroupStats":
+        """Combine two partial aggregates over (possibly overlapping) key sets."""
+        codes, keys = pd.factorize(self.keys.append(other.keys), sort=True)
+        n = len(keys)
+        sums = np.bincount(codes, np.concatenate([self.sums, other.sums]), minlength=n)
+        counts = np.bincount(codes, np.concatenate([self.counts, other.counts]), minlength=n)
+        sizes = np.bincount(codes, np.concatenate([self.sizes, other.sizes]), minlength=n)
+        date_min = date_max = None
+        if self.date_min is not None and other.date_min is not None:
+            date_min, date_max = group_date_range(
+                codes, n,
+                np.concatenate([self.date_min, other.date_min]),
+                np.concatenate([self.date_max, other.date_max]),
+            )
+        return GroupStats(
+            pd.Index(keys), sums, counts.astype(np.int64), sizes.astype(np.int64), date_min, date_max
+        )
+
+    def to_dict(self) -> Dict:
+        period = isinstance(self.keys, pd.PeriodIndex)
+        return {
+            "period": period,
+            "keys": [str(k) for k in self.keys] if period else self.keys.tolist(),
+            "sums": self.sums.tolist(),
+            "counts": self.counts.tolist(),
+            "sizes": self.sizes.tolist(),
+            "date_min": None if self.date_min is None else self.date_min.astype(np.int64).tolist(),
+            "date_max": None if self.date_max is None else self.date_max.astype(np.int64).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "GroupStats":
+        keys = pd.PeriodIndex(data["keys"], freq="M") if data["period"] else pd.Index(data["keys"])
+        dates = [
+            None if data[k] is None else np.array(data[k], dtype=np.int64).astype("datetime64[ns]")
+            for k in ("date_min", "date_max")
+        ]
+        return cls(
+            keys,
+            np.array(data["sums"], dtype=np.float64),
+            np.array(data["counts"], dtype=np.int64),
+            np.array(data["sizes"], dtype=np.int64),
+            *dates,
+        )
+
+
+@dataclass
+class AggregationResult:
+    rows: int = 0
+    has_value: bool = False
+    value_sum: float = 0.0
+    value_count: int = 0
+    date_min: Optional[pd.Timestamp] = None
+    date_max: Optional[pd.Timestamp] = None
+    groups: Dict[str, GroupStats] = field(default_factory=dict)
+
+    @property
+    def value_mean(self) -> float:
+        return self.value_sum / self.value_count if self.value_count else float("nan")
+
+    def merge(self, other: "AggregationResult") -> "AggregationResult":
+        """Fold another partial result (e.g. newly appended rows) into this one."""
+        groups = dict(self.groups)
+        for name, stats in other.groups.items():
+            groups[name] = groups[name].merge(stats) if name in groups else stats
+        dates_min = [d for d in (self.date_min, other.date_min) if d is not None]
+        dates_max = [d for d in (self.date_max, other.date_max) if d is not None]
+        return AggregationResult(
+            rows=self.rows + other.rows,
+            has_value=self.has_value or other.has_value,
+            value_sum=self.value_sum + other.value_sum,
+            value_count=self.value_count + other.value_count,
+            date_min=min(dates_min) if dates_min else None,
+            date_max=max(dates_max) if dates_max else None,
+            groups=groups,
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "rows": self.rows,
+            "has_value": self.has_value,
+            "value_sum": self.value_sum,
+            "value_count": self.value_count,
+            "date_min": None if self.date_min is None else self.date_min.isoformat(),
+            "date_max": None if self.date_max is None else self.date_max.isoformat(),
+            "groups": {name: stats.to_dict() for name, stats in self.groups.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AggregationResult":
+        return cls(
+            rows=data["rows"],
+            has_value=data["has_value"],
+            value_sum=data["value_sum"],
+            value_count=data["value_count"],
+            date_min=None if data["date_min"] is None else pd.Timestamp(data["date_min"]),
+            date_max=None if data["date_max"] is None else pd.Timestamp(data["date_max"]),
+            groups={name: GroupStats.from_dict(g) for name, g in data["groups"].items()},
+        )
+
+
+def factorize(values: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """Integer codes (-1 for missing) and sorted group keys for a column."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    codes, keys = pd.factorize(values, sort=True)
+    return codes, pd.Index(keys)
+
+
+def factorize_month(dates: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """Codes and PeriodIndex keys for the calendar month of each date."""
+    dates = pd.to_datetime(dates, errors="coerce")
+    valid = dates.notna().to_numpy()
+    ordinals = np.full(len(dates), -1, dtype=np.int64)
+    ordinals[valid] = dates.to_numpy()[valid].astype("datetime64[M]").astype(np.int64)
+    codes, uniques = pd.factorize(np.where(valid, ordinals, np.iinfo(np.int64).min), sort=True)
+    codes = np.where(valid, codes, -1)
+    if (~valid).any():
+        # The sentinel sorts first – drop it and shift codes down
+        uniques, codes = uniques[1:], np.where(valid, codes - 1, -1)
+    return codes, pd.PeriodIndex.from_ordinals(uniques, freq="M")
+
+
+def group_date_range(
+    codes: np.ndarray,
+    n: int,
+    lows: np.ndarray,
+    highs: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Earliest of `lows` and latest of `highs` (default `lows`) per group code,
+    NaT for groups without dates: one stable sort of the codes (a radix sort
+    when they fit 16 bits), then reduceat over each group's run.
+    """
+    lows = np.asarray(lows, dtype="datetime64[ns]")
+    highs = lows if highs is None else np.asarray(highs, dtype="datetime64[ns]")
+    date_min, date_max = np.full(n, _NAT), np.full(n, _NAT)
+    keep = (codes >= 0) & ~(np.isnat(lows) & np.isnat(highs))
+    k = codes[keep]
+    if not len(k):
+        return date_min, date_max
+    order = np.argsort(k.astype(np.uint16) if n <= 1 << 16 else k, kind="stable")
+    k = k[order]
+    starts = np.flatnonzero(np.concatenate([[True], k[1:] != k[:-1]]))
+    # As int64 NaT is the smallest value: it never wins a max, and is lifted to the top for the min
+    lo = lows[keep][order].view(np.int64)
+    lo = np.where(lo == _NAT_INT, np.iinfo(np.int64).max, lo)
+    firsts = np.minimum.reduceat(lo, starts)
+    date_min[k[starts]] = np.where(firsts == np.iinfo(np.int64).max, _NAT_INT, firsts).view("datetime64[ns]")
+    date_max[k[starts]] = np.maximum.reduceat(highs[keep][order].view(np.int64), starts).view("datetime64[ns]")
+    return date_min, date_max
+
+
+def group_stats(
+    codes: np.ndarray,
+    keys: pd.Index,
+    values: np.ndarray,
+    valid: np.ndarray,
+    dates: Optional[np.ndarray] = None,
+) -> GroupStats:
+    """
+    Sums / counts / sizes for every key in one bincount pass per statistic,
+    plus each key's date range when `dates` are given.
+    """
+    has_key = codes >= 0
+    k = codes[has_key]
+    n = len(keys)
+    sums = np.bincount(k, weights=np.where(valid, values, 0.0)[has_key], minlength=n)
+    counts = np.bincount(k, weights=valid[has_key], minlength=n).astype(np.int64)
+    sizes = np.bincount(k, minlength=n)
+    observed = sizes > 0
+    date_min = date_max = None
+    if dates is not None:
+        date_min, date_max = group_date_range(codes, n, dates)
+        date_min, date_max = date_min[observed], date_max[observed]
+    return GroupStats(
+        keys[observed], sums[observed], counts[observed], sizes[observed], date_min, date_max
+    )
+
+
+class AggregationPlan:
+    """
+    Declares every grouping needed by a run so the table is scanned once:
+    each key column is factorized once and all sums / means / counts come
+    from vectorized bincounts over those codes.
+    """
+
+    def __init__(self, value: str = "revenue", date: Optional[str] = "date"):
+        self.value = value
+        self.date = date
+        self.dimensions: Dict[str, str] = {}
+
+    def group_by(self, name: str, column: Optional[str] = None) -> "AggregationPlan":
+        """Add a grouping `name` over `column` (defaults to `name`; MONTH derives from the date)."""
+        self.dimensions[name] = column or name
+        return self
+
+    def execute(self, frame: pd.DataFrame, group_dates: bool = False) -> AggregationResult:
+        """
+        One pass over `frame`. Per-group date ranges are only needed to persist
+        incremental state, so they are computed only with `group_dates=True`.
+        """
+        result = AggregationResult(rows=len(frame), has_value=self.value in frame.columns)
+        if result.has_value:
+            values = frame[self.value].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            values = np.zeros(len(frame))
+        valid = ~np.isnan(values)
+        result.value_sum = float(values[valid].sum())
+        result.value_count = int(valid.sum())
+
+        dates = None
+        if self.date and self.date in frame.columns:
+            parsed = pd.to_datetime(frame[self.date], errors="coerce")
+            dates = parsed.to_numpy(dtype="datetime64[ns]")
+            if parsed.notna().any():
+                result.date_min, result.date_max = parsed.min(), parsed.max()
+
+        for name, column in self.dimensions.items():
+            if column == MONTH:
+                if not (self.date and self.date in frame.columns):
+                    continue
+                codes, keys = factorize_month(frame[self.date])
+            elif column in frame.columns:
+                codes, keys = factorize(frame[column])
+            else:
+                continue
+            result.groups[name] = group_stats(codes, keys, values, valid, dates if group_dates else None)
+        return result
+
+    def execute_chunks(self, chunks: Iterable[pd.DataFrame]) -> AggregationResult:
+        """
+        Fold a stream of chunks into one result. Only the per-group partials
+        are kept between chunks, so memory depends on the chunk size and the
+        number of distinct keys, not on the number of rows.
+        """
+        result = None
+        for chunk in chunks:
+            partial = self.execute(chunk)
+            result = partial if result is None else result.merge(partial)
+        return result if result is not None else AggregationResult()
+
+
+class IncrementalAggregator:
+    """
+    Running aggregates persisted to a JSON file with a per-table date
+    high-water mark. Each `fold` aggregates only the rows dated after the
+    mark and merges them into the stored result. `fold_csv` reads a CSV
+    source from the byte offset where the last fold stopped, so a daily
+    refresh also reads only the newly appended rows.
+
+    The stored state is discarded (and rebuilt from the full table) when the
+    scope or grouping plan changes, or when the number of rows at or before
+    the mark no longer matches – i.e. history was edited rather than appended.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, scope: str = ""):
+        self.path = path
+        self.scope = scope
+        self.tables: Dict[str, Dict] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == self.VERSION and state.get("scope") == scope:
+                self.tables = state["tables"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def fold(self, name: str, plan: AggregationPlan, frame: pd.DataFrame) -> AggregationResult:
+        signature = {"value": plan.value, "date": plan.date, "dimensions": plan.dimensions}
+        entry = self.tables.get(name)
+        result = None
+        if entry and entry["plan"] == signature and plan.date in frame.columns:
+            stored = AggregationResult.from_dict(entry["result"])
+            if stored.date_max is None:
+                new_rows = frame
+            else:
+                dates = pd.to_datetime(frame[plan.date], errors="coerce")
+                new_rows = frame[(dates > stored.date_max).to_numpy()]
+            if len(frame) - len(new_rows) == stored.rows:
+                result = stored.merge(plan.execute(new_rows, group_dates=True))
+                print(f"♻️ {name}: folded {len(new_rows)} new rows into stored aggregates")
+        if result is None:
+            result = plan.execute(frame, group_dates=True)
+        self.tables[name] = {"plan": signature, "result": result.to_dict()}
+        return result
+
+    def fold_csv(
+        self,
+        name: str,
+        plan: AggregationPlan,
+        path: str,
+        columns: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> AggregationResult:
+        """
+        Like `fold`, straight from an append-only CSV: only the bytes after
+        the stored offset are read and aggregated. The table is read whole
+        again when the plan changed or the file was edited rather than
+        appended to.
+        """
+        signature = {"value": plan.value, "date": plan.date, "dimensions": plan.dimensions}
+        entry = self.tables.get(name)
+        if entry and entry["plan"] == signature and "tail" in entry:
+            new_rows, tail = read_appended(path, CsvTail.from_dict(entry["tail"]), columns, where)
+            if new_rows is not None:
+                result = AggregationResult.from_dict(entry["result"]).merge(
+                    plan.execute(new_rows, group_dates=True)
+                )
+                print(f"♻️ {name}: folded {len(new_rows)} appended rows into stored aggregates")
+                self.tables[name] = {"plan": signature, "result": result.to_dict(), "tail": tail.to_dict()}
+                return result
+        frame, tail = read_appended(path, None, columns, where)
+        result = plan.execute(frame, group_dates=True)
+        self.tables[name] = {"plan": signature, "result": result.to_dict(), "tail": tail.to_dict()}
+        return result
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "scope": self.scope, "tables": self.tables}, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,44 @@
+import copy
+import os
+import time
+import uuid
+from typing import Optional
+
+OUTPUT_ROOT = "outputs"
+
+
+def new_run_id() -> str:
+    """Sortable, collision-free id, e.g. 20250801-142233-9f1c2a7b."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class RunArtifacts:
+    """
+    Output namespace for a single run: outputs/runs/<run_id>/.
+    Concurrent runs (Streamlit sessions, batch jobs) each write into their own
+    directory, so they never overwrite each other's charts or reports.
+    """
+
+    def __init__(self, root: str = OUTPUT_ROOT, run_id: Optional[str] = None):
+        self.run_id = run_id or new_run_id()
+        self.directory = os.path.join(root, "runs", self.run_id)
+
+    def path(self, name: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, name)
+
+    def write_text(self, name: str, text: str) -> str:
+        """Write `text` atomically to `name` inside the run directory and return its path."""
+        path = self.path(name)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
+
+    def child(self, name: str) -> "RunArtifacts":
+        """Sub-namespace of this run, e.g. one directory per restaurant in a batch."""
+        sub = copy.copy(self)
+        sub.run_id = f"{self.run_id}/{name}"
+        sub.directory = os.path.join(self.directory, name)
+        return sub
@@ -0,0 +1,272 @@
+import importlib.util
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from agents.aggregation import MONTH, AggregationPlan, AggregationResult, GroupStats
+from agents.data_store import (
+    predicate_values, apply_schema, ensure_columnar, resolve_table, source_digest, table_columns,
+)
+from agents.join import DEFAULT_MAX_JOIN_ROWS, JoinTooLargeError, join_menu_yelp
+from agents.query_planner import YELP_METRICS, QueryPlan, sql_literal
+
+Source = Union[str, pd.DataFrame]
+
+
+def source_columns(source: Source) -> List[str]:
+    return list(source.columns) if isinstance(source, pd.DataFrame) else table_columns(source)
+
+
+class PandasBackend:
+    """
+    Reference implementation: row-index predicate pushdown, pandas joins and
+    the bincount AggregationPlan engine, all in this process.
+    """
+
+    name = "pandas"
+
+    def _load(self, source: Source, table: str, plan: QueryPlan) -> pd.DataFrame:
+        """Rows of `table` matching the plan, projected to the columns it needs."""
+        available = source_columns(source)
+        columns = [c for c in plan.columns(table) if c in available]
+        frame = resolve_table(source, columns, plan.predicates(table, available))
+        mask = plan.date_mask(frame)
+        if mask is not None:
+            frame = frame[mask]
+        return frame[columns]
+
+    def retrieve(
+        self,
+        yelp: Source,
+        menu: Source,
+        plan: QueryPlan,
+        join: str = "daily",
+        max_rows: Optional[int] = DEFAULT_MAX_JOIN_ROWS,
+    ) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+        """The plan's rows (joined with Yelp when it needs it) and its top-N ranking."""
+        menu_df = self._load(menu, "menu", plan)
+        ranking = None if plan.metric in YELP_METRICS else plan.rank(menu_df)
+        if not plan.needs_yelp:
+            return menu_df.copy(), ranking
+        yelp_df = self._load(yelp, "yelp", plan)
+        if plan.metric in YELP_METRICS:
+            ranking = plan.rank(yelp_df)
+
+        if "restaurant_id" in yelp_df.columns and "restaurant_id" in menu_df.columns:
+            return join_menu_yelp(menu_df, yelp_df, mode=join, max_rows=max_rows), ranking
+        # fallback join by restaurant name
+        merged = menu_df.merge(
+            yelp_df,
+            left_on="restaurant_name" if "restaurant_name" in menu_df.columns else None,
+            right_on="restaurant_name" if "restaurant_name" in yelp_df.columns else None,
+            how="left",
+        )
+        return merged, ranking
+
+    def aggregate(
+        self,
+        source: Source,
+        plan: AggregationPlan,
+        where: Optional[Dict[str, Any]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> AggregationResult:
+        return plan.execute(resolve_table(source, columns, where))
+
+
+def duckdb_available() -> bool:
+    return importlib.util.find_spec("duckdb") is not None
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    """
+    Runs retrieval joins and Researcher aggregations as SQL on an embedded
+    DuckDB database: multi-threaded vectorized execution straight over the
+    columnar (Parquet) copies of the sources, spilling to `temp_directory`
+    when a query exceeds `memory_limit`. In-memory tables are scanned in
+    place. Results match the pandas backend (see test_backends.py).
+    """
+
+    name = "duckdb"
+
+    def __init__(
+        self,
+        threads: Optional[int] = None,
+        memory_limit: Optional[str] = None,
+        temp_directory: Optional[str] = None,
+    ):
+        if not duckdb_available():
+            raise RuntimeError("The DuckDB backend needs duckdb (pip install duckdb)")
+        import duckdb
+
+        config = {}
+        if threads:
+            config["threads"] = threads
+        if memory_limit:
+            config["memory_limit"] = memory_limit
+        if temp_directory:
+            config["temp_directory"] = temp_directory
+        self._db = duckdb.connect(":memory:", config=config)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self):
+        """A connection of its own per call – views and registrations stay private to it."""
+        with self._lock:
+            con = self._db.cursor()
+        try:
+            yield con
+        finally:
+            con.close()
+
+    @staticmethod
+    def _register(con, name: str, source: Source) -> List[str]:
+        """Expose `source` as view `name` and return its columns."""
+        if isinstance(source, pd.DataFrame):
+            con.register(name, source)
+            return list(source.columns)
+        parquet, _ = ensure_columnar(source, source_digest(source))
+        if parquet is not None:
+            scan = f"read_parquet({sql_literal(parquet)})"
+        else:
+            scan = f"read_csv_auto({sql_literal(source)}, normalize_names=true)"
+        con.execute(f"CREATE TEMP VIEW {_ident(name)} AS SELECT * FROM {scan}")
+        return [row[0] for row in con.execute(f"DESCRIBE {_ident(name)}").fetchall()]
+
+    # -------------------- RETRIEVAL --------------------
+    def retrieve(
+        self,
+        yelp: Source,
+        menu: Source,
+        plan: QueryPlan,
+        join: str = "daily",
+        max_rows: Optional[int] = DEFAULT_MAX_JOIN_ROWS,
+    ) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+        with self._connection() as con:
+            menu_cols = self._register(con, "menu", menu)
+            yelp_cols = None
+            if plan.needs_yelp or plan.metric in YELP_METRICS:
+                yelp_cols = self._register(con, "yelp", yelp)
+
+            sql = plan.rows_sql(menu_cols, yelp_cols, join)
+            if plan.needs_yelp and max_rows is not None:
+                expected = con.execute(f"SELECT COUNT(*) FROM ({sql})").fetchone()[0]
+                print(f"🔗 Join plan: {join} in DuckDB → {expected:,} rows expected")
+                if expected > max_rows:
+                    raise JoinTooLargeError(
+                        f"Join would produce {expected:,} rows (limit {max_rows:,})"
+                    )
+            rows = apply_schema(con.execute(sql).df())
+
+            ranking = None
+            ranking_sql = plan.ranking_sql(yelp_cols if plan.metric in YELP_METRICS else menu_cols)
+            if ranking_sql:
+                top = con.execute(ranking_sql).df()
+                ranking = pd.Series(
+                    top.iloc[:, 1].to_numpy(dtype=np.float64), index=pd.Index(top.iloc[:, 0]).rename(None),
+                )
+        return rows, ranking
+
+    # -------------------- AGGREGATION --------------------
+    def aggregate(
+        self,
+        source: Source,
+        plan: AggregationPlan,
+        where: Optional[Dict[str, Any]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> AggregationResult:
+        """`plan` as one GROUP BY per dimension over the filtered rows."""
+        with self._connection() as con:
+            available = self._register(con, "t", source)
+            has_value = plan.value in available
+            has_date = bool(plan.date) and plan.date in available
+            value = (
+                f"CASE WHEN isnan(CAST({_ident(plan.value)} AS DOUBLE)) THEN NULL "
+                f"ELSE CAST({_ident(plan.value)} AS DOUBLE) END"
+                if has_value else "CAST(NULL AS DOUBLE)"
+            )
+            date = f"CAST({_ident(plan.date)} AS TIMESTAMP)" if has_date else "CAST(NULL AS TIMESTAMP)"
+            filters = [
+                f"{_ident(c)} IN ({', '.join(sql_literal(v) for v in predicate_values(values))})"
+                for c, values in (where or {}).items()
+            ]
+            rows = (
+                f"SELECT *, {value} AS __value, {date} AS __date FROM t"
+                + (" WHERE " + " AND ".join(filters) if filters else "")
+            )
+
+            n, total, count, lo, hi = con.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(__value), 0), COUNT(__value), MIN(__date), MAX(__date) "
+                f"FROM ({rows})"
+            ).fetchone()
+            result = AggregationResult(
+                rows=int(n),
+                has_value=has_value,
+                value_sum=float(total),
+                value_count=int(count),
+                date_min=None if lo is None else pd.Timestamp(lo),
+                date_max=None if hi is None else pd.Timestamp(hi),
+            )
+
+            for name, column in plan.dimensions.items():
+                if column == MONTH:
+                    if not has_date:
+                        continue
+                    key = "date_trunc('month', __date)"
+                elif column in available:
+                    key = _ident(column)
+                else:
+                    continue
+                groups = con.execute(
+                    f"SELECT {key} AS k, COALESCE(SUM(__value), 0), COUNT(__value), COUNT(*), "
+                    f"MIN(__date), MAX(__date) FROM ({rows}) WHERE {key} IS NOT NULL "
+                    "GROUP BY 1 ORDER BY 1"
+                ).df()
+                keys = (
+                    pd.PeriodIndex(pd.to_datetime(groups["k"]), freq="M")
+                    if column == MONTH else pd.Index(groups["k"])
+                ).rename(None)
+                result.groups[name] = GroupStats(
+                    keys,
+                    groups.iloc[:, 1].to_numpy(dtype=np.float64),
+                    groups.iloc[:, 2].to_numpy(dtype=np.int64),
+                    groups.iloc[:, 3].to_numpy(dtype=np.int64),
+                    groups.iloc[:, 4].to_numpy(dtype="datetime64[ns]"),
+                    groups.iloc[:, 5].to_numpy(dtype="datetime64[ns]"),
+                )
+        return result
+
+
+EXECUTION_BACKENDS = ("pandas", "duckdb")
+_SHARED: Dict[Tuple, object] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def available_backends() -> List[str]:
+    return [b for b in EXECUTION_BACKENDS if b != "duckdb" or duckdb_available()]
+
+
+def get_backend(backend: Union[str, PandasBackend, DuckDBBackend, None] = "pandas", **kwargs):
+    """
+    Shared backend instance per (name, options); an instance passes through,
+    None means pandas.
+    """
+    if backend is None:
+        backend = "pandas"
+    if not isinstance(backend, str):
+        return backend
+    if backend not in EXECUTION_BACKENDS:
+        raise ValueError(f"Unknown execution backend '{backend}' (expected one of {EXECUTION_BACKENDS})")
+    key = (backend, tuple(sorted(kwargs.items())))
+    with _SHARED_LOCK:
+        instance = _SHARED.get(key)
+        if instance is None:
+            instance = PandasBackend() if backend == "pandas" else DuckDBBackend(**kwargs)
+            _SHARED[key] = instance
+        return instance
@@ -0,0 +1,236 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from agents.instrumentation import TRACER, Tracer, annotate, span
+
+
+@dataclass
+class ChartSpec:
+    """
+    Everything needed to draw one chart from an already-aggregated series.
+    Small and picklable, so specs can be shipped to render worker processes.
+    """
+    filename: str
+    kind: str  # "bar" or "line"
+    title: str
+    labels: List[str]
+    values: List[float]
+    xlabel: Optional[str] = None
+    color: Optional[str] = None
+    figsize: Tuple[float, float] = (8, 4)
+
+    @classmethod
+    def from_series(cls, series: pd.Series, filename: str, kind: str, title: str, **kwargs) -> "ChartSpec":
+        return cls(
+            filename=filename,
+            kind=kind,
+            title=title,
+            labels=[str(k) for k in series.index],
+            values=[float(v) for v in series.values],
+            **kwargs,
+        )
+
+
+def _render_measured(spec: ChartSpec, path: str) -> dict:
+    """`render_chart` in a worker process, returning its span record for the parent tracer."""
+    tracer = Tracer(enabled=True)
+    with tracer.span("chart.render", chart=spec.filename, points=len(spec.values)):
+        render_chart(spec, path)
+    return tracer.records()[0]
+
+
+def render_chart(spec: ChartSpec, path: str) -> str:
+    """Draw `spec` with the object-oriented Figure API on the Agg canvas and save it to `path`."""
+    fig = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    positions = range(len(spec.values))
+    if spec.kind == "bar":
+        ax.bar(positions, spec.values, color=spec.color or "C0", width=0.5)
+        ax.set_xticks(list(positions), spec.labels, rotation=90)
+    elif spec.kind == "line":
+        ax.plot(list(positions), spec.values, marker="o", color=spec.color or "C0")
+        ax.set_xticks(list(positions), spec.labels)
+    else:
+        raise ValueError(f"Unsupported chart kind: {spec.kind}")
+    ax.set_title(spec.title)
+    if spec.xlabel:
+        ax.set_xlabel(spec.xlabel)
+    fig.tight_layout()
+
+    # Write-then-rename so readers never see a half-written PNG
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+    fig.savefig(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+# Files younger than this are never evicted – another run sharing the cache may have just rendered them
+EVICT_GRACE_SECONDS = 600.0
+
+class FigureCache:
+    """
+    Content-addressed PNG store. A chart's key is the hash of its spec –
+    input series plus style – so an unchanged chart is never re-rendered.
+    The directory is kept under `max_bytes` by evicting least recently used
+    files (hits refresh a file's mtime). Eviction is by age only, so runs
+    sharing a cache (batch workers, the app) never delete each other's
+    fresh charts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(spec: ChartSpec) -> str:
+        payload = json.dumps(asdict(spec), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path_for(self, spec: ChartSpec) -> str:
+        # Keep the chart name in the file name – the UI captions charts by it
+        stem, ext = os.path.splitext(spec.filename)
+        return os.path.join(self.directory, f"{stem}-{self.key(spec)[:16]}{ext or '.png'}")
+
+    def lookup(self, spec: ChartSpec) -> Optional[str]:
+        """Cached path of `spec`, or None when it was never rendered or has since been evicted."""
+        path = self.path_for(spec)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def evict(self, keep: Iterable[str] = (), grace_seconds: float = EVICT_GRACE_SECONDS) -> None:
+        """
+        Drop least recently used files until the directory fits `max_bytes`,
+        skipping `keep` (the current run's charts) and files touched within
+        `grace_seconds`.
+        """
+        keep = {os.path.abspath(p) for p in keep}
+        cutoff = time.time() - grace_seconds
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.png")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if mtime > cutoff:
+                break  # sorted oldest first – everything after is fresher still
+            if os.path.abspath(path) in keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_DEFAULT_CACHE: Optional[FigureCache] = None
+
+
+def default_figure_cache() -> FigureCache:
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = FigureCache(os.path.join("outputs", "figure_cache"))
+    return _DEFAULT_CACHE
+
+
+_POOLS: Dict[Optional[int], ProcessPoolExecutor] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _render_pool(max_workers: Optional[int]) -> ProcessPoolExecutor:
+    """
+    Long-lived pool per `max_workers`, shared by all runs asking for that size –
+    worker start-up is paid once per process and size.
+    """
+    with _POOL_LOCK:
+        pool = _POOLS.get(max_workers)
+        if pool is None:
+            # spawn: workers never inherit server threads or pyplot global state
+            pool = _POOLS[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+
+def chart_paths(specs: List[ChartSpec], out_dir: str, cache: Optional[FigureCache] = None) -> List[str]:
+    """Where `render_charts` will write each chart – known before anything is drawn."""
+    if cache is not None:
+        return [cache.path_for(spec) for spec in specs]
+    return [os.path.join(out_dir, spec.filename) for spec in specs]
+
+
+def render_charts(
+    specs: List[ChartSpec],
+    out_dir: str,
+    max_workers: Optional[int] = None,
+    cache: Optional[FigureCache] = None,
+) -> List[str]:
+    """
+    Render all charts concurrently in a process pool and return their paths
+    (in spec order) once every chart is written. `max_workers=0` renders
+    in-process, e.g. when already running inside a worker.
+    With a `cache`, charts whose spec was rendered before are returned from
+    the cache directory without drawing, and new ones are written there.
+    """
+    paths = chart_paths(specs, out_dir, cache)
+    if cache is not None:
+        out_dir = cache.directory
+        hits = [cache.lookup(spec) is not None for spec in specs]
+    else:
+        hits = [False] * len(specs)
+    os.makedirs(out_dir, exist_ok=True)
+
+    todo = [(spec, path) for spec, path, hit in zip(specs, paths, hits) if not hit]
+    annotate(charts=len(specs), cached=len(specs) - len(todo))
+    if todo:
+        _render_all(todo, max_workers)
+    if cache is not None:
+        cache.evict(keep=paths)
+    return paths
+
+
+def _render_all(todo: List[Tuple[ChartSpec, str]], max_workers: Optional[int]) -> None:
+    if max_workers == 0 or len(todo) <= 1:
+        _render_inline(todo)
+        return
+
+    try:
+        pool = _render_pool(max_workers)
+        measured = TRACER.active()
+        task = _render_measured if measured else render_chart
+        for future in [pool.submit(task, spec, path) for spec, path in todo]:
+            result = future.result()
+            if measured:
+                TRACER.add(result)
+    except (BrokenProcessPool, OSError) as e:
+        print(f"⚠ Chart pool unavailable ({e}) – rendering in-process")
+        with _POOL_LOCK:
+            _POOLS.pop(max_workers, None)
+        _render_inline(todo)
+
+
+def _render_inline(todo: List[Tuple[ChartSpec, str]]) -> None:
+    for spec, path in todo:
+        with span("chart.render", chart=spec.filename, points=len(spec.values)):
+            render_chart(spec, path)
@@ -0,0 +1,451 @@
+import glob
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columns stored as pandas categoricals – low cardinality, repeated on every row
+CATEGORICAL_COLUMNS = [
+    "restaurant_id", "restaurant_name", "city", "state", "cuisine",
+    "category", "item_name", "weather", "day_of_week", "price_tier",
+]
+DATE_COLUMNS = ["date"]
+# Integer columns downcast to the narrowest type that holds their values
+INTEGER_COLUMNS = [
+    "postal_code", "yelp_review_count", "is_weekend", "promotion",
+    "orders", "units_sold",
+]
+# Float columns safe to keep in float32; revenue stays float64 so totals are exact
+FLOAT32_COLUMNS = ["unit_price", "yelp_rating", "avg_order_value"]
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 of a file's contents, read in 1 MB chunks."""
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize column names and convert columns to their typed representation."""
+    df.columns = [c.lower().strip() for c in df.columns]
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in INTEGER_COLUMNS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+    return df
+
+
+def columnar_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def columnar_path(csv_path: str, digest: str) -> str:
+    """Parquet copy written next to the CSV, keyed by the CSV's content hash."""
+    stem, _ = os.path.splitext(csv_path)
+    return f"{stem}.{digest[:16]}.parquet"
+
+
+def _manifest_path(csv_path: str) -> str:
+    directory, name = os.path.split(csv_path)
+    return os.path.join(directory, f".{name}.manifest.json")
+
+
+def source_digest(csv_path: str, stat: Optional[os.stat_result] = None) -> str:
+    """
+    Content hash of a source file. The hash is remembered in a sidecar manifest
+    keyed by mtime/size, so unchanged multi-GB exports are not re-hashed on
+    every cold start.
+    """
+    stat = stat or os.stat(csv_path)
+    manifest = _manifest_path(csv_path)
+    try:
+        with open(manifest, encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta["mtime_ns"], meta["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return meta["digest"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = file_digest(csv_path)
+    try:
+        atomic_write_text(manifest, json.dumps(
+            {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "digest": digest}
+        ))
+    except OSError:
+        pass  # read-only data directory – hash again next time
+    return digest
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def ensure_columnar(csv_path: str, digest: str) -> Tuple[Optional[str], Optional[pd.DataFrame]]:
+    """
+    Make sure a Parquet copy of `csv_path` exists for `digest`.
+    Returns (parquet_path, frame) – `frame` is the freshly parsed table when the
+    conversion happened in this call, so the caller does not read it back.
+    Returns (None, None) when pyarrow is unavailable or the copy can't be written.
+    """
+    if not columnar_available():
+        return None, None
+    target = columnar_path(csv_path, digest)
+    if os.path.exists(target):
+        return target, None
+
+    frame = apply_schema(pd.read_csv(csv_path))
+    try:
+        tmp = f"{target}.{os.getpid()}.tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, target)
+    except OSError:
+        return None, frame
+
+    # Drop copies made for older versions of the same CSV – only names columnar_path generates
+    stem, _ = os.path.splitext(csv_path)
+    generated = re.compile(re.escape(os.path.basename(stem)) + r"\.[0-9a-f]{16}\.parquet")
+    for stale in glob.glob(f"{glob.escape(stem)}.*.parquet"):
+        if stale != target and generated.fullmatch(os.path.basename(stale)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    print(f"🗜 Converted {os.path.basename(csv_path)} to columnar copy {os.path.basename(target)}")
+    return target, frame
+
+
+def table_columns(path: str) -> List[str]:
+    """Normalized column names of a source, without loading any rows."""
+    digest = source_digest(path)
+    parquet = columnar_path(path, digest)
+    if columnar_available() and os.path.exists(parquet):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(parquet).names)
+    return [c.lower().strip() for c in pd.read_csv(path, nrows=0).columns]
+
+
+@dataclass
+class _CacheEntry:
+    mtime_ns: int
+    size: int
+    digest: str
+    frame: Optional[pd.DataFrame] = None
+    complete: bool = False
+
+
+_CACHE: Dict[str, _CacheEntry] = {}
+_LOCK = threading.Lock()
+
+
+def _load_columns(key: str, entry: _CacheEntry, columns: Optional[List[str]]) -> None:
+    parquet, frame = ensure_columnar(key, entry.digest)
+    if frame is not None or parquet is None:
+        # Conversion just parsed everything (or no columnar copy) – keep it all
+        entry.frame = frame if frame is not None else apply_schema(pd.read_csv(key))
+        entry.complete = True
+        return
+
+    import pyarrow.parquet as pq
+    schema = list(pq.read_schema(parquet).names)
+    loaded = [] if entry.frame is None else list(entry.frame.columns)
+    wanted = schema if columns is None else [c for c in schema if c in loaded or c in columns]
+    missing = [c for c in wanted if c not in loaded]
+    if missing:
+        part = pd.read_parquet(parquet, columns=missing)
+        entry.frame = part if entry.frame is None else pd.concat([entry.frame, part], axis=1)[wanted]
+    entry.complete = len(wanted) == len(schema)
+
+
+def load_table(
+    path: str,
+    columns: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """
+    Load a source once into a typed DataFrame and keep it in memory.
+
+    The first load converts the CSV to a Parquet copy (when pyarrow is
+    installed); later loads read only the requested `columns` from that copy.
+    `where` predicates (see `select_rows`) are applied through row indexes on
+    the cached table before projecting.
+    The table is reloaded only when the file's mtime/size changes *and* its
+    content hash differs from the cached one.
+    """
+    needed = None if columns is None else list(dict.fromkeys(columns + list(where or {})))
+    frame = _cached_frame(path, needed)
+    if where:
+        frame = select_rows(frame, where)
+    if columns is None:
+        return frame
+    return frame[[c for c in columns if c in frame.columns]]
+
+
+def _cached_frame(path: str, columns: Optional[List[str]]) -> pd.DataFrame:
+    """The cached table for `path`, loading `columns` (or all) into it first."""
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    with _LOCK:
+        entry = _CACHE.get(key)
+        if entry is None or (entry.mtime_ns, entry.size) != (stat.st_mtime_ns, stat.st_size):
+            digest = source_digest(key, stat)
+            if entry and entry.digest == digest:
+                # Touched but unchanged – keep the loaded table
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            else:
+                entry = _CacheEntry(stat.st_mtime_ns, stat.st_size, digest)
+                _CACHE[key] = entry
+
+        if columns is None:
+            if not entry.complete:
+                _load_columns(key, entry, None)
+        elif entry.frame is None or (
+            not entry.complete and any(c not in entry.frame.columns for c in columns)
+        ):
+            _load_columns(key, entry, columns)
+        return entry.frame
+
+
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+def iter_chunks(
+    path: str,
+    columns: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Typed chunks of a source without ever holding the whole table: record
+    batches of its Parquet copy when one exists, otherwise CSV chunks.
+    Only `columns` (plus predicate columns) are read, `where` predicates are
+    applied per chunk, and nothing is added to the in-memory table cache.
+    """
+    wanted = None if columns is None else set(columns) | set(where or {})
+    parquet = None
+    if columnar_available():
+        candidate = columnar_path(path, source_digest(os.path.abspath(path)))
+        if os.path.exists(candidate):
+            parquet = candidate
+
+    if parquet is not None:
+        import pyarrow.parquet as pq
+        source = pq.ParquetFile(parquet)
+        names = source.schema_arrow.names
+        batches = (
+            batch.to_pandas()
+            for batch in source.iter_batches(
+                batch_size=chunk_rows,
+                columns=None if wanted is None else [c for c in names if c in wanted],
+            )
+        )
+    else:
+        usecols = None if wanted is None else (lambda c: c.lower().strip() in wanted)
+        batches = pd.read_csv(path, chunksize=chunk_rows, usecols=usecols)
+
+    for chunk in batches:
+        chunk = apply_schema(chunk)
+        if where:
+            chunk = chunk[mask_rows(chunk, where)]
+        yield chunk
+
+
+# Bytes before a stored offset that must be unchanged for the CSV to count as appended to
+TAIL_BYTES = 4096
+
+
+@dataclass
+class CsvTail:
+    """Where a previous read of an append-only CSV stopped."""
+    offset: int  # byte offset of the first unread line
+    digest: str  # hash of the TAIL_BYTES before `offset`
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"offset": self.offset, "digest": self.digest}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CsvTail":
+        return cls(int(data["offset"]), str(data["digest"]))
+
+
+def _tail_digest(f, offset: int) -> str:
+    f.seek(max(0, offset - TAIL_BYTES))
+    return hashlib.sha256(f.read(offset - max(0, offset - TAIL_BYTES))).hexdigest()
+
+
+def read_appended(
+    path: str,
+    since: Optional[CsvTail] = None,
+    columns: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Tuple[Optional[pd.DataFrame], CsvTail]:
+    """
+    Typed rows of the CSV at `path` added after `since`, and where this read
+    stopped. Only the bytes past `since.offset` are read, so a refresh of an
+    append-only export costs time in its new rows. Returns (None, tail) when
+    the file was not merely appended to since then (shorter, or the bytes
+    before the offset changed); pass since=None to read it whole. A trailing
+    line without a newline (still being written) is left for the next read.
+    """
+    wanted = None if columns is None else set(columns) | set(where or {})
+    with open(path, "rb") as f:
+        header = f.readline()
+        size = f.seek(0, os.SEEK_END)
+        start = len(header) if since is None else since.offset
+        if since is not None and (size < start or _tail_digest(f, start) != since.digest):
+            return None, since
+        f.seek(start)
+        data = f.read(size - start)
+        data = data[:data.rfind(b"\n") + 1]
+        tail = CsvTail(start + len(data), _tail_digest(f, start + len(data)))
+
+    usecols = None if wanted is None else (lambda c: c.lower().strip() in wanted)
+    frame = apply_schema(pd.read_csv(io.BytesIO(header + data), usecols=usecols))
+    if where:
+        frame = frame[mask_rows(frame, where)]
+    return frame, tail
+
+
+def table_version(path: str) -> str:
+    """Content hash of the source at `path` (served from the manifest when unchanged)."""
+    return source_digest(os.path.abspath(path))
+
+
+def clear_cache(path: Optional[str] = None) -> None:
+    with _LOCK:
+        if path is None:
+            _CACHE.clear()
+        else:
+            _CACHE.pop(os.path.abspath(path), None)
+
+
+def resolve_table(
+    source,
+    columns: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """Accept either a path or an already-loaded DataFrame."""
+    if isinstance(source, pd.DataFrame):
+        return select_rows(source, where) if where else source
+    return load_table(source, columns, where)
+
+
+class RowIndex:
+    """
+    Value → row-position index over one column, built with a single stable
+    argsort of the column's category codes. Looking up a value costs time
+    proportional to its matching rows, not to the table size.
+    """
+
+    def __init__(self, values: pd.Series):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, self.keys = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, self.keys = pd.factorize(values)
+        shifted = codes.astype(np.int64) + 1  # missing values (-1) land in slot 0
+        self._order = np.argsort(shifted, kind="stable")
+        self._offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(shifted, minlength=len(self.keys) + 1))]
+        )
+
+    def positions(self, values: Iterable[Any]) -> np.ndarray:
+        """Sorted row positions holding any of `values`."""
+        codes = self.keys.get_indexer(list(values))
+        parts = [
+            self._order[self._offsets[c + 1]:self._offsets[c + 2]] for c in codes if c >= 0
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
+
+
+_ROW_INDEXES: Dict[int, Dict[str, RowIndex]] = {}
+
+
+def row_index(frame: pd.DataFrame, column: str) -> RowIndex:
+    """Index on `frame[column]`, built on first use and kept while the frame lives."""
+    key = id(frame)
+    with _LOCK:
+        indexes = _ROW_INDEXES.get(key)
+        if indexes is None:
+            indexes = _ROW_INDEXES[key] = {}
+            weakref.finalize(frame, _ROW_INDEXES.pop, key, None)
+        if column not in indexes:
+            indexes[column] = RowIndex(frame[column])
+        return indexes[column]
+
+
+def predicate_values(values: Any) -> Iterable[Any]:
+    if isinstance(values, (str, bytes)) or not isinstance(values, Iterable):
+        return [values]
+    return values
+
+
+def mask_rows(frame: pd.DataFrame, predicates: Dict[str, Any]) -> np.ndarray:
+    """Boolean mask of rows matching every predicate – for chunks too short-lived to index."""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, values in predicates.items():
+        mask &= frame[column].isin(list(predicate_values(values))).to_numpy()
+    return mask
+
+
+def select_rows(frame: pd.DataFrame, predicates: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Rows matching every predicate, e.g. {"restaurant_id": [...], "city": "Boston"}.
+    A scalar matches one value, a list/tuple/set matches any of its values.
+    Predicates are answered through cached RowIndexes, so no full-column scan.
+    """
+    selected = None
+    for column, values in predicates.items():
+        pos = row_index(frame, column).positions(predicate_values(values))
+        selected = pos if selected is None else np.intersect1d(selected, pos, assume_unique=True)
+    if selected is None:
+        return frame
+    return frame.take(selected)
+
+
+class DataStore:
+    """
+    Shared dataset layer – every agent in a run reads the same typed tables.
+    """
+
+    def __init__(self, yelp_path: str, menu_path: str):
+        self.yelp_path = yelp_path
+        self.menu_path = menu_path
+
+    @property
+    def yelp(self) -> pd.DataFrame:
+        return load_table(self.yelp_path)
+
+    @property
+    def menu(self) -> pd.DataFrame:
+        return load_table(self.menu_path)
+
+    @property
+    def version(self) -> str:
+        """Combined content hash of both sources."""
+        return hashlib.sha1(
+            (table_version(self.yelp_path) + table_version(self.menu_path)).encode()
+        ).hexdigest()
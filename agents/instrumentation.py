@@ -0,0 +1,216 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource  # not available on Windows
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Span:
+    """One timed block. `set(rows=...)` attaches counts or other attributes."""
+
+    __slots__ = ("tracer", "name", "attrs", "parent", "_wall", "_cpu", "_mem")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.parent: Optional[str] = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        stack = self.tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._mem = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        self.tracer._stack().pop()
+        record = {
+            "name": self.name,
+            "parent": self.parent,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": _peak_rss_mb(),
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+        }
+        if self._mem is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record["alloc_mb"] = round((current - self._mem) / 1e6, 3)
+            record["traced_peak_mb"] = round(peak / 1e6, 3)
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        record.update(self.attrs)
+        self.tracer.add(record)
+
+
+class _NullSpan:
+    """Stand-in when tracing is off – entering and leaving cost one call each."""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Collects span records (wall time, thread CPU time, peak RSS, optional
+    tracemalloc allocation delta, row counts) for one process. Disabled
+    tracers hand out a shared no-op span.
+
+    `collect()` records one run's spans into a list of its own, whether or
+    not the process-wide switch is on, so concurrent runs (e.g. Streamlit
+    sessions) neither see nor clear each other's spans.
+    """
+
+    def __init__(self, enabled: bool = False, memory: bool = False):
+        self.enabled = False
+        self.memory = False
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._run: contextvars.ContextVar = contextvars.ContextVar(f"trace_run_{id(self)}", default=None)
+        if enabled:
+            self.enable(memory)
+
+    def enable(self, memory: bool = False) -> None:
+        """Start recording; `memory=True` also traces Python allocations (slower)."""
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memory = False
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def active(self) -> bool:
+        """Whether spans opened here are recorded – process-wide or for the current run."""
+        return self.enabled or self._run.get() is not None
+
+    def span(self, name: str, **attrs):
+        if not self.active():
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Add a finished record, e.g. one measured in a worker process."""
+        run = self._run.get()
+        with self._lock:
+            if run is not None:
+                run.append(record)
+            if self.enabled:
+                self._records.append(record)
+
+    @contextmanager
+    def collect(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        `with TRACER.collect() as records:` – spans of this run (this context,
+        and pool threads started through `propagate`) go to `records`.
+        """
+        records: List[Dict[str, Any]] = []
+        token = self._run.set(records)
+        try:
+            yield records
+        finally:
+            self._run.reset(token)
+
+    def records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._records)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def export_jsonl(self, path: str, records: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Append all records (or the given `records`) to `path`, one JSON object per line."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for record in self.records() if records is None else records:
+                f.write(json.dumps(record, default=str) + "\n")
+        return path
+
+
+# Process-wide tracer: MARGEN_TRACE=1 turns it on, MARGEN_TRACE=memory adds tracemalloc
+_ENV = os.environ.get("MARGEN_TRACE", "").strip().lower()
+TRACER = Tracer(enabled=_ENV not in ("", "0", "false"), memory=_ENV == "memory")
+
+
+def span(name: str, **attrs):
+    """`with span("writer.draft") as s: ...; s.set(rows=n)` on the process-wide tracer."""
+    return TRACER.span(name, **attrs)
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    `func` bound to a copy of the caller's context – submit one per task so
+    spans recorded in pool threads land in the caller's `collect()` run.
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def annotate(**attrs) -> None:
+    """Attach attributes (e.g. rows=...) to the innermost open span of this thread."""
+    if TRACER.active():
+        stack = TRACER._stack()
+        if stack:
+            stack[-1].set(**attrs)
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of `span` for whole methods."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.active():
+                return func(*args, **kwargs)
+            with TRACER.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from typing import List
+
+import pandas as pd
+
+# Refuse joins that would materialize more rows than this (override per Retriever)
+DEFAULT_MAX_JOIN_ROWS = 5_000_000
+
+# Yelp columns that describe the restaurant rather than a single day
+DIMENSION_COLUMNS = [
+    "restaurant_id", "restaurant_name", "city", "state", "postal_code",
+    "cuisine", "yelp_rating", "yelp_review_count", "price_tier",
+]
+
+JOIN_MODES = ("daily", "dimension")
+
+
+class JoinTooLargeError(ValueError):
+    """Raised when a join's expected output exceeds the configured row limit."""
+
+
+@dataclass
+class JoinPlan:
+    mode: str
+    keys: List[str]
+    expected_rows: int
+
+
+def restaurant_dimension(yelp_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per restaurant with its descriptive (non-daily) attributes."""
+    cols = [c for c in DIMENSION_COLUMNS if c in yelp_df.columns]
+    return yelp_df[cols].drop_duplicates("restaurant_id")
+
+
+def _join_inputs(menu_df: pd.DataFrame, yelp_df: pd.DataFrame, mode: str):
+    if mode not in JOIN_MODES:
+        raise ValueError(f"Unknown join mode '{mode}' (expected one of {JOIN_MODES})")
+    if mode == "daily" and "date" in menu_df.columns and "date" in yelp_df.columns:
+        return yelp_df, ["restaurant_id", "date"]
+    return restaurant_dimension(yelp_df), ["restaurant_id"]
+
+
+def estimate_join_rows(left: pd.DataFrame, right: pd.DataFrame, keys: List[str]) -> int:
+    """
+    Exact row count of `left.merge(right, on=keys, how="left")`, computed from
+    per-key group sizes without materializing the join.
+    """
+    if left.empty:
+        return 0
+    left_counts = left.groupby(keys, observed=True, dropna=False).size()
+    right_counts = right.groupby(keys, observed=True, dropna=False).size()
+    matched = right_counts.reindex(left_counts.index).fillna(1).clip(lower=1)
+    return int((left_counts * matched).sum())
+
+
+def plan_join(menu_df: pd.DataFrame, yelp_df: pd.DataFrame, mode: str = "daily") -> JoinPlan:
+    """Pick the join keys for `mode` and report the row count it will produce."""
+    right, keys = _join_inputs(menu_df, yelp_df, mode)
+    return JoinPlan(mode=mode, keys=keys, expected_rows=estimate_join_rows(menu_df, right, keys))
+
+
+def join_menu_yelp(
+    menu_df: pd.DataFrame,
+    yelp_df: pd.DataFrame,
+    mode: str = "daily",
+    max_rows: int = DEFAULT_MAX_JOIN_ROWS,
+) -> pd.DataFrame:
+    """
+    Left-join menu sales onto Yelp data without fanning out.
+
+    - ``daily``: match each menu row to the same restaurant's row for the same date.
+    - ``dimension``: match each menu row to the restaurant's deduplicated attributes.
+
+    Raises JoinTooLargeError before materializing if the output exceeds `max_rows`.
+    """
+    right, keys = _join_inputs(menu_df, yelp_df, mode)
+    expected = estimate_join_rows(menu_df, right, keys)
+    print(f"🔗 Join plan: {mode} on {keys} → {expected:,} rows expected")
+    if max_rows is not None and expected > max_rows:
+        raise JoinTooLargeError(
+            f"Join on {keys} would produce {expected:,} rows (limit {max_rows:,})"
+        )
+
+    # Descriptive columns present on both sides are identical – keep the menu copy.
+    # Metrics present on both sides (e.g. revenue) keep the Yelp one as *_restaurant.
+    shared = [c for c in right.columns if c in menu_df.columns and c not in keys]
+    right = right.drop(columns=[c for c in shared if c in DIMENSION_COLUMNS])
+    return menu_df.merge(right, on=keys, how="left", suffixes=("", "_restaurant"))
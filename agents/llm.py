@@ -1,22 +1,174 @@
+import asyncio
+import json
+import subprocess
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
 import requests
+from requests.adapters import HTTPAdapter
 
 class OllamaLLM:
     """
     Minimal wrapper for interacting with a local Ollama model.
     Default host: http://localhost:11434
+
+    Requests go through one pooled, keep-alive `requests.Session`, so repeated
+    calls reuse TCP connections. `stream_chat` yields tokens as they arrive;
+    `achat` / `astream_chat` are asyncio variants that let one process keep
+    many generations in flight.
     """
 
-    def __init__(self, model="llama3.1", host="http://localhost:11434"):
+    def __init__(
+        self,
+        model="llama3.1",
+        host="http://localhost:11434",
+        timeout: float = 120,
+        pool_size: int = 8,
+        keep_alive: Optional[Union[str, int]] = None,
+    ):
         self.model = model
         self.host = host.rstrip("/")
+        self.timeout = timeout
+        # How long Ollama keeps the model loaded after a call (e.g. "30m", -1 = forever)
+        self.keep_alive = keep_alive
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _payload(self, system: str, user: str, stream: bool) -> dict:
+        prompt = f"<|system|>\n{system}\n<|user|>\n{user}\n<|assistant|>\n"
+        payload = {"model": self.model, "prompt": prompt, "stream": stream}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
 
     def chat(self, system: str, user: str) -> str:
         url = f"{self.host}/api/generate"
-        prompt = f"<|system|>\n{system}\n<|user|>\n{user}\n<|assistant|>\n"
-        resp = requests.post(
+        resp = self.session.post(
             url,
-            json={"model": self.model, "prompt": prompt, "stream": False},
-            timeout=120,
+            json=self._payload(system, user, stream=False),
+            timeout=self.timeout,
         )
         resp.raise_for_status()
         return resp.json().get("response", "").strip()
+
+    def stream_chat(self, system: str, user: str) -> Iterator[str]:
+        """Yield response fragments as Ollama streams them (one JSON object per line)."""
+        url = f"{self.host}/api/generate"
+        with self.session.post(
+            url,
+            json=self._payload(system, user, stream=True),
+            timeout=self.timeout,
+            stream=True,
+        ) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+
+    # ------------------------------------------------------------------
+    async def achat(self, system: str, user: str) -> str:
+        """Non-blocking `chat`; the request runs on a worker thread using the shared pool."""
+        return await asyncio.to_thread(self.chat, system, user)
+
+    async def astream_chat(self, system: str, user: str) -> AsyncIterator[str]:
+        """Async iterator over streamed fragments, fed from a worker thread."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def pump():
+            try:
+                for token in self.stream_chat(system, user):
+                    loop.call_soon_threadsafe(queue.put_nowait, token)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        threading.Thread(target=pump, daemon=True).start()
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class SubprocessLLM:
+    """
+    Runs `ollama run <model>` once per call. Slower than the HTTP client
+    (process start-up on every call) – kept for hosts without the API.
+    """
+
+    def __init__(self, model="llama3.1", timeout: float = 90):
+        self.model = model
+        self.timeout = timeout
+
+    def chat(self, system: str, user: str) -> str:
+        result = subprocess.run(
+            ["ollama", "run", self.model],
+            input=f"{system}\n\n{user}",
+            text=True,
+            capture_output=True,
+            timeout=self.timeout,
+        )
+        if result.returncode != 0 or not result.stdout.strip():
+            raise RuntimeError("Empty or failed Ollama output")
+        return result.stdout.strip()
+
+
+class FakeLLM:
+    """
+    In-process stand-in for tests and offline demos. Returns `responder(system, user)`
+    when given, otherwise the user message unchanged; records every call.
+    """
+
+    def __init__(self, model="fake", responder: Optional[Callable[[str, str], str]] = None):
+        self.model = model
+        self.responder = responder
+        self.calls: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def chat(self, system: str, user: str) -> str:
+        with self._lock:
+            self.calls.append((system, user))
+        return self.responder(system, user) if self.responder else user
+
+
+LLM_BACKENDS = ("http", "subprocess", "fake")
+_SHARED: Dict[Tuple, object] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def get_llm(backend: str = "http", model: str = "llama3.1", **kwargs):
+    """
+    Shared, long-lived client per (backend, model, options) – agents created
+    on every Streamlit rerun reuse the same connection pool and warm model.
+    """
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}' (expected one of {LLM_BACKENDS})")
+    key = (backend, model, tuple(sorted(kwargs.items())))
+    with _SHARED_LOCK:
+        client = _SHARED.get(key)
+        if client is None:
+            if backend == "http":
+                client = OllamaLLM(model=model, **kwargs)
+            elif backend == "subprocess":
+                client = SubprocessLLM(model=model, **kwargs)
+            else:
+                client = FakeLLM(model=model, **kwargs)
+            _SHARED[key] = client
+        return client
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Tuple
+
+DEFAULT_CACHE_PATH = os.path.join("outputs", "llm_cache.sqlite3")
+
+_TRAILING_SPACE = re.compile(r"[ \t]+\n")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_prompt(text: str) -> str:
+    """Canonical form for cache keys – whitespace-only edits don't cause a miss."""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = _TRAILING_SPACE.sub("\n", text + "\n")
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+class CachedLLM:
+    """
+    Persistent prompt → response cache in front of any LLM client.
+
+    Entries live in SQLite, keyed by model, prompt-template version and the
+    hash of the normalized prompt. Entries expire after `ttl_seconds`; above
+    `max_entries` the least recently used are evicted. Only successful,
+    non-empty responses are stored. Hit / miss / eviction counters are
+    available from `stats`.
+    """
+
+    def __init__(
+        self,
+        llm,
+        path: str,
+        template_version: str = "1",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 2000,
+    ):
+        self.llm = llm
+        self.model = getattr(llm, "model", "unknown")
+        self.path = path
+        self.template_version = template_version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, template_version TEXT,"
+            " response TEXT, created_at REAL, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)")
+        self._db.commit()
+
+    def key(self, system: str, user: str) -> str:
+        parts = [self.model, self.template_version, normalize_prompt(system), normalize_prompt(user)]
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": entries}
+
+    # --------------------------------------------------------------
+    def chat(self, system: str, user: str) -> str:
+        key = self.key(system, user)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+
+        response = self.llm.chat(system, user)
+        if response and response.strip():
+            self._store(key, response)
+        return response
+
+    def _store(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.model, self.template_version, response, now, now),
+            )
+            expired = self._db.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            overflow = self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._db.commit()
+            self.evictions += expired + overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+_SHARED: Dict[Tuple, CachedLLM] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def cached_llm(llm, path: str, template_version: str = "1", **kwargs) -> CachedLLM:
+    """One cache wrapper per (client, file, template version), shared across agent instances."""
+    key = (id(llm), os.path.abspath(path), template_version, tuple(sorted(kwargs.items())))
+    with _SHARED_LOCK:
+        cache = _SHARED.get(key)
+        if cache is None:
+            cache = _SHARED[key] = CachedLLM(llm, path, template_version, **kwargs)
+        return cache
@@ -0,0 +1,161 @@
+import difflib
+import re
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Casefold, drop apostrophes and split on anything that isn't a letter or digit."""
+    text = _APOSTROPHES.sub("", str(text).casefold())
+    return [t for t in _NON_WORD.split(text) if t]
+
+
+@dataclass
+class NameMatch:
+    value: str
+    start: int  # token offsets into the normalized query
+    end: int
+    score: float = 1.0
+
+
+class NameIndex:
+    """
+    Token-level Aho–Corasick automaton over normalized names.
+
+    Built once per set of names; `find` resolves every name mentioned in a
+    text in a single pass over its tokens. Matches respect word boundaries,
+    and overlapping matches resolve to the longest, leftmost name.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._phrases: List[Tuple[str, ...]] = []
+        self._values: List[List[str]] = []
+        by_phrase: Dict[Tuple[str, ...], int] = {}
+
+        for name in names:
+            phrase = tuple(normalize_tokens(name))
+            if not phrase:
+                continue
+            if phrase in by_phrase:
+                self._values[by_phrase[phrase]].append(name)
+                continue
+            by_phrase[phrase] = len(self._phrases)
+            self._phrases.append(phrase)
+            self._values.append([name])
+            self._insert(phrase, by_phrase[phrase])
+        self._build_failure_links()
+
+        self._by_length: Dict[int, List[Tuple[str, ...]]] = {}
+        for phrase in self._phrases:
+            self._by_length.setdefault(len(phrase), []).append(phrase)
+        self._phrase_ids = by_phrase
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    # --------------------------------------------------------------
+    def _insert(self, phrase: Tuple[str, ...], phrase_id: int) -> None:
+        state = 0
+        for token in phrase:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(phrase_id)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    # --------------------------------------------------------------
+    def _exact(self, tokens: List[str]) -> List[NameMatch]:
+        matches = []
+        state = 0
+        for pos, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for phrase_id in self._out[state]:
+                length = len(self._phrases[phrase_id])
+                for value in self._values[phrase_id]:
+                    matches.append(NameMatch(value, pos - length + 1, pos + 1))
+        return matches
+
+    def _fuzzy(self, tokens: List[str], cutoff: float) -> List[NameMatch]:
+        matches = []
+        for length, phrases in self._by_length.items():
+            candidates = [" ".join(p) for p in phrases]
+            for start in range(len(tokens) - length + 1):
+                window = " ".join(tokens[start:start + length])
+                for close in difflib.get_close_matches(window, candidates, n=1, cutoff=cutoff):
+                    score = difflib.SequenceMatcher(None, window, close).ratio()
+                    phrase_id = self._phrase_ids[tuple(close.split(" "))]
+                    for value in self._values[phrase_id]:
+                        matches.append(NameMatch(value, start, start + length, score))
+        return matches
+
+    def find(self, text: str, fuzzy: bool = False, cutoff: float = 0.85) -> List[NameMatch]:
+        """
+        All names mentioned in `text`, in order of appearance.
+        With `fuzzy=True`, token windows within `cutoff` similarity of a name
+        (e.g. misspellings) also match, after exact matches take precedence.
+        """
+        tokens = normalize_tokens(text)
+        matches = self._exact(tokens)
+        if fuzzy:
+            matches += [m for m in self._fuzzy(tokens, cutoff) if m.score < 1.0]
+
+        # Longest leftmost, exact before fuzzy; drop anything overlapping a kept match
+        matches.sort(key=lambda m: (-m.score, -(m.end - m.start), m.start))
+        taken = [False] * len(tokens)
+        kept = []
+        for m in matches:
+            if any(taken[m.start:m.end]):
+                if not any(k.start == m.start and k.end == m.end for k in kept):
+                    continue
+            kept.append(m)
+            taken[m.start:m.end] = [True] * (m.end - m.start)
+        return sorted(kept, key=lambda m: m.start)
+
+    def resolve(self, text: str, fuzzy: bool = False, cutoff: float = 0.85) -> List[str]:
+        """Distinct names mentioned in `text`, in order of appearance."""
+        return list(dict.fromkeys(m.value for m in self.find(text, fuzzy, cutoff)))
+
+
+@lru_cache(maxsize=16)
+def _cached_index(names: Tuple[str, ...]) -> NameIndex:
+    return NameIndex(names)
+
+
+def name_index_for(values: pd.Series) -> NameIndex:
+    """
+    Shared index over the distinct values of a column. Indexes are cached by
+    their name set, so each dataset version builds its index only once.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        names = values.cat.categories
+    else:
+        names = values.dropna().unique()
+    return _cached_index(tuple(str(n) for n in names))
@@ -0,0 +1,187 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from agents.instrumentation import propagate
+
+# on_event(stage_name, status, seconds) – status is "started", "done", "cached" or "failed"
+EventCallback = Callable[[str, str, float], None]
+
+_PLAIN = (str, int, float, bool, type(None))
+
+
+@dataclass
+class Stage:
+    """
+    One agent step: `func(*inputs)` produces `outputs` (a single value, or a
+    tuple when several outputs are declared). Inputs are names of initial
+    values or of other stages' outputs.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    memoize: bool = True
+
+
+@dataclass
+class _Memo:
+    inputs: Tuple  # keeps the input objects alive so their ids stay unique
+    values: Tuple
+
+
+def _input_key(value: Any) -> Any:
+    """Plain values compare by value, everything else (frames, agents) by identity."""
+    if isinstance(value, _PLAIN):
+        return (type(value).__name__, value)
+    if isinstance(value, (tuple, list)) and all(isinstance(v, _PLAIN) for v in value):
+        return (type(value).__name__, tuple(value))
+    return ("id", id(value))
+
+
+class Orchestrator:
+    """
+    Runs agent stages as a dependency graph. A stage starts as soon as all of
+    its inputs exist, so independent stages overlap on a thread pool and the
+    wall-clock time follows the critical path instead of the sum of stages.
+
+    Results are memoized per stage on its inputs: re-running with the same
+    data skips stages whose inputs did not change. Event callbacks are invoked
+    from the calling thread (safe for Streamlit placeholders).
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None, memo_size: int = 32):
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.producers: Dict[str, str] = {}
+        for stage in stages:
+            for out in stage.outputs:
+                if out in self.producers:
+                    raise ValueError(f"Output '{out}' is produced by both '{self.producers[out]}' and '{stage.name}'")
+                self.producers[out] = stage.name
+        self.max_workers = max_workers
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[Tuple, _Memo]" = OrderedDict()
+        # Seconds per stage of the last run; None for stages answered from the memo
+        self.timings: Dict[str, Optional[float]] = {}
+        self._check_acyclic()
+
+    def _deps(self, stage: Stage) -> List[str]:
+        return sorted({self.producers[i] for i in stage.inputs if i in self.producers})
+
+    def _check_acyclic(self) -> None:
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Cycle in stage graph: {' -> '.join(path + [name])}")
+            state[name] = 1
+            for dep in self._deps(self.stages[name]):
+                visit(dep, path + [name])
+            state[name] = 2
+
+        for name in self.stages:
+            visit(name, [])
+
+    # ------------------------------------------------------------------
+    def _memo_key(self, stage: Stage, args: Tuple) -> Tuple:
+        return (stage.name,) + tuple(_input_key(a) for a in args)
+
+    def _call(self, stage: Stage, args: Tuple) -> Tuple[Tuple, float]:
+        start = time.perf_counter()
+        result = stage.func(*args)
+        values = tuple(result) if len(stage.outputs) > 1 else (result,)
+        if len(values) != len(stage.outputs) and stage.outputs:
+            raise ValueError(f"Stage '{stage.name}' returned {len(values)} values for {stage.outputs}")
+        return values, time.perf_counter() - start
+
+    def required(self, targets: Sequence[str]) -> List[str]:
+        """`targets` plus every stage they depend on."""
+        needed: List[str] = []
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}'")
+            if name not in needed:
+                needed.append(name)
+                stack.extend(self._deps(self.stages[name]))
+        return needed
+
+    def run(
+        self,
+        initial: Dict[str, Any],
+        on_event: Optional[EventCallback] = None,
+        targets: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute the stages (all, or only what `targets` need) and return every
+        value: initial inputs plus stage outputs.
+        """
+        names = self.required(targets) if targets else list(self.stages)
+        missing = {
+            i for n in names for i in self.stages[n].inputs
+            if i not in initial and i not in self.producers
+        }
+        if missing:
+            raise ValueError(f"No initial value or stage provides: {sorted(missing)}")
+
+        emit = on_event or (lambda name, status, seconds: None)
+        values = dict(initial)
+        pending = {n: self.stages[n] for n in names}
+        running: Dict[Future, Tuple[Stage, Tuple]] = {}
+        self.timings = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                ready = [s for s in pending.values() if all(i in values for i in s.inputs)]
+                for stage in ready:
+                    del pending[stage.name]
+                    args = tuple(values[i] for i in stage.inputs)
+                    memo = self._memo.get(self._memo_key(stage, args)) if stage.memoize else None
+                    if memo is not None:
+                        self._memo.move_to_end(self._memo_key(stage, args))
+                        values.update(zip(stage.outputs, memo.values))
+                        self.timings[stage.name] = None
+                        emit(stage.name, "cached", 0.0)
+                        continue
+                    emit(stage.name, "started", 0.0)
+                    running[pool.submit(propagate(self._call), stage, args)] = (stage, args)
+                if ready and not running:
+                    continue  # cached stages may have unblocked others
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, args = running.pop(future)
+                    try:
+                        outputs, seconds = future.result()
+                    except Exception:
+                        emit(stage.name, "failed", 0.0)
+                        for other in running:
+                            other.cancel()
+                        raise
+                    values.update(zip(stage.outputs, outputs))
+                    self.timings[stage.name] = seconds
+                    if stage.memoize:
+                        self._remember(self._memo_key(stage, args), _Memo(args, outputs))
+                    emit(stage.name, "done", seconds)
+
+        if pending:
+            raise RuntimeError(f"Stages never became ready: {sorted(pending)}")
+        return values
+
+    def _remember(self, key: Tuple, memo: _Memo) -> None:
+        self._memo[key] = memo
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def clear(self) -> None:
+        self._memo.clear()
@@ -0,0 +1,216 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agents.aggregation import MONTH, AggregationPlan, AggregationResult, GroupStats, factorize
+from agents.instrumentation import span
+from agents.partitions import bucket_ids
+
+# Below this many rows the pool round-trip costs more than it saves
+PARALLEL_MIN_ROWS = 100_000
+
+# (array name, dtype, offset, length) of each column packed into the shared block
+Layout = List[Tuple[str, str, int, int]]
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def _pack(
+    arrays: Dict[str, np.ndarray], order: Optional[np.ndarray] = None,
+) -> Tuple[shared_memory.SharedMemory, Layout]:
+    """
+    Copy the arrays into one shared memory block (8-byte aligned), once –
+    gathered in `order` when given, straight into the block.
+    """
+    layout, offset = [], 0
+    for name, array in arrays.items():
+        layout.append((name, array.dtype.str, offset, len(array)))
+        offset += -(-array.nbytes // 8) * 8
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, start, length) in layout:
+        view = np.ndarray(length, dtype=dtype, buffer=block.buf, offset=start)
+        if order is None:
+            view[:] = arrays[name]
+        else:
+            np.take(arrays[name], order, out=view)
+    return block, layout
+
+
+def _views(block: shared_memory.SharedMemory, layout: Layout) -> Dict[str, np.ndarray]:
+    return {
+        name: np.ndarray(length, dtype=dtype, buffer=block.buf, offset=start)
+        for name, dtype, start, length in layout
+    }
+
+
+def _aggregate_shard(
+    block_name: str, layout: Layout, start: int, stop: int, sizes: Dict[str, int],
+    first_month: Optional[int] = None,
+) -> Tuple[Dict, Dict[str, Tuple[np.ndarray, ...]]]:
+    """
+    Worker: totals and per-key partials of one shard – rows [start, stop) of
+    the shard-sorted shared block, read as views. Keys are the parent's
+    global codes (month codes count from `first_month`), so partials from all
+    shards line up and merge by addition.
+    """
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        arrays = _views(block, layout)
+        values = arrays["__value"][start:stop]
+        valid = ~np.isnan(values)
+        weights = np.where(valid, values, 0.0)
+        dates = arrays["__date"][start:stop].view("datetime64[ns]") if "__date" in arrays else None
+
+        known = dates[~np.isnat(dates)] if dates is not None else np.empty(0, dtype="datetime64[ns]")
+        totals = {
+            "rows": stop - start,
+            "value_sum": float(weights.sum()),
+            "value_count": int(valid.sum()),
+            "date_min": known.min() if len(known) else None,
+            "date_max": known.max() if len(known) else None,
+        }
+        partials = {}
+        for name, n in sizes.items():
+            if name in arrays:
+                codes = arrays[name][start:stop]
+            else:  # month dimension – derived from the dates here rather than in the parent
+                codes = dates.astype("datetime64[M]").view(np.int64) - first_month
+                codes[np.isnat(dates)] = -1
+            has_key = codes >= 0
+            k = codes[has_key]
+            partials[name] = (
+                np.bincount(k, weights=weights[has_key], minlength=n),
+                np.bincount(k, weights=valid[has_key], minlength=n).astype(np.int64),
+                np.bincount(k, minlength=n),
+            )
+        return totals, partials
+    finally:
+        block.close()
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _aggregation_pool(workers: int) -> ProcessPoolExecutor:
+    """Long-lived pool shared by all runs – worker start-up is paid once per size."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False)
+            # spawn: workers never inherit server threads or the parent's tables
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def execute_parallel(
+    plan: AggregationPlan,
+    frame: pd.DataFrame,
+    workers: Optional[int] = None,
+    shard_column: str = "restaurant_id",
+    min_rows: int = PARALLEL_MIN_ROWS,
+) -> AggregationResult:
+    """
+    `plan.execute(frame)` across `workers` processes. Every grouping column is
+    factorized once here and the rows are ordered by shard
+    (crc32(`shard_column`) % workers, the partitioning hash) with one stable
+    sort; the codes, values and dates are gathered in that order into one
+    shared memory block, so each worker bincounts a contiguous [start, stop)
+    slice without any table being pickled. Only the per-key partials travel
+    back and are summed. Tables under `min_rows`, and a pool that cannot
+    start, run in-process.
+    """
+    global _POOL
+    workers = workers or default_workers()
+    if workers <= 1 or len(frame) < min_rows:
+        return plan.execute(frame)
+
+    has_value = plan.value in frame.columns
+    has_date = bool(plan.date) and plan.date in frame.columns
+    arrays = {
+        "__value": (
+            frame[plan.value].to_numpy(dtype=np.float64, na_value=np.nan)
+            if has_value else np.zeros(len(frame))
+        ),
+    }
+    first_month, months = 0, None
+    if has_date:
+        parsed = pd.to_datetime(frame[plan.date], errors="coerce")
+        arrays["__date"] = parsed.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        lo, hi = parsed.min(), parsed.max()
+        if not pd.isna(lo):
+            first_month = int(np.datetime64(lo, "M").view(np.int64))
+            months = pd.period_range(lo, hi, freq="M")
+    if shard_column in frame.columns:
+        shard = bucket_ids(frame[shard_column], workers).astype(np.int16)
+        order = np.argsort(shard, kind="stable")  # radix sort on int16
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(shard, minlength=workers))])
+    else:
+        # Already contiguous: equal row ranges in table order
+        order = None
+        bounds = np.arange(workers + 1) * len(frame) // workers
+
+    keys: Dict[str, pd.Index] = {}
+    for name, column in plan.dimensions.items():
+        if column == MONTH:
+            if not has_date:
+                continue
+            # Every calendar month in the date range; the workers compute the codes
+            keys[name] = months if months is not None else pd.PeriodIndex([], freq="M")
+        elif column in frame.columns:
+            codes, keys[name] = factorize(frame[column])
+            arrays[name] = codes
+        else:
+            continue
+    sizes = {name: len(index) for name, index in keys.items()}
+
+    with span("aggregation.parallel", workers=workers, rows=len(frame)):
+        block, layout = _pack(arrays, order)
+        try:
+            pool = _aggregation_pool(workers)
+            futures = [
+                pool.submit(
+                    _aggregate_shard, block.name, layout, int(bounds[i]), int(bounds[i + 1]), sizes, first_month,
+                )
+                for i in range(workers)
+            ]
+            shards = [future.result() for future in futures]
+        except (BrokenProcessPool, OSError) as e:
+            print(f"⚠ Aggregation pool unavailable ({e}) – aggregating in-process")
+            with _POOL_LOCK:
+                _POOL = None
+            return plan.execute(frame)
+        finally:
+            block.close()
+            block.unlink()
+
+    dates_min = [t["date_min"] for t, _ in shards if t["date_min"] is not None]
+    dates_max = [t["date_max"] for t, _ in shards if t["date_max"] is not None]
+    result = AggregationResult(
+        rows=sum(t["rows"] for t, _ in shards),
+        has_value=has_value,
+        value_sum=float(sum(t["value_sum"] for t, _ in shards)),
+        value_count=sum(t["value_count"] for t, _ in shards),
+        date_min=pd.Timestamp(min(dates_min)) if dates_min else None,
+        date_max=pd.Timestamp(max(dates_max)) if dates_max else None,
+    )
+    for name, index in keys.items():
+        parts = [p[name] for _, p in shards]
+        sums = np.sum([p[0] for p in parts], axis=0)
+        counts = np.sum([p[1] for p in parts], axis=0)
+        group_sizes = np.sum([p[2] for p in parts], axis=0)
+        observed = group_sizes > 0
+        result.groups[name] = GroupStats(index[observed], sums[observed], counts[observed], group_sizes[observed])
+    return result
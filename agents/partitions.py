@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import shutil
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agents.data_store import (
+    DEFAULT_CHUNK_ROWS, atomic_write_text, predicate_values, apply_schema,
+    columnar_available, iter_chunks, table_version,
+)
+from agents.instrumentation import span
+
+METADATA_FILE = "_metadata.json"
+NO_MONTH = "none"  # rows without a parseable date
+ROW_GROUP_ROWS = 16_384  # small row groups so city/date statistics can skip most of a file
+
+
+def default_root(source_path: str) -> str:
+    """Partitions live in a hidden directory next to the source files."""
+    return os.path.join(os.path.dirname(os.path.abspath(source_path)), ".partitions")
+
+
+def bucket_of(restaurant_id: Any, buckets: int) -> int:
+    return zlib.crc32(str(restaurant_id).encode()) % buckets
+
+
+def bucket_ids(values: pd.Series, buckets: int) -> np.ndarray:
+    """crc32(restaurant_id) % buckets per row – hashed once per distinct id."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    per_key = np.array([bucket_of(v, buckets) for v in uniques] + [0], dtype=np.int64)
+    return per_key[codes]  # missing ids (-1) go to bucket 0
+
+
+def _month_keys(dates: pd.Series) -> np.ndarray:
+    """YYYYMM as an integer per row, -1 for missing dates."""
+    keys = (dates.dt.year * 100 + dates.dt.month).to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(keys), -1, keys).astype(np.int64)
+
+
+def _month_label(key: int) -> str:
+    return NO_MONTH if key < 0 else f"{key // 100:04d}-{key % 100:02d}"
+
+
+def _timestamp(value) -> Optional[pd.Timestamp]:
+    return None if value is None else pd.Timestamp(value)
+
+
+class PartitionedStore:
+    """
+    Sales tables laid out as Parquet files under
+    `<root>/<table>/month=YYYY-MM/bucket=NN/`, where the bucket is
+    crc32(restaurant_id) % buckets. `_metadata.json` records, per partition,
+    its file, row count, date bounds and cities, so queries open only the
+    partitions that can match and summary facts (row counts, date range) are
+    answered without reading any rows. Rows inside a partition are sorted by
+    city and date, so filters on either skip whole row groups.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        path = os.path.join(root, METADATA_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.metadata = json.load(f)
+        else:
+            self.metadata = {"tables": {}}
+
+    # -------------------- BUILD --------------------
+    @classmethod
+    def ensure(
+        cls,
+        root: str,
+        sources: Dict[str, str],
+        buckets: int = 16,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    ) -> "PartitionedStore":
+        """Open the store at `root`, (re)partitioning only tables whose source changed."""
+        if not columnar_available():
+            raise RuntimeError("The partitioned store needs pyarrow (pip install pyarrow)")
+        store = cls(root)
+        for table, path in sources.items():
+            meta = store.metadata["tables"].get(table)
+            version = table_version(path)
+            if meta is None or meta["version"] != version or meta["buckets"] != buckets:
+                store._write_table(table, path, version, buckets, chunk_rows)
+        return store
+
+    def _write_table(self, table: str, path: str, version: str, buckets: int, chunk_rows: int) -> None:
+        directory = os.path.join(self.root, table)
+        shutil.rmtree(directory, ignore_errors=True)
+        partitions: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        columns: List[str] = []
+
+        for n, chunk in enumerate(iter_chunks(path, chunk_rows=chunk_rows)):
+            columns = list(chunk.columns)
+            keys = _month_keys(chunk["date"]) * buckets + bucket_ids(chunk["restaurant_id"], buckets)
+            order = np.argsort(keys, kind="stable")
+            uniques, starts = np.unique(keys[order], return_index=True)
+            for key, rows in zip(uniques, np.split(order, starts[1:])):
+                month, bucket = divmod(int(key), buckets) if key >= 0 else (-1, int(key) + buckets)
+                part = chunk.take(rows)
+                rel = os.path.join(table, f"month={_month_label(month)}", f"bucket={bucket:02d}")
+                os.makedirs(os.path.join(self.root, rel), exist_ok=True)
+                name = os.path.join(rel, f"part-{n:05d}.parquet")
+                part.to_parquet(os.path.join(self.root, name), index=False)
+
+                entry = partitions.setdefault((month, bucket), {
+                    "month": _month_label(month), "bucket": bucket, "file": rel, "rows": 0,
+                    "date_min": None, "date_max": None, "cities": [],
+                })
+                entry["rows"] += len(part)
+                if month >= 0:
+                    lo, hi = part["date"].min().isoformat(), part["date"].max().isoformat()
+                    entry["date_min"] = min(filter(None, [entry["date_min"], lo]))
+                    entry["date_max"] = max(filter(None, [entry["date_max"], hi]))
+                if "city" in part.columns:
+                    entry["cities"] = sorted(set(entry["cities"]) | set(part["city"].dropna().astype(str)))
+
+        for entry in partitions.values():
+            entry["file"] = self._compact(entry["file"])
+
+        dated = [p for p in partitions.values() if p["date_min"]]
+        self.metadata["tables"][table] = {
+            "source": os.path.abspath(path),
+            "version": version,
+            "buckets": buckets,
+            "columns": columns,
+            "rows": sum(p["rows"] for p in partitions.values()),
+            "date_min": min((p["date_min"] for p in dated), default=None),
+            "date_max": max((p["date_max"] for p in dated), default=None),
+            "partitions": [partitions[k] for k in sorted(partitions)],
+        }
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write_text(os.path.join(self.root, METADATA_FILE), json.dumps(self.metadata, indent=1))
+        print(f"🗂 Partitioned {os.path.basename(path)} into {len(partitions)} month/bucket partitions")
+
+    def _compact(self, rel: str) -> str:
+        """Merge a partition's per-chunk files into one file sorted by city and date."""
+        directory = os.path.join(self.root, rel)
+        parts = sorted(os.listdir(directory))
+        frame = pd.concat(
+            [pd.read_parquet(os.path.join(directory, name)) for name in parts], ignore_index=True,
+        )
+        keys = [c for c in ("city", "date") if c in frame.columns]
+        if keys:
+            frame = frame.sort_values(keys, kind="stable")
+        name = os.path.join(rel, "data.parquet")
+        frame.to_parquet(os.path.join(self.root, name), index=False, row_group_size=ROW_GROUP_ROWS)
+        for part in parts:
+            os.remove(os.path.join(directory, part))
+        return name
+
+    # -------------------- METADATA --------------------
+    def _table(self, table: str) -> Dict[str, Any]:
+        try:
+            return self.metadata["tables"][table]
+        except KeyError:
+            raise KeyError(f"Table '{table}' has not been partitioned under {self.root}") from None
+
+    def is_current(self, table: str, path: str) -> bool:
+        """Whether `table` was partitioned from the current contents of `path`."""
+        meta = self.metadata["tables"].get(table)
+        return meta is not None and meta["version"] == table_version(path)
+
+    def rows(self, table: str) -> int:
+        return self._table(table)["rows"]
+
+    def date_range(self, table: str) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """First and last date of `table`, from the partition metadata alone."""
+        meta = self._table(table)
+        return _timestamp(meta["date_min"]), _timestamp(meta["date_max"])
+
+    # -------------------- QUERIES --------------------
+    def partitions(
+        self,
+        table: str,
+        start=None,
+        end=None,
+        restaurants: Optional[Iterable[Any]] = None,
+        cities: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Partitions that can hold rows matching the filters (pruned on metadata only)."""
+        meta = self._table(table)
+        start, end = _timestamp(start), _timestamp(end)
+        wanted_buckets = None
+        if restaurants is not None:
+            wanted_buckets = {bucket_of(r, meta["buckets"]) for r in predicate_values(restaurants)}
+        wanted_cities = None if cities is None else {str(c) for c in predicate_values(cities)}
+
+        selected = []
+        for part in meta["partitions"]:
+            if start is not None or end is not None:
+                if part["date_min"] is None:
+                    continue
+                if start is not None and pd.Timestamp(part["date_max"]) < start:
+                    continue
+                if end is not None and pd.Timestamp(part["date_min"]) > end:
+                    continue
+            if wanted_buckets is not None and part["bucket"] not in wanted_buckets:
+                continue
+            if wanted_cities is not None and not wanted_cities.intersection(part["cities"]):
+                continue
+            selected.append(part)
+        return selected
+
+    def scan(
+        self,
+        table: str,
+        start=None,
+        end=None,
+        restaurants: Optional[Iterable[Any]] = None,
+        cities: Optional[Iterable[str]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Rows of `table` with start <= date <= end (either bound optional) for
+        the given restaurants / cities, reading only the matching partitions
+        and only `columns` from them. The filters are pushed into the Parquet
+        reader, so non-matching row groups are skipped.
+        """
+        meta = self._table(table)
+        parts = self.partitions(table, start, end, restaurants, cities)
+        filters = []
+        if start is not None:
+            filters.append(("date", ">=", _timestamp(start)))
+        if end is not None:
+            filters.append(("date", "<=", _timestamp(end)))
+        if restaurants is not None:
+            filters.append(("restaurant_id", "in", [str(r) for r in predicate_values(restaurants)]))
+        if cities is not None:
+            filters.append(("city", "in", [str(c) for c in predicate_values(cities)]))
+        read = meta["columns"] if columns is None else [c for c in meta["columns"] if c in columns]
+
+        with span("partitions.scan", table=table) as s:
+            if parts:
+                import pyarrow.parquet as pq
+                frame = pq.read_table(
+                    [os.path.join(self.root, part["file"]) for part in parts],
+                    columns=read, filters=filters or None,
+                ).to_pandas()
+            else:
+                frame = pd.DataFrame({c: [] for c in read})
+            frame = apply_schema(frame)
+            if columns is not None:
+                frame = frame[[c for c in columns if c in frame.columns]]
+            s.set(partitions=len(parts), of=len(meta["partitions"]), rows=len(frame))
+        return frame
+
+
+def open_partitions(
+    yelp_path: str,
+    menu_path: str,
+    root: Optional[str] = None,
+    buckets: int = 16,
+) -> PartitionedStore:
+    """Partitioned view of both sources, built on first use and refreshed when a source changes."""
+    return PartitionedStore.ensure(
+        root or default_root(menu_path), {"yelp": yelp_path, "menu": menu_path}, buckets,
+    )
+
+
+def existing_partitions(
+    yelp_path: str,
+    menu_path: str,
+    root: Optional[str] = None,
+) -> Optional[PartitionedStore]:
+    """
+    The partitioned view if it is already built for the current sources,
+    else None – never partitions anything (for callers that must stay cheap).
+    """
+    store = PartitionedStore(root or default_root(menu_path))
+    if store.is_current("yelp", yelp_path) and store.is_current("menu", menu_path):
+        return store
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the partitioned sales store.")
+    parser.add_argument("--yelp", default="data/Hybrid_Yelp_Restaurant_Sales.csv")
+    parser.add_argument("--menu", default="data/Menu_Sales_Data.csv")
+    parser.add_argument("--root", default=None, help="Defaults to .partitions next to the menu file")
+    parser.add_argument("--buckets", type=int, default=16)
+    args = parser.parse_args()
+
+    store = open_partitions(args.yelp, args.menu, args.root, args.buckets)
+    print(f"✅ Partitioned store ready at {store.root}")
+
+
+if __name__ == "__main__":
+    main()
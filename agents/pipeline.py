@@ -0,0 +1,135 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from agents.artifacts import RunArtifacts
+from agents.charts import ChartSpec
+from agents.orchestrator import Orchestrator, Stage
+from agents.query_planner import QueryPlan
+from agents.researcher import Researcher
+from agents.retriever import Retriever
+from agents.reviewer import ReviewResult, Reviewer
+from agents.rollup import RollupCube
+from agents.writer import DraftReport, Writer
+
+# Stage → agent shown in the UI status row
+STAGE_AGENTS = {
+    "retrieve": "Retriever",
+    "analyze": "Researcher",
+    "render": "Researcher",
+    "draft": "Writer",
+    "review": "Reviewer",
+}
+
+
+def retrieve(
+    yelp: pd.DataFrame, menu: pd.DataFrame, query: str, backend: str = "pandas",
+) -> Tuple[pd.DataFrame, QueryPlan, Optional[pd.Series]]:
+    """Retrieved rows, the query plan behind them and its top-N ranking (if asked for)."""
+    retriever = Retriever(yelp, menu, backend=backend)
+    retrieved = retriever.query(query or "")
+    return retrieved, retriever.plan, retriever.ranking
+
+
+def analyze(
+    yelp, menu, restaurant_filter, cube, backend: str = "pandas",
+) -> Tuple[Dict, List[ChartSpec], List[str], Researcher]:
+    """
+    Facts, chart specs and the paths the charts will be rendered to. Charts go
+    to the shared figure cache, so the result does not depend on the run and
+    is memoized across runs over the same tables. A rollup `cube` (or None)
+    answers the aggregation from pre-aggregated cells; otherwise it runs on
+    the execution `backend`.
+    """
+    researcher = Researcher(yelp, menu, restaurant_filter=restaurant_filter, cube=cube, backend=backend)
+    facts, specs = researcher.analyze()
+    return facts, specs, researcher.figure_paths(specs), researcher
+
+
+def render(researcher: Researcher, specs: List[ChartSpec]) -> List[str]:
+    return researcher.render(specs)
+
+
+def draft(facts: Dict, figures: List[str], artifacts: RunArtifacts) -> DraftReport:
+    return Writer(artifacts).draft(facts, figures)
+
+
+def review(reviewer: Reviewer, report: DraftReport, query: Optional[str]) -> ReviewResult:
+    text = report.markdown
+    if query:
+        text = (
+            f"{text}\n\n---\n\nUSER QUERY: {query}\n\nPlease review this report and ensure it "
+            "directly addresses the user's question. Provide specific, actionable recommendations."
+        )
+    try:
+        return reviewer.review(text)
+    except Exception as e:
+        # The draft is still worth showing – report the failure instead of losing the run
+        return ReviewResult(
+            feedback=f"LLM review encountered an error: {e}. Report returned as drafted.",
+            revised=report.markdown,
+            error=str(e),
+        )
+
+
+def report_pipeline(max_workers: Optional[int] = None) -> Orchestrator:
+    """
+    Retriever ∥ Researcher analysis, then chart rendering ∥ Writer, then Reviewer.
+    Chart paths are known once the analysis is done, so the draft does not wait
+    for the charts to be drawn. Initial values: yelp, menu, query,
+    restaurant_filter, cube, backend, artifacts and reviewer.
+    """
+    return Orchestrator(
+        [
+            Stage(
+                "retrieve", retrieve, ("yelp", "menu", "query", "backend"),
+                ("retrieved", "query_plan", "ranking"),
+            ),
+            Stage(
+                "analyze", analyze,
+                ("yelp", "menu", "restaurant_filter", "cube", "backend"),
+                ("facts", "chart_specs", "figures", "researcher"),
+            ),
+            # Not memoized: a cache hit is one stat per chart, and evicted charts get redrawn
+            Stage("render", render, ("researcher", "chart_specs"), ("rendered",), memoize=False),
+            Stage("draft", draft, ("facts", "figures", "artifacts"), ("draft",)),
+            # Not memoized: a failed review must be retried, and the Reviewer caches successful ones
+            Stage("review", review, ("reviewer", "draft", "query"), ("review",), memoize=False),
+        ],
+        max_workers=max_workers,
+    )
+
+
+def run_report(
+    yelp: pd.DataFrame,
+    menu: pd.DataFrame,
+    reviewer: Reviewer,
+    artifacts: RunArtifacts,
+    query: Optional[str] = None,
+    restaurant_filter: Any = None,
+    orchestrator: Optional[Orchestrator] = None,
+    on_event=None,
+    targets: Optional[Sequence[str]] = None,
+    cube: Optional[RollupCube] = None,
+    backend: str = "pandas",
+) -> Dict[str, Any]:
+    """
+    Run the report pipeline (only the stages `targets` need, default all);
+    pass a long-lived `orchestrator` to reuse memoized stages. `backend` is
+    the execution engine for retrieval and analysis (see agents.backends).
+    """
+    orchestrator = orchestrator or report_pipeline()
+    return orchestrator.run(
+        {
+            "yelp": yelp,
+            "menu": menu,
+            "query": query,
+            "restaurant_filter": restaurant_filter,
+            "cube": cube,
+            "backend": backend,
+            "artifacts": artifacts,
+            "reviewer": reviewer,
+        },
+        on_event=on_event,
+        targets=targets,
+    )
@@ -0,0 +1,427 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from agents.aggregation import AggregationPlan
+from agents.data_store import resolve_table, select_rows, table_columns
+from agents.join import DIMENSION_COLUMNS
+from agents.name_index import NameMatch, name_index_for, normalize_tokens
+
+# Keyword → intent, metric and ranking dimension (matched on normalized tokens)
+INTENT_WORDS = {
+    "menu": {"dish", "dishes", "menu", "item", "items", "food", "foods"},
+    "ratings": {"rating", "ratings", "review", "reviews", "yelp", "stars"},
+    "sales": {"revenue", "sales", "sale", "performance", "sold", "units", "orders", "earnings"},
+    "ranking": {"top", "best", "worst", "bottom", "highest", "lowest", "rank", "ranking"},
+    "trend": {"trend", "trends", "monthly", "weekly", "growth", "seasonal", "seasonality"},
+}
+METRIC_WORDS = {
+    "revenue": {"revenue", "sales", "earnings", "income"},
+    "units_sold": {"units", "quantity", "sold", "volume"},
+    "orders": {"orders"},
+    "yelp_rating": {"rating", "ratings", "stars", "reviews"},
+}
+GROUP_WORDS = {
+    "item_name": {"dish", "dishes", "item", "items", "menu"},
+    "category": {"category", "categories"},
+    "restaurant_name": {"restaurant", "restaurants", "location", "locations", "store", "stores"},
+    "city": {"city", "cities"},
+    "cuisine": {"cuisine", "cuisines"},
+}
+ASCENDING_WORDS = {"worst", "bottom", "lowest"}
+# Metrics that only exist on the Yelp table, and those ranked by mean rather than sum
+YELP_METRICS = {"orders", "yelp_rating"}
+MEAN_METRICS = {"yelp_rating"}
+DEFAULT_TOP_N = 10
+
+# Name dimensions resolved against the data, in match priority order
+NAME_DIMENSIONS = [
+    ("restaurants", "restaurant_name", "yelp"),
+    ("items", "item_name", "menu"),
+    ("categories", "category", "menu"),
+    ("cuisines", "cuisine", "yelp"),
+    ("cities", "city", "yelp"),
+]
+
+_MONTHS = {
+    name: i + 1 for i, names in enumerate([
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"),
+        ("may",), ("june", "jun"), ("july", "jul"), ("august", "aug"),
+        ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec"),
+    ]) for name in names
+}
+_ISO_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_RELATIVE = re.compile(r"\b(?:last|past|previous)\s+(\d+)?\s*(day|week|month|year)s?\b")
+_THIS = re.compile(r"\bthis\s+(week|month|year)\b")
+_MONTH_NAME = re.compile(
+    r"\b(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\b(?:\s+(\d{4}))?"
+)
+_TOP_N = re.compile(r"\b(?:top|best|worst|bottom|highest|lowest)\s+(\d+)\b")
+_START_WORDS = ("since", "after", "from")
+_END_WORDS = ("before", "until", "through", "to")
+
+
+def sql_literal(value: Any) -> str:
+    """SQL literal for a predicate value: numbers as-is, dates typed, the rest quoted."""
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return repr(value.item() if isinstance(value, np.generic) else value)
+    if isinstance(value, pd.Timestamp):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+@dataclass
+class QueryPlan:
+    """
+    Structured form of a natural-language query: which rows (restaurants,
+    cities, cuisines, categories, items, date range), which metric, and
+    whether and how to rank. Drives predicate pushdown and column projection
+    in the Retriever.
+    """
+    text: str
+    restaurants: List[str] = field(default_factory=list)
+    restaurant_ids: List[str] = field(default_factory=list)
+    cities: List[str] = field(default_factory=list)
+    cuisines: List[str] = field(default_factory=list)
+    categories: List[str] = field(default_factory=list)
+    items: List[str] = field(default_factory=list)
+    start: Optional[pd.Timestamp] = None
+    end: Optional[pd.Timestamp] = None
+    metric: str = "revenue"
+    top_n: Optional[int] = None
+    ascending: bool = False
+    group_by: Optional[str] = None
+    intents: List[str] = field(default_factory=list)
+
+    # -------------------- ROWS --------------------
+    @property
+    def needs_yelp(self) -> bool:
+        """Open-ended queries get the full joined view; specific ones only what they ask for."""
+        return not self.intents or "ratings" in self.intents or self.metric in YELP_METRICS
+
+    def predicates(self, table: str, available: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Equality predicates on `table` ("menu" or "yelp"), for the store's row indexes."""
+        preds: Dict[str, List[str]] = {}
+        if self.restaurant_ids and (available is None or "restaurant_id" in available):
+            preds["restaurant_id"] = list(self.restaurant_ids)
+        elif self.restaurants:
+            preds["restaurant_name"] = list(self.restaurants)
+        if self.cities:
+            preds["city"] = list(self.cities)
+        if self.cuisines:
+            preds["cuisine"] = list(self.cuisines)
+        if table == "menu":
+            if self.categories:
+                preds["category"] = list(self.categories)
+            if self.items:
+                preds["item_name"] = list(self.items)
+        if available is not None:
+            preds = {c: v for c, v in preds.items() if c in available}
+        return preds
+
+    def date_mask(self, frame: pd.DataFrame) -> Optional[np.ndarray]:
+        """Rows inside [start, end], or None when the plan has no date range."""
+        if (self.start is None and self.end is None) or "date" not in frame.columns:
+            return None
+        dates = frame["date"]
+        mask = np.ones(len(frame), dtype=bool)
+        if self.start is not None:
+            mask &= (dates >= self.start).to_numpy()
+        if self.end is not None:
+            mask &= (dates <= self.end).to_numpy()
+        return mask
+
+    def columns(self, table: str) -> List[str]:
+        """Columns `table` must provide – keys, predicate columns and what the intents need."""
+        cols = ["restaurant_id", "restaurant_name", "date", "city", "cuisine"]
+        if table == "menu":
+            cols += ["item_name", "category", "units_sold", "revenue"]
+            if "menu" in self.intents or not self.intents:
+                cols.append("unit_price")
+        else:
+            if "ratings" in self.intents or not self.intents:
+                cols += ["yelp_rating", "yelp_review_count", "price_tier"]
+            if self.metric in YELP_METRICS or "sales" in self.intents or not self.intents:
+                cols += ["revenue", "orders", "avg_order_value"]
+            if not self.intents:
+                cols += ["weather", "promotion"]
+            if self.metric == "yelp_rating":
+                cols.append("yelp_rating")
+        return list(dict.fromkeys(cols))
+
+    # -------------------- RANKING --------------------
+    def metric_column(self, frame: pd.DataFrame) -> Optional[str]:
+        """The metric's column in a retrieved frame (Yelp revenue is `revenue_restaurant` after a join)."""
+        if self.metric in frame.columns:
+            return self.metric
+        joined = f"{self.metric}_restaurant"
+        return joined if joined in frame.columns else None
+
+    def rank(self, frame: pd.DataFrame) -> Optional[pd.Series]:
+        """Top-N of `group_by` by the metric over `frame`'s rows, if the query asks for one."""
+        value = self.metric_column(frame)
+        if not self.top_n or not self.group_by or self.group_by not in frame.columns or value is None:
+            return None
+        stats = AggregationPlan(value=value, date=None).group_by(self.group_by).execute(frame).groups
+        if self.group_by not in stats:
+            return None
+        group = stats[self.group_by]
+        series = group.mean_series() if self.metric in MEAN_METRICS else group.sum_series()
+        series = series.dropna().sort_values(ascending=self.ascending, kind="stable")
+        return series.head(self.top_n)
+
+    # -------------------- DISPLAY --------------------
+    def describe(self) -> List[str]:
+        """Human-readable summary of the plan for the Retriever activity log."""
+        lines = []
+        labels = {
+            "menu": "🍽️ Menu data required",
+            "ratings": "⭐ Yelp ratings required",
+            "sales": "💰 Sales metrics required",
+            "ranking": "🏆 Ranking/sorting needed",
+            "trend": "📈 Trend over time",
+        }
+        lines += [labels[i] for i in self.intents]
+        for label, values in (
+            ("Restaurants", self.restaurants), ("Cities", self.cities), ("Cuisines", self.cuisines),
+            ("Categories", self.categories), ("Items", self.items),
+        ):
+            if values:
+                lines.append(f"🎯 {label}: {', '.join(values)}")
+        if self.start is not None or self.end is not None:
+            lo = self.start.date() if self.start is not None else "…"
+            hi = self.end.date() if self.end is not None else "…"
+            lines.append(f"📅 Dates: {lo} → {hi}")
+        if self.top_n:
+            order = "bottom" if self.ascending else "top"
+            lines.append(f"🔢 {order} {self.top_n} {self.group_by or 'rows'} by {self.metric}")
+        return lines
+
+    def _where_sql(self, table: str, alias: str, available: Optional[List[str]]) -> List[str]:
+        where = [
+            f"{alias}.{column} IN ({', '.join(sql_literal(v) for v in values)})"
+            for column, values in self.predicates(table, available).items()
+        ]
+        if available is None or "date" in available:
+            if self.start is not None:
+                where.append(f"{alias}.date >= {sql_literal(self.start)}")
+            if self.end is not None:
+                where.append(f"{alias}.date <= {sql_literal(self.end)}")
+        return where
+
+    def ranking_sql(self, available: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Top-N query over the table holding the metric (`available` = its
+        columns, when known), or None when the plan asks for no ranking.
+        """
+        if not self.top_n or not self.group_by:
+            return None
+        yelp_only = self.metric in YELP_METRICS
+        alias, table = ("y", "yelp") if yelp_only else ("m", "menu")
+        if available is not None and (self.group_by not in available or self.metric not in available):
+            return None
+        key, agg = f"{alias}.{self.group_by}", "AVG" if self.metric in MEAN_METRICS else "SUM"
+        where = self._where_sql(table, alias, available) + [f"{key} IS NOT NULL"]
+        return (
+            f"SELECT {key}, {agg}({alias}.{self.metric}) AS {self.metric}\n"
+            f"FROM {table} {alias}\n"
+            "WHERE " + "\n  AND ".join(where) + "\n"
+            f"GROUP BY {key}\n"
+            f"HAVING {agg}({alias}.{self.metric}) IS NOT NULL\n"
+            f"ORDER BY {self.metric} {'ASC' if self.ascending else 'DESC'}, {key}\n"
+            f"LIMIT {self.top_n}"
+        )
+
+    def rows_sql(
+        self,
+        menu_columns: Optional[List[str]] = None,
+        yelp_columns: Optional[List[str]] = None,
+        join: str = "daily",
+    ) -> str:
+        """
+        The retrieval as SQL over tables `menu` (m) and `yelp` (y): the same
+        rows and columns `Retriever` returns, given each table's columns.
+        """
+        menu_cols = [c for c in self.columns("menu") if menu_columns is None or c in menu_columns]
+        where = self._where_sql("menu", "m", menu_columns)
+        where_sql = "\nWHERE " + "\n  AND ".join(where) if where else ""
+        select = [f"m.{c}" for c in menu_cols]
+        if not self.needs_yelp:
+            return f"SELECT {', '.join(select)}\nFROM menu m{where_sql}"
+
+        yelp_cols = [c for c in self.columns("yelp") if yelp_columns is None or c in yelp_columns]
+        if join == "daily" and "date" in menu_cols and "date" in yelp_cols:
+            keys, source = ["restaurant_id", "date"], "yelp"
+        else:
+            # One row of restaurant attributes per restaurant
+            keys = ["restaurant_id"]
+            yelp_cols = [c for c in yelp_cols if c in DIMENSION_COLUMNS]
+            inner = self._where_sql("yelp", "yelp", yelp_columns)
+            source = (
+                f"(SELECT DISTINCT ON (restaurant_id) {', '.join(yelp_cols)} FROM yelp"
+                + (" WHERE " + " AND ".join(inner) if inner else "") + ")"
+            )
+        for c in yelp_cols:
+            if c in keys or c in menu_cols and c in DIMENSION_COLUMNS:
+                continue
+            select.append(f"y.{c} AS {c}_restaurant" if c in menu_cols else f"y.{c}")
+        on = " AND ".join(f"m.{k} = y.{k}" for k in keys)
+        return (
+            f"SELECT {', '.join(select)}\n"
+            "FROM menu m\n"
+            f"LEFT JOIN {source} y\n"
+            f"  ON {on}"
+            f"{where_sql}"
+        )
+
+    def to_sql(self) -> str:
+        """The plan as SQL – the ranking query when one is asked for, else the retrieval."""
+        return (self.ranking_sql() or self.rows_sql()) + ";"
+
+
+class QueryPlanner:
+    """
+    Turns a natural-language query into a QueryPlan. Names (restaurants,
+    items, categories, cuisines, cities) are resolved in one pass per
+    dimension through the shared NameIndexes; keywords are looked up on the
+    normalized token set; relative dates are anchored at the latest date in
+    the data.
+    """
+
+    def __init__(
+        self,
+        yelp: Union[str, pd.DataFrame],
+        menu: Union[str, pd.DataFrame],
+        anchor: Optional[pd.Timestamp] = None,
+        fuzzy_names: bool = False,
+    ):
+        self.tables = {"yelp": yelp, "menu": menu}
+        self.fuzzy_names = fuzzy_names
+        self._anchor = None if anchor is None else pd.Timestamp(anchor)
+
+    def _column(self, table: str, column: str) -> Optional[pd.Series]:
+        source = self.tables[table]
+        available = source.columns if isinstance(source, pd.DataFrame) else table_columns(source)
+        if column not in available:
+            return None
+        return resolve_table(source, [column])[column]
+
+    @property
+    def anchor(self) -> Optional[pd.Timestamp]:
+        """Latest date in the data – "last 30 days" counts back from here."""
+        if self._anchor is None:
+            dates = [self._column(t, "date") for t in ("menu", "yelp")]
+            latest = [d.max() for d in dates if d is not None and d.notna().any()]
+            self._anchor = max(latest) if latest else pd.Timestamp.today().normalize()
+        return self._anchor
+
+    # -------------------- PARSING --------------------
+    def _names(self, text: str) -> Dict[str, List[str]]:
+        """Longest non-overlapping name matches across dimensions (restaurants first)."""
+        candidates: List[Tuple[int, NameMatch, str]] = []
+        for priority, (attr, column, table) in enumerate(NAME_DIMENSIONS):
+            values = self._column(table, column)
+            if values is None:
+                continue
+            for match in name_index_for(values).find(text, fuzzy=self.fuzzy_names):
+                candidates.append((priority, match, attr))
+        candidates.sort(key=lambda c: (c[0] > 0, -(c[1].end - c[1].start), c[0], c[1].start))
+
+        taken: set = set()
+        found: Dict[str, List[str]] = {attr: [] for attr, _, _ in NAME_DIMENSIONS}
+        for _, match, attr in candidates:
+            span = set(range(match.start, match.end))
+            if span & taken:
+                continue
+            taken |= span
+            if match.value not in found[attr]:
+                found[attr].append(match.value)
+        return found
+
+    def _dates(self, text: str) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        day = pd.Timedelta(days=1)
+        isos = list(_ISO_DATE.finditer(text))
+        if len(isos) >= 2:
+            a, b = sorted(pd.Timestamp(m.group(1)) for m in isos[:2])
+            return a, b
+        if len(isos) == 1:
+            stamp = pd.Timestamp(isos[0].group(1))
+            before = text[:isos[0].start()].split()
+            word = before[-1] if before else ""
+            if word in _START_WORDS:
+                return stamp, None
+            if word in _END_WORDS:
+                return None, stamp
+            return stamp, stamp
+
+        anchor = self.anchor
+        relative = _RELATIVE.search(text)
+        if relative:
+            n = int(relative.group(1) or 1)
+            unit = relative.group(2)
+            if relative.group(1) is None and unit == "month":
+                # "last month" = the previous calendar month
+                first = (anchor.to_period("M") - 1).start_time
+                return first, (anchor.to_period("M") - 1).end_time.normalize()
+            offsets = {
+                "day": pd.Timedelta(days=n), "week": pd.Timedelta(weeks=n),
+                "month": pd.DateOffset(months=n), "year": pd.DateOffset(years=n),
+            }
+            return anchor - offsets[unit] + day, anchor
+        this = _THIS.search(text)
+        if this:
+            period = anchor.to_period({"week": "W", "month": "M", "year": "Y"}[this.group(1)])
+            return period.start_time, anchor
+        month = _MONTH_NAME.search(text)
+        # "may" alone is usually the verb – only read it as a month with a year
+        if month and (month.group(1) != "may" or month.group(2)):
+            number = _MONTHS[month.group(1)]
+            year = int(month.group(2)) if month.group(2) else (
+                anchor.year if number <= anchor.month else anchor.year - 1
+            )
+            period = pd.Period(year=year, month=number, freq="M")
+            return period.start_time, period.end_time.normalize()
+        return None, None
+
+    def plan(self, text: str) -> QueryPlan:
+        tokens = normalize_tokens(text)
+        words = set(tokens)
+        lowered = text.casefold()
+
+        intents = [name for name, keys in INTENT_WORDS.items() if words & keys]
+        metric = next(
+            (m for t in tokens for m, keys in METRIC_WORDS.items() if t in keys), "revenue"
+        )
+        group_by = next(
+            (g for t in tokens for g, keys in GROUP_WORDS.items() if t in keys), None
+        )
+        top = _TOP_N.search(lowered)
+        top_n = int(top.group(1)) if top else (DEFAULT_TOP_N if "ranking" in intents else None)
+
+        names = self._names(text)
+        start, end = self._dates(lowered)
+        plan = QueryPlan(
+            text=text,
+            start=start,
+            end=end,
+            metric=metric,
+            top_n=top_n,
+            ascending=bool(words & ASCENDING_WORDS),
+            group_by=group_by or (None if not top_n else (
+                "restaurant_name" if metric in YELP_METRICS else "item_name"
+            )),
+            intents=intents,
+            **names,
+        )
+        if plan.restaurants:
+            yelp = self.tables["yelp"]
+            frame = resolve_table(yelp, ["restaurant_id", "restaurant_name"])
+            if "restaurant_id" in frame.columns:
+                matched = select_rows(frame, {"restaurant_name": plan.restaurants})
+                plan.restaurant_ids = sorted(str(r) for r in matched["restaurant_id"].dropna().unique())
+        return plan
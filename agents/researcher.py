@@ -1,8 +1,17 @@
-import os
+import json
 import pandas as pd
-import matplotlib.pyplot as plt
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from agents.artifacts import RunArtifacts
+from agents.backends import get_backend, source_columns
+from agents.aggregation import MONTH, AggregationPlan, AggregationResult, IncrementalAggregator
+from agents.charts import ChartSpec, FigureCache, chart_paths, default_figure_cache, render_charts
+from agents.data_store import DEFAULT_CHUNK_ROWS, iter_chunks, predicate_values, resolve_table
+from agents.instrumentation import span, traced
+from agents.parallel import execute_parallel
+from agents.rollup import RollupCube
+from agents.sketches import MenuSketches
 
 @dataclass
 class ResearchOutput:
@@ -14,99 +23,366 @@ class Researcher:
     Researcher Agent – analyzes data and creates visual insights
     """
 
-    def __init__(self, yelp_path: str, menu_path: str, restaurant_filter: Optional[str] = None):
-        self.yelp_path = yelp_path
-        self.menu_path = menu_path
+    # Columns the analysis reads – only these are loaded from the columnar copy
+    MENU_COLUMNS = ["restaurant_id", "date", "item_name", "category", "promotion", "revenue"]
+    YELP_COLUMNS = ["restaurant_id", "date", "weather", "revenue"]
+
+    def __init__(
+        self,
+        yelp: Union[str, pd.DataFrame],
+        menu: Union[str, pd.DataFrame],
+        restaurant_filter: Union[None, str, Sequence[str], Dict[str, Any]] = None,
+        state_path: Optional[str] = None,
+        chart_workers: Optional[int] = None,
+        figure_cache: Optional[FigureCache] = None,
+        cache_figures: bool = True,
+        artifacts: Optional[RunArtifacts] = None,
+        streaming: bool = False,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        approximate: bool = False,
+        sketch_capacity: int = 64,
+        hll_precision: int = 12,
+        cube: Optional[RollupCube] = None,
+        backend="pandas",
+        parallel: int = 0,
+    ):
+        """
+        `restaurant_filter` narrows the analysis before any aggregation: a single
+        restaurant_id, a list of ids, or column predicates such as
+        {"city": "Boston", "cuisine": ["Pizza", "Sushi"]}. A predicate on a
+        column only one table has picks restaurants there, and both tables
+        are narrowed to those restaurants.
+        `state_path` persists running aggregates so later runs only fold in
+        rows dated after the previous run (for daily-appended exports). With
+        CSV paths as sources (and no sketches) the tables are not loaded at
+        all: each run reads only the bytes appended since the last one.
+        `chart_workers` sizes the chart render pool (0 renders in-process).
+        `figure_cache` stores rendered charts by content; unchanged charts are
+        reused instead of re-rendered (defaults to outputs/figure_cache).
+        With `cache_figures=False` charts are rendered into this run's own
+        `artifacts` directory instead.
+        With `streaming=True` and file paths as sources, the tables are never
+        loaded whole: they are read `chunk_rows` at a time and folded into
+        mergeable partial aggregates, so memory is bounded by the chunk size
+        (`state_path` is not used in this mode).
+        With `approximate=True`, item and category rankings come from
+        mergeable sketches instead of exact groupbys: HyperLogLog for
+        `unique_items` and Space-Saving (`sketch_capacity` counters) for the
+        top items and categories, fed `chunk_rows` at a time. Error bounds are
+        reported under facts["approximation"].
+        A `cube` (see agents.rollup) answers the aggregation from its
+        pre-aggregated cells whenever it covers every grouping (items and
+        categories included) and the filter;
+        results are exact, so no sketches are built in that case.
+        `backend` runs the aggregation on another engine ("duckdb", see
+        agents.backends) straight over the sources instead of loading them
+        here; an explicit backend is used even when a cube is given, and
+        streaming, sketches and `state_path` are pandas-only and are not
+        used then. `engine` records what answered ("rollup", "duckdb",
+        "pandas").
+        With `parallel=N` (N > 1) the in-memory aggregation is sharded by
+        restaurant_id hash across N worker processes that read the columns
+        from shared memory; their partials are merged into the same result
+        (see agents.parallel). Tables under 100k rows, streaming and
+        `state_path` runs stay in-process.
+        """
         self.restaurant_filter = restaurant_filter
-        self.yelp = pd.read_csv(yelp_path)
-        self.menu = pd.read_csv(menu_path)
+        self.state_path = state_path
+        self.chart_workers = chart_workers
+        self.figure_cache = (figure_cache or default_figure_cache()) if cache_figures else None
+        self.artifacts = artifacts or RunArtifacts()
+        where = self._filter_predicates(restaurant_filter)
+        self.backend = get_backend(backend)
+        native = self.backend.name == "pandas"
+        self._scope = json.dumps(where, sort_keys=True, default=str)
+        self.streaming = native and streaming and isinstance(yelp, str) and isinstance(menu, str)
+        self.chunk_rows = chunk_rows
+        self.approximate = native and approximate
+        self.sketch_capacity = sketch_capacity
+        self.hll_precision = hll_precision
+        self.sketches: Optional[MenuSketches] = None
+        self.cube = cube
+        self.parallel = parallel
+        self._sources = (yelp, menu)
+        self._yelp_where, self._menu_where = self._table_predicates(yelp, menu, where)
+        self._incremental_csv = (
+            native and bool(state_path) and not self.streaming and not self.approximate
+            and all(isinstance(s, str) and s.lower().endswith(".csv") for s in (yelp, menu))
+        )
+        if self.streaming or not native or self._incremental_csv:
+            self.yelp = self.menu = None
+        else:
+            # Shared tables from the DataStore – treated as read-only; the filter is
+            # pushed down through the store's row indexes
+            self.yelp = resolve_table(yelp, self.YELP_COLUMNS, self._yelp_where)
+            self.menu = resolve_table(menu, self.MENU_COLUMNS, self._menu_where)
+        self.engine: Optional[str] = None  # what answered the last aggregate()
         self.facts: Dict = {}
         self.figures: List[str] = []
-        os.makedirs("outputs", exist_ok=True)
         print("🔬 Researcher Agent initialized")
 
+    @staticmethod
+    def _filter_predicates(restaurant_filter) -> Dict[str, Any]:
+        if restaurant_filter is None or restaurant_filter == "":
+            return {}
+        if isinstance(restaurant_filter, dict):
+            return dict(restaurant_filter)
+        if isinstance(restaurant_filter, str):
+            return {"restaurant_id": [restaurant_filter]}
+        return {"restaurant_id": list(restaurant_filter)}
+
+    def _table_predicates(self, yelp, menu, where: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        (yelp, menu) predicates for `where`. A column only one table has is
+        resolved there to the matching restaurant_ids, which then narrow the
+        other table too – both tables always describe the same restaurants.
+        """
+        tables = {"yelp": yelp, "menu": menu}
+        columns = {name: set(source_columns(source)) for name, source in tables.items()}
+        predicates: Dict[str, Dict[str, Any]] = {name: {} for name in tables}
+        for column, values in (where or {}).items():
+            having = [name for name in tables if column in columns[name]]
+            if not having:
+                raise ValueError(f"Filter column '{column}' is in neither the Yelp nor the menu data")
+            for name in having:
+                predicates[name][column] = values
+        for name, other in (("yelp", "menu"), ("menu", "yelp")):
+            only_here = {c: v for c, v in predicates[name].items() if c not in columns[other]}
+            if not only_here:
+                continue
+            if not {"restaurant_id"} <= columns[name] & columns[other]:
+                raise ValueError(f"Cannot apply {sorted(only_here)} to both tables without restaurant_id")
+            ids = self._restaurant_ids(tables[name], only_here)
+            if "restaurant_id" in predicates[other]:
+                ids &= set(predicate_values(predicates[other]["restaurant_id"]))
+            predicates[other]["restaurant_id"] = sorted(ids, key=str)
+        return predicates["yelp"], predicates["menu"]
+
+    def _restaurant_ids(self, source, where: Dict[str, Any]) -> Set[Any]:
+        if isinstance(source, pd.DataFrame):
+            chunks = [resolve_table(source, where=where)]
+        else:  # chunked, so streaming runs never hold the table
+            chunks = iter_chunks(source, ["restaurant_id"], where, self.chunk_rows)
+        ids: Set[Any] = set()
+        for chunk in chunks:
+            ids.update(chunk["restaurant_id"].dropna().unique())
+        return ids
+
     # ------------------------------------------------------------------
-    def run(self) -> ResearchOutput:
-        """Main analysis pipeline"""
+    def _plans(self, sketched: bool = False) -> Tuple[AggregationPlan, AggregationPlan]:
+        """
+        Every grouping the run needs, declared up front – one scan per table.
+        With `sketched=True` items and categories are left to the sketches.
+        """
+        menu_plan = AggregationPlan(value="revenue", date="date")
+        dims = ("promotion",) if sketched else ("category", "item_name", "promotion")
+        for dim in dims:
+            menu_plan.group_by(dim)
+        menu_plan.group_by(MONTH)
+
+        yelp_plan = AggregationPlan(value="revenue", date="date")
+        yelp_columns = source_columns(self._sources[0]) if self.yelp is None else self.yelp.columns
+        weather_col = next((c for c in yelp_columns if "weather" in c.lower()), None)
+        if weather_col:
+            yelp_plan.group_by("weather", weather_col)
+        return menu_plan, yelp_plan
+
+    def aggregate(self) -> Tuple[AggregationResult, AggregationResult]:
+        menu_plan, yelp_plan = self._plans()
+        self.sketches = None
+        # An explicitly chosen engine wins over the cube
+        if self.backend.name != "pandas":
+            self.engine = self.backend.name
+            yelp, menu = self._sources
+            return (
+                self.backend.aggregate(menu, menu_plan, self._menu_where, self.MENU_COLUMNS),
+                self.backend.aggregate(yelp, yelp_plan, self._yelp_where, self.YELP_COLUMNS),
+            )
+        if self.cube is not None:
+            menu_cube, yelp_cube = self.cube.menu, self.cube.yelp
+            if menu_cube.covers(menu_plan, self._menu_where) and yelp_cube.covers(yelp_plan, self._yelp_where):
+                self.engine = "rollup"
+                return (
+                    menu_cube.execute(menu_plan, self._menu_where),
+                    yelp_cube.execute(yelp_plan, self._yelp_where),
+                )
+        self.engine = "pandas"
+        if self.approximate:
+            # Only the raw-row path ranks items and categories with sketches
+            menu_plan, yelp_plan = self._plans(sketched=True)
+            self.sketches = MenuSketches(self.sketch_capacity, self.hll_precision)
+        if self.streaming:
+            yelp_path, menu_path = self._sources
+            menu_chunks = iter_chunks(menu_path, self.MENU_COLUMNS, self._menu_where, self.chunk_rows)
+            return (
+                menu_plan.execute_chunks(self._sketched(menu_chunks)),
+                yelp_plan.execute_chunks(
+                    iter_chunks(yelp_path, self.YELP_COLUMNS, self._yelp_where, self.chunk_rows)
+                ),
+            )
+        if self.sketches is not None:
+            # Same bounded slices as streaming – one exact per-key pass over the
+            # whole table would make the sketch neither bounded nor approximate
+            for start in range(0, len(self.menu), self.chunk_rows):
+                self.sketches.update(self.menu.iloc[start:start + self.chunk_rows])
+        if not self.state_path:
+            if self.parallel > 1:
+                return (
+                    execute_parallel(menu_plan, self.menu, self.parallel),
+                    execute_parallel(yelp_plan, self.yelp, self.parallel),
+                )
+            return menu_plan.execute(self.menu), yelp_plan.execute(self.yelp)
+
+        state = IncrementalAggregator(self.state_path, scope=self._scope)
+        if self._incremental_csv:
+            yelp_path, menu_path = self._sources
+            menu_agg = state.fold_csv("menu", menu_plan, menu_path, self.MENU_COLUMNS, self._menu_where)
+            yelp_agg = state.fold_csv("yelp", yelp_plan, yelp_path, self.YELP_COLUMNS, self._yelp_where)
+        else:
+            menu_agg = state.fold("menu", menu_plan, self.menu)
+            yelp_agg = state.fold("yelp", yelp_plan, self.yelp)
+        state.save()
+        return menu_agg, yelp_agg
+
+    def _sketched(self, chunks):
+        for chunk in chunks:
+            if self.sketches is not None:
+                self.sketches.update(chunk)
+            yield chunk
+
+    def top_revenue(self, menu_agg: AggregationResult, dim: str, n: Optional[int] = None) -> Optional[pd.Series]:
+        """Revenue ranking of `dim` ("category" / "item_name"): exact, or from the sketches."""
+        if not menu_agg.has_value:
+            return None
+        if self.sketches is not None:
+            summary = self.sketches.top_categories if dim == "category" else self.sketches.top_items
+            top = summary.top(n)
+        elif dim in menu_agg.groups:
+            top = menu_agg.groups[dim].top(n)
+        else:
+            return None
+        return top if len(top) else None
+
+    def chart_specs(self, menu_agg: AggregationResult) -> List[ChartSpec]:
+        """Chart inputs from the aggregated series – no drawing happens here."""
+        groups = menu_agg.groups
+        specs = []
+        top_categories = self.top_revenue(menu_agg, "category", 10)
+        if top_categories is not None:
+            specs.append(ChartSpec.from_series(
+                top_categories, "top_categories_revenue.png", "bar",
+                "Top Categories by Revenue", xlabel="category",
+            ))
+        top_items = self.top_revenue(menu_agg, "item_name", 10)
+        if top_items is not None:
+            specs.append(ChartSpec.from_series(
+                top_items, "top_items_revenue.png", "bar",
+                "Top Menu Items by Revenue", xlabel="item_name", color="orange",
+            ))
+        if MONTH in groups and menu_agg.date_min is not None:
+            specs.append(ChartSpec.from_series(
+                groups[MONTH].sum_series(), "monthly_trend.png", "line",
+                "Monthly Revenue Trend", xlabel="date",
+            ))
+        return specs
+
+    # ------------------------------------------------------------------
+    @traced("researcher.analyze")
+    def analyze(self) -> Tuple[Dict, List[ChartSpec]]:
+        """Facts and chart specs – everything except drawing the charts."""
         try:
+            with span("researcher.aggregate") as s:
+                menu_agg, yelp_agg = self.aggregate()
+                s.set(rows=menu_agg.rows + yelp_agg.rows, engine=self.engine)
+            print(f"⚙️ Aggregated with {self.engine}")
+            groups = menu_agg.groups
+
             # ------------------------------------------------------------
             # 1️⃣ General Revenue Stats
-            if "revenue" in self.menu.columns:
-                total_rev = self.menu["revenue"].sum()
-                avg_rev = self.menu["revenue"].mean()
-                self.facts["total_revenue"] = float(total_rev)
-                self.facts["avg_revenue"] = float(avg_rev)
+            with span("researcher.stats"):
+                if menu_agg.has_value:
+                    self.facts["total_revenue"] = menu_agg.value_sum
+                    self.facts["avg_revenue"] = menu_agg.value_mean
+
+                self.facts["total_records"] = menu_agg.rows
+                if self.sketches is not None:
+                    self.facts["unique_items"] = int(round(self.sketches.items.estimate()))
+                elif "item_name" in groups:
+                    self.facts["unique_items"] = len(groups["item_name"])
 
-            self.facts["total_records"] = len(self.menu)
-            if "item_name" in self.menu.columns:
-                self.facts["unique_items"] = self.menu["item_name"].nunique()
+                if menu_agg.rows == 0:
+                    print("⚠ No menu rows match the restaurant filter")
 
             # ------------------------------------------------------------
             # 2️⃣ Top Categories and Items
-            if "category" in self.menu.columns and "revenue" in self.menu.columns:
-                top_cat = self.menu.groupby("category")["revenue"].sum().sort_values(ascending=False)
-                self.facts["top_category"] = top_cat.index[0]
-                self.facts["top_category_revenue"] = float(top_cat.iloc[0])
-
-                fig_path = os.path.join("outputs", "top_categories_revenue.png")
-                plt.figure(figsize=(8,4))
-                top_cat.head(10).plot(kind="bar", title="Top Categories by Revenue")
-                plt.tight_layout(); plt.savefig(fig_path); plt.close()
-                self.figures.append(fig_path)
-
-            if "item_name" in self.menu.columns and "revenue" in self.menu.columns:
-                top_items = self.menu.groupby("item_name")["revenue"].sum().sort_values(ascending=False).head(10)
-                fig_path = os.path.join("outputs", "top_items_revenue.png")
-                plt.figure(figsize=(8,4))
-                top_items.plot(kind="bar", color="orange", title="Top Menu Items by Revenue")
-                plt.tight_layout(); plt.savefig(fig_path); plt.close()
-                self.figures.append(fig_path)
+            with span("researcher.top_categories"):
+                top_cat = self.top_revenue(menu_agg, "category", 1)
+                if top_cat is not None:
+                    self.facts["top_category"] = top_cat.index[0]
+                    self.facts["top_category_revenue"] = float(top_cat.iloc[0])
 
             # ------------------------------------------------------------
             # 3️⃣ Monthly Trend (if date present)
-            if "date" in self.menu.columns:
-                self.menu["date"] = pd.to_datetime(self.menu["date"], errors="coerce")
-                monthly_rev = self.menu.groupby(self.menu["date"].dt.to_period("M"))["revenue"].sum()
-                fig_path = os.path.join("outputs", "monthly_trend.png")
-                plt.figure(figsize=(8,4))
-                monthly_rev.plot(kind="line", marker="o", title="Monthly Revenue Trend")
-                plt.tight_layout(); plt.savefig(fig_path); plt.close()
-                self.figures.append(fig_path)
-                self.facts["start_date"] = str(self.menu["date"].min().date())
-                self.facts["end_date"] = str(self.menu["date"].max().date())
+            with span("researcher.trend"):
+                if MONTH in groups and menu_agg.date_min is not None:
+                    self.facts["start_date"] = str(menu_agg.date_min.date())
+                    self.facts["end_date"] = str(menu_agg.date_max.date())
 
             # ------------------------------------------------------------
             # 4️⃣ Sales Optimization Add-on (NEW)
-            try:
-                # Promotion Effect
-                if "promotion" in self.menu.columns and "revenue" in self.menu.columns:
-                    promo_eff = (
-                        self.menu.groupby("promotion")["revenue"]
-                        .mean().rename({0: "No Promo", 1: "Promo"})
-                        .to_dict()
-                    )
-                    self.facts["promotion_effect"] = promo_eff
-
-                # Weather Impact
-                weather_col = next((c for c in self.yelp.columns if "weather" in c.lower()), None)
-                if weather_col and "revenue" in self.yelp.columns:
-                    weather_impact = self.yelp.groupby(weather_col)["revenue"].mean().to_dict()
-                    self.facts["weather_impact"] = weather_impact
-
-                # Cuisine Performance
-                if "category" in self.menu.columns:
-                    top_cuis = (
-                        self.menu.groupby("category")["revenue"]
-                        .sum().sort_values(ascending=False).head(5)
-                    )
-                    self.facts["top_cuisines"] = top_cuis.to_dict()
-            except Exception as e:
-                print(f"⚠ Sales optimization analysis skipped: {e}")
+            with span("researcher.optimization"):
+                try:
+                    # Promotion Effect
+                    if "promotion" in groups and menu_agg.has_value:
+                        promo_eff = (
+                            groups["promotion"].mean_series()
+                            .rename({0: "No Promo", 1: "Promo"})
+                            .to_dict()
+                        )
+                        self.facts["promotion_effect"] = promo_eff
+
+                    # Weather Impact
+                    if "weather" in yelp_agg.groups and yelp_agg.has_value:
+                        self.facts["weather_impact"] = yelp_agg.groups["weather"].mean_series().to_dict()
+
+                    # Cuisine Performance
+                    top_cuisines = self.top_revenue(menu_agg, "category", 5)
+                    if top_cuisines is not None:
+                        self.facts["top_cuisines"] = top_cuisines.to_dict()
+                except Exception as e:
+                    print(f"⚠ Sales optimization analysis skipped: {e}")
+
+            if self.sketches is not None:
+                self.facts["approximation"] = self.sketches.error_bounds()
 
-            # ------------------------------------------------------------
             print("✅ Research analysis complete")
-            return ResearchOutput(facts=self.facts, figures=self.figures)
+            return self.facts, self.chart_specs(menu_agg)
+
+        except Exception as e:
+            print(f"❌ Researcher error: {e}")
+            self.facts = {"error": str(e)}
+            return self.facts, []
+
+    def figure_paths(self, specs: List[ChartSpec]) -> List[str]:
+        """Paths `render` will produce, so a report can reference charts still being drawn."""
+        return chart_paths(specs, self.artifacts.directory, self.figure_cache)
+
+    @traced("researcher.render")
+    def render(self, specs: List[ChartSpec]) -> List[str]:
+        """Draw the charts concurrently (cached by content)."""
+        self.figures = render_charts(
+            specs, self.artifacts.directory,
+            max_workers=self.chart_workers, cache=self.figure_cache,
+        )
+        return self.figures
 
+    def run(self) -> ResearchOutput:
+        """Main analysis pipeline"""
+        facts, specs = self.analyze()
+        if "error" in facts:
+            return ResearchOutput(facts=facts, figures=[])
+        try:
+            return ResearchOutput(facts=facts, figures=self.render(specs))
         except Exception as e:
             print(f"❌ Researcher error: {e}")
             return ResearchOutput(facts={"error": str(e)}, figures=[])
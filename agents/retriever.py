@@ -1,6 +1,11 @@
 import pandas as pd
-import os
 from dataclasses import dataclass
+from typing import Optional, Union
+
+from agents.backends import get_backend
+from agents.instrumentation import annotate, traced
+from agents.join import DEFAULT_MAX_JOIN_ROWS
+from agents.query_planner import QueryPlan, QueryPlanner
 
 @dataclass
 class RetrieverOutput:
@@ -11,52 +16,57 @@ class Retriever:
     """
     Retriever Agent for MaRGen system.
     Reads data sources and filters relevant records based on user query.
+    Sources may be CSV paths or tables already loaded by the DataStore.
+    The query is parsed into a QueryPlan first; its predicates are applied
+    while loading (through the store's row indexes) and only the columns the
+    plan needs are read and joined. `backend` picks the execution engine
+    ("pandas", the reference, or "duckdb"; see agents.backends).
     """
 
-    def __init__(self, yelp_path: str, menu_path: str):
-        self.yelp_path = yelp_path
-        self.menu_path = menu_path
+    def __init__(
+        self,
+        yelp: Union[str, pd.DataFrame],
+        menu: Union[str, pd.DataFrame],
+        max_join_rows: int = DEFAULT_MAX_JOIN_ROWS,
+        fuzzy_names: bool = False,
+        backend="pandas",
+    ):
+        self.yelp = yelp
+        self.menu = menu
+        self.max_join_rows = max_join_rows
+        self.fuzzy_names = fuzzy_names
+        self.backend = get_backend(backend)
+        self.plan: Optional[QueryPlan] = None
+        self.ranking: Optional[pd.Series] = None
         print("🔎 Retriever Agent initialized")
 
     # --------------------------------------------------------------
-    def query(self, query_text: str) -> pd.DataFrame:
-        """Load data, detect restaurant mention, and join sources."""
-        yelp_df = pd.read_csv(self.yelp_path)
-        menu_df = pd.read_csv(self.menu_path)
-
-        # Normalize column names
-        yelp_df.columns = [c.lower().strip() for c in yelp_df.columns]
-        menu_df.columns = [c.lower().strip() for c in menu_df.columns]
-
-        # Try to detect a restaurant name in the query
-        restaurant_name = None
-        if "restaurant_name" in yelp_df.columns:
-            for name in yelp_df["restaurant_name"].dropna().unique():
-                if name.lower() in query_text.lower():
-                    restaurant_name = name
-                    break
-
-        # Apply restaurant filter if detected
+    @traced("retriever.query")
+    def query(self, query_text: str, join: str = "daily", plan: Optional[QueryPlan] = None) -> pd.DataFrame:
+        """
+        Plan the query, load only the matching rows and needed columns, and
+        join sources. `join` is "daily" (same restaurant and date) or
+        "dimension" (one row of restaurant attributes per menu row).
+        Pass `plan` to skip parsing; the plan used is kept on `self.plan` and
+        its top-N (if the query asks for one) on `self.ranking`, ranked over
+        the table that holds the metric before any join.
+        """
+        # Restaurants, cities, cuisines, categories, items, dates, metric, top-N
+        if plan is None:
+            plan = QueryPlanner(self.yelp, self.menu, fuzzy_names=self.fuzzy_names).plan(query_text)
+        self.plan = plan
+        restaurant_name = ", ".join(plan.restaurants) or None
         if restaurant_name:
             print(f"🎯 Filtering records for restaurant: {restaurant_name}")
-            yelp_df = yelp_df[yelp_df["restaurant_name"].str.lower() == restaurant_name.lower()]
-            menu_df = menu_df[menu_df["restaurant_name"].str.lower() == restaurant_name.lower()] \
-                if "restaurant_name" in menu_df.columns else menu_df
-
-        # Join data
-        join_key = "restaurant_id" if "restaurant_id" in yelp_df.columns else None
-        if join_key and join_key in menu_df.columns:
-            merged = menu_df.merge(yelp_df, on=join_key, how="left")
-        else:
-            # fallback join by restaurant name
-            merged = menu_df.merge(
-                yelp_df,
-                left_on="restaurant_name" if "restaurant_name" in menu_df.columns else None,
-                right_on="restaurant_name" if "restaurant_name" in yelp_df.columns else None,
-                how="left",
-            )
 
+        # Predicates and projection pushed into loading (or into the backend's SQL)
+        merged, self.ranking = self.backend.retrieve(
+            self.yelp, self.menu, plan, join=join, max_rows=self.max_join_rows,
+        )
         merged["restaurant_name_detected"] = restaurant_name
-        print(f"✅ Retrieved {len(merged)} records (restaurant filter: {restaurant_name or 'None'})")
-
+        annotate(rows=len(merged), backend=self.backend.name)
+        if plan.needs_yelp:
+            print(f"✅ Retrieved {len(merged)} records (restaurant filter: {restaurant_name or 'None'})")
+        else:
+            print(f"✅ Retrieved {len(merged)} menu records (plan: {', '.join(plan.describe()) or 'all'})")
         return merged
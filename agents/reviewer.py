@@ -1,41 +1,107 @@
-import subprocess
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from typing import List, Optional
+
+from agents.instrumentation import annotate, propagate, span, traced
+from agents.llm import get_llm
+from agents.llm_cache import CachedLLM, cached_llm
 
 @dataclass
 class ReviewResult:
     feedback: str
     revised: str
+    error: Optional[str] = None  # set when the LLM review failed and a fallback was returned
+
+# Bump whenever the prompt wording changes – invalidates cached reviews
+REVIEW_PROMPT_VERSION = "1"
+REVIEW_SYSTEM_PROMPT = (
+    "You are a senior business consultant. "
+    "Review and refine this report to make it more concise, professional, and actionable. "
+    "Keep structure and factual content intact."
+)
+SECTION_SYSTEM_PROMPT = (
+    "You are a senior business consultant. "
+    "Refine this one section of a longer report to make it more concise, professional, and actionable. "
+    "Keep its heading, structure and factual content intact. Return only the section."
+)
+CONSISTENCY_SYSTEM_PROMPT = (
+    "You are a senior business consultant checking a report outline for consistency. "
+    "Reply with at most three short bullet points on contradictions or gaps, or 'Consistent.'"
+)
+
+_SECTION_START = re.compile(r"^## ", re.MULTILINE)
+
+
+def split_sections(markdown: str) -> List[str]:
+    """
+    Split a report at its `## ` headings. The first element is the preamble
+    (title etc.) before the first section; joining the parts restores the text.
+    """
+    starts = [m.start() for m in _SECTION_START.finditer(markdown)]
+    bounds = [0] + starts + [len(markdown)]
+    return [markdown[a:b] for a, b in zip(bounds, bounds[1:]) if a != b or a == 0]
 
 class Reviewer:
     """
     Reviewer Agent – validates, refines, and improves the report tone.
     Falls back gracefully if the LLM call fails.
+
+    Uses a shared LLM client (`backend` = "http", "subprocess" or "fake");
+    the HTTP backend keeps the model loaded between reviews via `keep_alive`.
+    With `cache_path`, responses are cached on disk so repeat reviews of the
+    same draft return without a new generation.
+
+    Long reports (over `section_threshold` characters, or `mode="sections"`)
+    are reviewed map-reduce style: each `##` section goes to the LLM on a
+    bounded pool of `section_workers`, the results are stitched back in
+    order, and a short outline-only consistency pass runs at the end.
     """
 
-    def __init__(self, model="llama3.1"):
+    def __init__(
+        self,
+        model="llama3.1",
+        backend: str = "http",
+        llm=None,
+        keep_alive: Optional[str] = "30m",
+        timeout: float = 90,
+        cache_path: Optional[str] = None,
+        mode: str = "auto",
+        section_workers: int = 4,
+        section_threshold: int = 6000,
+    ):
         self.model = model
+        self.mode = mode
+        self.section_workers = section_workers
+        self.section_threshold = section_threshold
+        if llm is not None:
+            self.llm = llm
+        elif backend == "http":
+            self.llm = get_llm("http", model, keep_alive=keep_alive, timeout=timeout)
+        elif backend == "subprocess":
+            self.llm = get_llm("subprocess", model, timeout=timeout)
+        else:
+            self.llm = get_llm(backend, model)
+        self.cache: Optional[CachedLLM] = None
+        if cache_path:
+            self.cache = cached_llm(self.llm, cache_path, template_version=REVIEW_PROMPT_VERSION)
+            self.llm = self.cache
         print(f"🧠 Reviewer Agent initialized using model: {model}")
 
-    def review(self, report_text: str) -> ReviewResult:
+    @traced("reviewer.review")
+    def review(self, report_text: str, mode: Optional[str] = None) -> ReviewResult:
+        mode = mode or self.mode
+        annotate(chars=len(report_text), mode=mode)
+        sections = split_sections(report_text)
+        if mode == "sections" or (
+            mode == "auto" and len(report_text) > self.section_threshold
+        ):
+            if len(sections) > 2:
+                return self._review_sections(sections)
         try:
-            # Attempt Ollama call
-            prompt = (
-                "You are a senior business consultant. "
-                "Review and refine this report to make it more concise, professional, and actionable. "
-                "Keep structure and factual content intact.\n\n"
-                f"{report_text}"
-            )
+            revised = self.llm.chat(REVIEW_SYSTEM_PROMPT, report_text).strip()
 
-            result = subprocess.run(
-                ["ollama", "run", self.model],
-                input=prompt,
-                text=True,
-                capture_output=True,
-                timeout=90
-            )
-
-            if result.returncode == 0 and result.stdout.strip():
-                revised = result.stdout.strip()
+            if revised:
                 return ReviewResult(
                     feedback=f"✅ Review completed successfully using model `{self.model}`.",
                     revised=revised
@@ -59,4 +125,45 @@ class Reviewer:
                 + report_text
             )
 
-            return ReviewResult(feedback=feedback, revised=simulated)
+            return ReviewResult(feedback=feedback, revised=simulated, error=str(e))
+
+    # ------------------------------------------------------------------
+    def _review_section(self, section: str) -> Optional[str]:
+        try:
+            with span("reviewer.section", chars=len(section)):
+                revised = self.llm.chat(SECTION_SYSTEM_PROMPT, section).strip()
+            return revised or None
+        except Exception as e:
+            print(f"⚠️ Section review failed, keeping draft text: {e}")
+            return None
+
+    def _review_sections(self, sections: List[str]) -> ReviewResult:
+        """Map: review sections concurrently. Reduce: stitch in order + consistency pass."""
+        preamble, body = sections[0], sections[1:]
+        with ThreadPoolExecutor(max_workers=max(1, self.section_workers)) as pool:
+            reviewed = [f.result() for f in [pool.submit(propagate(self._review_section), s) for s in body]]
+
+        done = sum(r is not None for r in reviewed)
+        if done == 0:
+            return self.review("".join(sections), mode="single")
+
+        parts = [preamble] + [
+            (r + "\n\n") if r is not None else original
+            for r, original in zip(reviewed, body)
+        ]
+        revised = "".join(parts).rstrip() + "\n"
+
+        feedback = (
+            f"✅ Review completed successfully using model `{self.model}` "
+            f"({done}/{len(body)} sections reviewed in parallel)."
+        )
+        outline = "\n".join(
+            line for part in parts[1:] for line in part.splitlines()[:2] if line.strip()
+        )
+        try:
+            notes = self.llm.chat(CONSISTENCY_SYSTEM_PROMPT, outline).strip()
+            if notes:
+                feedback += f"\n\n**Consistency check:**\n{notes}"
+        except Exception as e:
+            print(f"⚠️ Consistency pass skipped: {e}")
+        return ReviewResult(feedback=feedback, revised=revised)
@@ -0,0 +1,181 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agents.aggregation import (
+    MONTH, AggregationPlan, AggregationResult, GroupStats, factorize, factorize_month, group_date_range,
+    group_stats,
+)
+from agents.data_store import DataStore, select_rows
+from agents.instrumentation import span
+
+# Dimensions rolled up per table (those missing from a table are skipped)
+MENU_DIMENSIONS = ["restaurant_id", "city", "cuisine", "category", "item_name", "promotion", MONTH]
+YELP_DIMENSIONS = ["restaurant_id", "city", "cuisine", "weather", "promotion", MONTH]
+
+_NAT = np.datetime64("NaT", "ns")
+
+
+def _roll_up(codes: np.ndarray, keys: pd.Index, cells: pd.DataFrame) -> GroupStats:
+    """GroupStats over pre-aggregated cells – bincounts of the cell sums instead of raw rows."""
+    has_key = codes >= 0
+    k = codes[has_key]
+    n = len(keys)
+    sums = np.bincount(k, weights=cells["sum"].to_numpy()[has_key], minlength=n)
+    counts = np.bincount(k, weights=cells["count"].to_numpy()[has_key], minlength=n)
+    sizes = np.bincount(k, weights=cells["size"].to_numpy()[has_key], minlength=n)
+    date_min, date_max = group_date_range(
+        codes, n,
+        cells["date_min"].to_numpy(dtype="datetime64[ns]"),
+        cells["date_max"].to_numpy(dtype="datetime64[ns]"),
+    )
+    observed = sizes > 0
+    return GroupStats(
+        keys[observed], sums[observed], counts[observed].astype(np.int64),
+        sizes[observed].astype(np.int64), date_min[observed], date_max[observed],
+    )
+
+
+@dataclass
+class Cuboid:
+    """
+    Base cuboid of one table: one cell per distinct combination of the
+    dimensions, holding the value sum / non-null count / row count and date
+    range of its rows. Any grouping over a subset of the dimensions (with
+    optional filters on them) is answered by rolling these cells up.
+    """
+    dimensions: List[str]
+    columns: List[str]  # of the source table – groupings on absent columns are skipped, as in a scan
+    cells: pd.DataFrame
+    value: str
+    has_value: bool
+    marginals: Dict[str, GroupStats]
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, dimensions: List[str], value: str = "revenue") -> "Cuboid":
+        has_date = "date" in frame.columns
+        dims = [d for d in dimensions if d in frame.columns or (d == MONTH and has_date)]
+        has_value = value in frame.columns
+        values = (
+            frame[value].to_numpy(dtype=np.float64, na_value=np.nan)
+            if has_value else np.zeros(len(frame))
+        )
+        valid = ~np.isnan(values)
+        dates = (
+            pd.to_datetime(frame["date"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+            if has_date else np.full(len(frame), _NAT)
+        )
+
+        # One combined key per row: fold each dimension's codes into the key so far
+        factorized = {d: factorize_month(frame["date"]) if d == MONTH else factorize(frame[d]) for d in dims}
+        cell = np.zeros(len(frame), dtype=np.int64)
+        for d in dims:
+            codes, keys = factorized[d]
+            cell, _ = pd.factorize(cell * (len(keys) + 1) + (codes + 1))
+        n_cells = int(cell.max()) + 1 if len(cell) else 0
+        stats = group_stats(cell, pd.RangeIndex(n_cells), values, valid, dates)
+
+        # Dimension values of each cell, taken from its first row
+        _, first = np.unique(cell, return_index=True)
+        cells = pd.DataFrame({
+            d: pd.Categorical.from_codes(factorized[d][0][first], categories=factorized[d][1])
+            for d in dims
+        })
+        cells["sum"], cells["count"], cells["size"] = stats.sums, stats.counts, stats.sizes
+        cells["date_min"], cells["date_max"] = stats.date_min, stats.date_max
+        cuboid = cls(dims, list(frame.columns), cells, value, has_value, {})
+        cuboid.marginals = {d: cuboid._group(cells, d) for d in dims}
+        return cuboid
+
+    def covers(self, plan: AggregationPlan, where: Optional[Dict[str, Any]] = None) -> bool:
+        return (
+            plan.value == self.value
+            and plan.date in (None, "date")
+            and all(
+                column in self.dimensions or (column != MONTH and column not in self.columns)
+                for column in plan.dimensions.values()
+            )
+            and all(column in self.dimensions for column in (where or {}))
+        )
+
+    def _group(self, cells: pd.DataFrame, column: str) -> GroupStats:
+        return _roll_up(cells[column].cat.codes.to_numpy(), cells[column].cat.categories, cells)
+
+    def execute(self, plan: AggregationPlan, where: Optional[Dict[str, Any]] = None) -> AggregationResult:
+        """The result `plan.execute` would give on the (filtered) raw rows, from the cells."""
+        if not self.covers(plan, where):
+            raise KeyError(f"Rollup over {self.dimensions} cannot answer this plan")
+        cells = select_rows(self.cells, where) if where else self.cells
+        dates = cells["date_min"].dropna(), cells["date_max"].dropna()
+        result = AggregationResult(
+            rows=int(cells["size"].sum()),
+            has_value=self.has_value,
+            value_sum=float(cells["sum"].sum()),
+            value_count=int(cells["count"].sum()),
+            date_min=dates[0].min() if len(dates[0]) else None,
+            date_max=dates[1].max() if len(dates[1]) else None,
+        )
+        for name, column in plan.dimensions.items():
+            if column not in self.dimensions:
+                continue
+            result.groups[name] = self.marginals[column] if not where else self._group(cells, column)
+        return result
+
+
+class RollupCube:
+    """
+    Materialized rollups of both tables for one dataset version. Built in one
+    pass over the rows; afterwards dashboard questions (revenue by category,
+    item, city, cuisine, weather, promotion or month, optionally for some
+    restaurants) cost time in the number of cells, not raw rows.
+    """
+
+    def __init__(self, version: str, menu: Cuboid, yelp: Cuboid):
+        self.version = version
+        self.menu = menu
+        self.yelp = yelp
+
+    @classmethod
+    def build(cls, store: DataStore) -> "RollupCube":
+        with span("rollup.build") as s:
+            cube = cls(
+                store.version,
+                Cuboid.build(store.menu, MENU_DIMENSIONS),
+                Cuboid.build(store.yelp, YELP_DIMENSIONS),
+            )
+            s.set(cells=len(cube.menu.cells) + len(cube.yelp.cells))
+        print(f"📦 Rollup cube built: {len(cube.menu.cells)} menu / {len(cube.yelp.cells)} Yelp cells")
+        return cube
+
+    def table(self, name: str) -> Cuboid:
+        return {"menu": self.menu, "yelp": self.yelp}[name]
+
+    def revenue_by(self, dimension: str, table: str = "menu", where: Optional[Dict[str, Any]] = None) -> pd.Series:
+        """Revenue per value of `dimension`, largest first."""
+        plan = AggregationPlan(value="revenue", date="date").group_by(dimension)
+        return self.table(table).execute(plan, where).groups[dimension].top()
+
+
+# (yelp path, menu path) -> (dataset version, cube): one entry per dataset
+_CUBES: Dict[Tuple[str, str], Tuple[str, RollupCube]] = {}
+_CUBES_LOCK = threading.Lock()
+
+
+def rollup_cube(store: DataStore) -> RollupCube:
+    """
+    The cube for the store's current dataset version, built on first use and
+    kept in memory. Each dataset (pair of source paths) keeps its own cube,
+    so switching datasets reuses it; a new version replaces only that
+    dataset's older cube.
+    """
+    key = (os.path.abspath(store.yelp_path), os.path.abspath(store.menu_path))
+    version = store.version
+    with _CUBES_LOCK:
+        entry = _CUBES.get(key)
+        if entry is None or entry[0] != version:
+            entry = _CUBES[key] = (version, RollupCube.build(store))
+        return entry[1]
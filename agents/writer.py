@@ -1,17 +1,23 @@
-import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
+from agents.artifacts import RunArtifacts
+from agents.instrumentation import annotate, traced
+
 @dataclass
 class DraftReport:
     markdown: str
+    path: Optional[str] = None
 
 class Writer:
     """Writer Agent – converts findings to executive reports"""
 
-    def __init__(self):
+    def __init__(self, artifacts: Optional[RunArtifacts] = None):
+        # When given, drafts are also saved as report_draft.md in the run's directory
+        self.artifacts = artifacts
         print("📝 Writer Agent initialized")
 
+    @traced("writer.draft")
     def draft(self, facts: Dict[str, Any], figures: List[str]) -> DraftReport:
         try:
             markdown_parts = []
@@ -64,7 +70,10 @@ class Writer:
             markdown_parts.append("1. Retriever – data collection \n2. Researcher – statistical analysis \n3. Writer – structured report generation \n4. Reviewer – LLM refinement")
             markdown_parts.append("\n\n*Auto-generated by Writer Agent*")
 
-            return DraftReport(markdown="\n".join(markdown_parts))
+            markdown = "\n".join(markdown_parts)
+            path = self.artifacts.write_text("report_draft.md", markdown) if self.artifacts else None
+            annotate(chars=len(markdown), figures=len(figures))
+            return DraftReport(markdown=markdown, path=path)
 
         except Exception as e:
             return DraftReport(markdown=f"# Error\n{e}")
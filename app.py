@@ -1,11 +1,17 @@
 import streamlit as st
 import os
+import contextlib
 import json
 import subprocess
-import pandas as pd
-from agents.retriever import Retriever
-from agents.researcher import Researcher
-from agents.writer import Writer
+from agents.artifacts import RunArtifacts
+from agents.backends import available_backends
+from agents.data_store import DataStore, table_version
+from agents.instrumentation import TRACER
+from agents.llm_cache import DEFAULT_CACHE_PATH
+from agents.partitions import existing_partitions
+from agents.pipeline import STAGE_AGENTS, report_pipeline, run_report
+from agents.researcher import ResearchOutput
+from agents.rollup import rollup_cube
 from agents.reviewer import Reviewer
 
 # -------------------- PAGE SETUP --------------------
@@ -28,22 +34,32 @@ st.markdown("""
 ### 🔗 Agent Workflow Chain
 ```mermaid
 graph LR
-A[Retriever Agent] --> B[Researcher Agent]
-B --> C[Writer Agent]
-C --> D[Reviewer Agent]
+A[Retriever Agent] --> D[Reviewer Agent]
+B[Researcher Agent] --> C[Writer Agent]
+B --> E[Chart Rendering]
+C --> D
 ```
 """)
 
 # -------------------- HELPERS --------------------
-@st.cache_data
 def load_and_validate_data(yelp_path, menu_path):
+    # DataStore keeps one parsed, typed copy per file and reloads it only when the file changes
     try:
-        yelp_df = pd.read_csv(yelp_path)
-        menu_df = pd.read_csv(menu_path)
-        return yelp_df, menu_df, None
+        store = DataStore(yelp_path, menu_path)
+        return store.yelp, store.menu, None
     except Exception as e:
         return None, None, str(e)
 
+@st.cache_resource(show_spinner=False)
+def menu_date_range(yelp_path, menu_path, version):
+    # Partition metadata when `python -m agents.partitions` has built it – never
+    # partitioned here; otherwise the loaded table. Cached per menu file version.
+    store = existing_partitions(yelp_path, menu_path)
+    if store is not None:
+        return store.date_range("menu")
+    dates = DataStore(yelp_path, menu_path).menu["date"]
+    return dates.min(), dates.max()
+
 def check_ollama_model(model_name):
     try:
         result = subprocess.run(['ollama', 'list'], capture_output=True, text=True, timeout=5)
@@ -71,6 +87,13 @@ if model_status is False:
 elif model_status is None:
     st.sidebar.info("ℹ️ Unable to verify Ollama (continuing offline).")
 
+backend = st.sidebar.selectbox(
+    "Execution backend",
+    available_backends(),
+    help="Engine for retrieval joins and aggregation – pandas is the reference, "
+         "DuckDB runs them as multi-threaded SQL over the columnar copies",
+)
+
 use_sample = st.sidebar.checkbox("Use sample data from /data", value=True)
 
 # -------------------- ANALYSIS SCOPE SELECTION --------------------
@@ -115,6 +138,12 @@ st.sidebar.info("💡 **More Query Ideas:**\n- Show top dishes\n- Compare restau
 # Agent Console
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🧠 Agent Console")
+# Per session: only this session's runs are timed, the process-wide tracer is left alone
+record_timings = st.sidebar.checkbox(
+    "⏱️ Record stage timings",
+    value=TRACER.enabled,
+    help="Time every agent step (wall/CPU time, memory, rows). Also enabled by MARGEN_TRACE=1."
+)
 console_log = st.sidebar.empty()
 
 # -------------------- DATA LOADING --------------------
@@ -146,6 +175,13 @@ if err:
     st.error(f"❌ Data load error: {err}")
     st.stop()
 
+# Pre-aggregated revenue cube – built once per dataset version, reused by every click
+try:
+    cube = rollup_cube(DataStore(yelp_path, menu_path))
+except Exception as e:
+    st.sidebar.warning(f"⚠️ Rollup cube unavailable, aggregating raw rows: {e}")
+    cube = None
+
 # -------------------- RESTAURANT SELECTION (AFTER DATA LOADS) --------------------
 if "Single Restaurant" in analysis_scope:
     st.sidebar.markdown("---")
@@ -211,17 +247,12 @@ with st.expander("📊 Data Overview", expanded=False):
     col2.metric("Menu Items", n_menu_items)
     col3.metric("Yelp Records", n_yelp_records)
     
-    # Date range - display as a proper formatted string
-    if 'date' in menu_df.columns:
-        try:
-            menu_df_temp = menu_df.copy()
-            menu_df_temp['date'] = pd.to_datetime(menu_df_temp['date'], errors='coerce')
-            min_date = menu_df_temp['date'].min()
-            max_date = menu_df_temp['date'].max()
-            col4.metric("Date Range", f"{min_date.strftime('%b %d, %Y')}")
-            col4.caption(f"to {max_date.strftime('%b %d, %Y')}")
-        except:
-            col4.metric("Date Range", "N/A")
+    try:
+        min_date, max_date = menu_date_range(yelp_path, menu_path, table_version(menu_path))
+        col4.metric("Date Range", f"{min_date.strftime('%b %d, %Y')}")
+        col4.caption(f"to {max_date.strftime('%b %d, %Y')}")
+    except Exception:
+        col4.metric("Date Range", "N/A")
     
     st.markdown("**Sample Data Preview:**")
     tab1, tab2 = st.tabs(["🍽️ Menu Data", "⭐ Yelp Data"])
@@ -230,6 +261,23 @@ with st.expander("📊 Data Overview", expanded=False):
     with tab2:
         st.dataframe(yelp_df.head(5), use_container_width=True)
 
+# Quick view – answered from the rollup cube, no raw rows scanned
+if cube is not None:
+    with st.expander("📦 Quick View: Revenue Breakdown", expanded=False):
+        dims = {
+            "menu": [d for d in cube.menu.dimensions if d != "restaurant_id"],
+            "yelp": [d for d in cube.yelp.dimensions if d != "restaurant_id"],
+        }
+        labels = {"menu": "menu items", "yelp": "daily sales"}
+        options = {f"{d} ({labels[t]})": (t, d) for t in ("menu", "yelp") for d in dims[t]}
+        table, dimension = options[st.selectbox("Revenue by:", list(options))]
+        where = {"restaurant_id": selected_restaurant} if selected_restaurant else None
+        breakdown = cube.revenue_by(dimension, table, where)
+        if dimension == "month":
+            st.line_chart(breakdown.sort_index().rename(index=str))
+        else:
+            st.bar_chart(breakdown.head(15).rename(index=str))
+
 # -------------------- MAIN UI --------------------
 st.subheader("🧭 Ask a Question or Request a Report")
 
@@ -275,70 +323,106 @@ for n in agent_status:
 
 # -------------------- MAIN WORKFLOW --------------------
 if st.button("🚀 Run Multi-Agent Workflow", type="primary", use_container_width=True):
-    # Create output directory for visualizations
-    os.makedirs("outputs", exist_ok=True)
+    # Each click gets its own output namespace so concurrent sessions don't clobber each other
+    artifacts = RunArtifacts()
+    st.session_state.run_id = artifacts.run_id
     
     progress = st.progress(0)
     step_note = st.empty()
     
     try:
+        # Agents run as a dependency graph: Retriever ∥ Researcher analysis, then
+        # chart rendering ∥ Writer, then Reviewer. Events arrive in this script thread.
+        if "pipeline" not in st.session_state:
+            st.session_state.pipeline = report_pipeline()
+        stage_notes = {
+            "retrieve": ("querying...", "Retriever Agent - Converting query to data retrieval..."),
+            "analyze": ("analyzing...", "Researcher Agent - Computing insights..."),
+            "render": ("rendering charts...", "Researcher Agent - Rendering visualizations..."),
+            "draft": ("drafting...", "Writer Agent - Drafting structured report..."),
+            "review": ("reviewing...", "Reviewer Agent - Quality assurance and refinement..."),
+        }
+        finished = set()
+
+        def on_event(stage, status, seconds):
+            agent = STAGE_AGENTS[stage]
+            if status == "started":
+                agent_status[agent].markdown(f"🟠 **{agent}**: {stage_notes[stage][0]}")
+                step_note.text(stage_notes[stage][1])
+            elif status == "failed":
+                agent_status[agent].markdown(f"🔴 **{agent}**: failed ❌")
+            else:
+                finished.add(stage)
+                if all(s in finished for s, a in STAGE_AGENTS.items() if a == agent):
+                    agent_status[agent].markdown(f"🟢 **{agent}**: ✅")
+                progress.progress(int(100 * len(finished) / len(STAGE_AGENTS)))
+
+        # This run's spans only – other sessions record into their own lists
+        trace = TRACER.collect() if record_timings else contextlib.nullcontext([])
+        with st.spinner(f"Agents working (Reviewer using {model})..."), trace as spans:
+            reviewer = Reviewer(model=model, cache_path=DEFAULT_CACHE_PATH)
+            results = run_report(
+                yelp_df, menu_df, reviewer, artifacts,
+                query=query,
+                restaurant_filter=selected_restaurant,
+                orchestrator=st.session_state.pipeline,
+                on_event=on_event,
+                cube=cube,
+                backend=backend,
+            )
+        retrieved_df = results["retrieved"]
+        query_plan, ranking = results["query_plan"], results["ranking"]
+        research = ResearchOutput(facts=results["facts"], figures=results["rendered"])
+        st.session_state.research_figures = research.figures
+        draft = results["draft"]
+        result = results["review"]
+        if result.error:
+            agent_status["Reviewer"].markdown("🔴 **Reviewer**: fell back to the draft ❌")
+        step_note.text("✅ All agents completed successfully!")
+
+        # Timing panel – spans recorded by the agents during this run
+        if spans:
+            TRACER.export_jsonl(artifacts.path("trace.jsonl"), spans)
+            with console_log.container():
+                st.markdown("**⏱️ Stage timings**")
+                st.dataframe(
+                    [
+                        {k: sp.get(k) for k in ("name", "wall_s", "cpu_s", "peak_rss_mb", "rows")}
+                        for sp in spans
+                    ],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+                st.caption(f"Full trace: `{artifacts.path('trace.jsonl')}`")
+
         # 1️⃣ RETRIEVER
         st.markdown("---")
-        agent_status["Retriever"].markdown("🟠 **Retriever**: querying...")
-        step_note.text("Step 1/4: Retriever Agent - Converting query to data retrieval...")
         
         with st.expander("🔍 Retriever Agent Activity Log", expanded=True):
             st.markdown("**Agent Reasoning:**")
             st.info(f"📝 Natural Language Query: `{query}`")
             
-            # Simulated query parsing
-            st.markdown("**Query Analysis:**")
-            query_lower = query.lower()
-            detected_intents = []
-            if any(word in query_lower for word in ['dish', 'menu', 'item', 'food']):
-                detected_intents.append("🍽️ Menu data required")
-            if any(word in query_lower for word in ['rating', 'review', 'yelp']):
-                detected_intents.append("⭐ Yelp ratings required")
-            if any(word in query_lower for word in ['revenue', 'sales', 'performance']):
-                detected_intents.append("💰 Sales metrics required")
-            if any(word in query_lower for word in ['top', 'best']):
-                detected_intents.append("🏆 Ranking/sorting needed")
-            
-            for intent in detected_intents:
-                st.markdown(f"- {intent}")
+            # Structured plan behind the retrieval
+            st.markdown("**Query Plan:**")
+            for line in query_plan.describe() or ["📋 No specific filters – full dataset view"]:
+                st.markdown(f"- {line}")
             
-            # SQL-like translation
-            st.markdown("**Generated Data Query:**")
-            sql_query = f"""
-SELECT m.*, y.rating, y.review_count
-FROM Menu_Sales_Data m
-LEFT JOIN Yelp_Restaurant_Sales y 
-  ON m.restaurant_id = y.business_id
-WHERE 1=1
-  {"AND category IN ('Main', 'Side', 'Drink')" if 'category' in query_lower else ""}
-  {"ORDER BY total_sales DESC" if 'top' in query_lower else ""}
-LIMIT 100;
-"""
-            st.code(sql_query, language="sql")
-            
-            # Execute retrieval
-            with st.spinner("Fetching data from databases..."):
-                retriever = Retriever(yelp_path, menu_path)
-                retrieved_df = retriever.query(query)
+            st.markdown("**Executed Data Query:**")
+            st.code(query_plan.to_sql(), language="sql")
             
             st.success(f"✅ Retrieved {len(retrieved_df)} records")
         
+        if ranking is not None and len(ranking):
+            order = "Bottom" if query_plan.ascending else "Top"
+            st.subheader(f"🏆 {order} {len(ranking)} {query_plan.group_by.replace('_', ' ')} by {query_plan.metric.replace('_', ' ')}")
+            st.bar_chart(ranking.rename(index=str))
+        
         st.subheader("📂 Retrieved Data Sample")
         st.dataframe(retrieved_df.head(20), use_container_width=True)
         st.caption(f"Showing first 20 of {len(retrieved_df)} total records")
         
-        agent_status["Retriever"].markdown("🟢 **Retriever**: ✅")
-        progress.progress(25)
-        
         # 2️⃣ RESEARCHER
         st.markdown("---")
-        agent_status["Researcher"].markdown("🟠 **Researcher**: analyzing...")
-        step_note.text("Step 2/4: Researcher Agent - Computing insights and visualizations...")
         
         with st.expander("📊 Researcher Agent Activity Log", expanded=True):
             st.markdown("**Agent Reasoning:**")
@@ -355,19 +439,8 @@ LIMIT 100;
             for step in analysis_steps:
                 st.markdown(f"- {step}")
             
-            with st.spinner("Running statistical analysis..."):
-                researcher = Researcher(yelp_path, menu_path, restaurant_filter=selected_restaurant)
-                research = researcher.run()
-                
-                # Store figures in session state
-                if hasattr(research, 'figures'):
-                    st.session_state.research_figures = research.figures
-            
             st.success("✅ Analysis complete - Generated insights and visualizations")
         
-        agent_status["Researcher"].markdown("🟢 **Researcher**: ✅")
-        progress.progress(50)
-        
         st.subheader("📊 Researcher Findings")
         
         # Display facts
@@ -430,8 +503,6 @@ LIMIT 100;
         
         # 3️⃣ WRITER
         st.markdown("---")
-        agent_status["Writer"].markdown("🟠 **Writer**: drafting...")
-        step_note.text("Step 3/4: Writer Agent - Drafting structured report...")
         
         with st.expander("📝 Writer Agent Activity Log", expanded=True):
             st.markdown("**Agent Reasoning:**")
@@ -449,22 +520,13 @@ LIMIT 100;
             for step in writing_steps:
                 st.markdown(f"- {step}")
             
-            with st.spinner("Composing report..."):
-                writer = Writer()
-                draft = writer.draft(research.facts, research.figures)
-            
             st.success("✅ Draft report generated")
         
         st.subheader("📝 Draft Report")
         st.markdown(draft.markdown, unsafe_allow_html=True)
         
-        agent_status["Writer"].markdown("🟢 **Writer**: ✅")
-        progress.progress(75)
-        
         # 4️⃣ REVIEWER
         st.markdown("---")
-        agent_status["Reviewer"].markdown("🟠 **Reviewer**: reviewing...")
-        step_note.text("Step 4/4: Reviewer Agent - Quality assurance and refinement...")
         
         with st.expander("🧠 Reviewer Agent Activity Log", expanded=True):
             st.markdown("**Agent Reasoning:**")
@@ -484,23 +546,21 @@ LIMIT 100;
             
             st.markdown(f"**Using LLM:** `{model}` via Ollama")
             
-            try:
-                with st.spinner(f"Reviewer analyzing with {model}..."):
-                    reviewer = Reviewer(model=model)
-                    review_input = f"{draft.markdown}\n\n---\n\nUSER QUERY: {query}\n\nPlease review this report and ensure it directly addresses the user's question. Provide specific, actionable recommendations."
-                    result = reviewer.review(review_input)
-                
-                st.success("✅ Review complete - Report refined")
-            except Exception as e:
-                result = type('obj', (object,), {
-                    'feedback': f"LLM review encountered an error: {str(e)}. Report returned as drafted.",
-                    'revised': draft.markdown
-                })()
+            if result.error:
                 st.error(result.feedback)
-        
-        agent_status["Reviewer"].markdown("🟢 **Reviewer**: ✅")
-        progress.progress(100)
-        step_note.text("✅ All agents completed successfully!")
+            else:
+                st.success("✅ Review complete - Report refined")
+            if reviewer.cache is not None:
+                stats = reviewer.cache.stats
+                st.caption(
+                    f"🗄️ Review cache: {stats['hits']} hits · {stats['misses']} misses · "
+                    f"{stats['entries']} entries"
+                )
+            timings = " · ".join(
+                f"{name} {'cached' if secs is None else f'{secs:.2f}s'}"
+                for name, secs in st.session_state.pipeline.timings.items()
+            )
+            st.caption(f"⏱️ Stage timings: {timings}")
         
         # Display final results
         st.markdown("---")
@@ -529,6 +589,8 @@ LIMIT 100;
         
         # Define final_report first
         final_report = result.revised if hasattr(result, 'revised') else draft.markdown
+        artifacts.write_text("report_final.md", final_report)
+        st.caption(f"🆔 Run `{artifacts.run_id}` – artifacts saved in `{artifacts.directory}`")
         
         # Add toggle to show draft vs final comparison
         show_comparison = st.checkbox("📊 Show Draft vs Final Comparison", value=False, key="comparison_toggle")
@@ -610,14 +672,9 @@ LIMIT 100;
             )
         
     except Exception as e:
+        # The failing agent is already marked 🔴 by on_event
         st.error(f"❌ Workflow Error: {str(e)}")
         st.exception(e)
-        
-        # Mark failed agent
-        for name, status in agent_status.items():
-            if "🟠" in str(status):
-                status.markdown(f"🔴 **{name}**: failed ❌")
-                break
 
 # -------------------- FOOTER --------------------
 st.markdown("---")
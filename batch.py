@@ -0,0 +1,215 @@
+"""
+Nightly batch mode – one report per restaurant_id.
+
+The datasets are loaded once and indexed by restaurant once in the parent
+process; Researcher + Writer then run per restaurant across a process pool
+(workers inherit the tables on fork, before any thread is started) and
+Reviewer calls are fed through a bounded queue to a few reviewer threads.
+Charts go to a figure cache under the output directory.
+
+    python batch.py --workers 4 --review-workers 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from agents.artifacts import RunArtifacts
+from agents.charts import FigureCache
+from agents.data_store import DataStore, row_index
+from agents.researcher import Researcher
+from agents.reviewer import Reviewer
+from agents.rollup import RollupCube, rollup_cube
+from agents.writer import Writer
+
+DATA_DIR = "data"
+OUT_DIR = "outputs"
+
+# Tables shared with worker processes (inherited on fork, loaded once on spawn)
+_YELP: Optional[pd.DataFrame] = None
+_MENU: Optional[pd.DataFrame] = None
+_ARTIFACTS: Optional[RunArtifacts] = None
+_CUBE: Optional[RollupCube] = None
+_FIGURE_CACHE: Optional[FigureCache] = None
+
+
+def _init_tables(yelp_path: str, menu_path: str, artifacts: RunArtifacts, figure_dir: str) -> None:
+    global _YELP, _MENU, _ARTIFACTS, _CUBE, _FIGURE_CACHE
+    store = DataStore(yelp_path, menu_path)
+    _YELP, _MENU, _ARTIFACTS = store.yelp, store.menu, artifacts
+    _FIGURE_CACHE = FigureCache(figure_dir)
+    # Per-restaurant aggregates are rolled up from the cube's cells, not raw rows
+    _CUBE = rollup_cube(store)
+    # Group by restaurant once – every per-restaurant filter is an index lookup
+    row_index(_YELP, "restaurant_id")
+    row_index(_MENU, "restaurant_id")
+    row_index(_CUBE.yelp.cells, "restaurant_id")
+    row_index(_CUBE.menu.cells, "restaurant_id")
+
+
+def _worker_ready() -> bool:
+    return True
+
+
+def _draft_one(restaurant_id: str) -> Dict:
+    """Researcher + Writer for one restaurant, run inside a worker process."""
+    start = time.perf_counter()
+    artifacts = _ARTIFACTS.child(restaurant_id)
+    research = Researcher(
+        _YELP, _MENU, restaurant_filter=restaurant_id, chart_workers=0, artifacts=artifacts,
+        cube=_CUBE, figure_cache=_FIGURE_CACHE,
+    ).run()
+    draft = Writer(artifacts).draft(research.facts, research.figures)
+    return {
+        "restaurant_id": restaurant_id,
+        "markdown": draft.markdown,
+        "error": research.facts.get("error"),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def restaurant_ids(yelp: pd.DataFrame, menu: pd.DataFrame) -> List[str]:
+    ids = set(yelp["restaurant_id"].dropna()) | set(menu["restaurant_id"].dropna())
+    return sorted(str(i) for i in ids)
+
+
+def run_batch(
+    yelp_path: str,
+    menu_path: str,
+    out_dir: str = OUT_DIR,
+    workers: Optional[int] = None,
+    review_workers: int = 2,
+    reviewer: Optional[Reviewer] = None,
+    limit: Optional[int] = None,
+) -> Dict:
+    """
+    Generate a reviewed report per restaurant into <out_dir>/runs/<run_id>/reports/.
+    `reviewer=None` keeps the drafts unreviewed. Restaurants whose analysis,
+    drafting or review fails get no report and are listed under "failed".
+    Returns a summary including throughput in reports per minute (also saved
+    as summary.json).
+    """
+    artifacts = RunArtifacts(out_dir)
+    print(f"🆔 Batch run ID: {artifacts.run_id}")
+    started = time.perf_counter()
+
+    figure_dir = os.path.join(out_dir, "figure_cache")
+    _init_tables(yelp_path, menu_path, artifacts, figure_dir)
+    ids = restaurant_ids(_YELP, _MENU)[:limit]
+    print(f"🏪 {len(ids)} restaurants to report on")
+    os.makedirs(os.path.join(artifacts.directory, "reports"), exist_ok=True)
+
+    # The pool's workers are started before any reviewer thread exists, so a
+    # forked worker never inherits a thread (or a lock one of them holds)
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods:
+        context, init = multiprocessing.get_context("fork"), None
+    else:
+        context, init = multiprocessing.get_context("spawn"), (yelp_path, menu_path, artifacts, figure_dir)
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_tables if init else None,
+        initargs=init or (),
+    )
+    for future in [pool.submit(_worker_ready) for _ in range(workers)]:
+        future.result()
+
+    # Reviewer stage: a bounded queue applies back-pressure to the drafting pool
+    pending: "queue.Queue" = queue.Queue(maxsize=max(1, review_workers) * 2)
+    written: List[str] = []
+    failed: List[str] = []
+    lock = threading.Lock()
+
+    def review_loop():
+        # Errors are recorded per item – the loop keeps draining so the producer never blocks
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            rid = item["restaurant_id"]
+            try:
+                text = item["markdown"]
+                if reviewer is not None:
+                    text = reviewer.review(text).revised
+                path = artifacts.write_text(os.path.join("reports", f"{rid}.md"), text)
+            except Exception as e:
+                print(f"❌ Review failed for {rid}: {e}")
+                with lock:
+                    failed.append(rid)
+                continue
+            with lock:
+                written.append(path)
+
+    threads = [threading.Thread(target=review_loop, daemon=True) for _ in range(max(1, review_workers))]
+    for t in threads:
+        t.start()
+
+    with pool:
+        futures = {pool.submit(_draft_one, rid): rid for rid in ids}
+        for future in as_completed(futures):
+            try:
+                item = future.result()
+            except Exception as e:
+                print(f"❌ Draft failed for {futures[future]}: {e}")
+                with lock:
+                    failed.append(futures[future])
+                continue
+            if item["error"]:
+                # A failed analysis drafts an error page – not worth reviewing or saving
+                print(f"❌ Research failed for {item['restaurant_id']}: {item['error']}")
+                with lock:
+                    failed.append(item["restaurant_id"])
+                continue
+            pending.put(item)
+
+    for _ in threads:
+        pending.put(None)
+    for t in threads:
+        t.join()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "run_id": artifacts.run_id,
+        "restaurants": len(ids),
+        "reports": len(written),
+        "failed": sorted(failed),
+        "seconds": round(elapsed, 3),
+        "reports_per_minute": round(len(written) * 60 / elapsed, 2) if elapsed else None,
+    }
+    artifacts.write_text("summary.json", json.dumps(summary, indent=2))
+    print(f"✅ {summary['reports']} reports in {elapsed:.1f}s ({summary['reports_per_minute']} reports/min)")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one report per restaurant.")
+    parser.add_argument("--yelp", default=os.path.join(DATA_DIR, "Hybrid_Yelp_Restaurant_Sales.csv"))
+    parser.add_argument("--menu", default=os.path.join(DATA_DIR, "Menu_Sales_Data.csv"))
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Researcher/Writer processes")
+    parser.add_argument("--review-workers", type=int, default=2, help="Concurrent Reviewer calls")
+    parser.add_argument("--model", default="llama3.1")
+    parser.add_argument("--no-review", action="store_true", help="Save drafts without review")
+    parser.add_argument("--limit", type=int, default=None, help="Only the first N restaurants")
+    args = parser.parse_args()
+
+    reviewer = None if args.no_review else Reviewer(model=args.model)
+    run_batch(
+        args.yelp, args.menu, args.out,
+        workers=args.workers, review_workers=args.review_workers,
+        reviewer=reviewer, limit=args.limit,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Synthetic data generator – same schema as data/Hybrid_Yelp_Restaurant_Sales.csv
+and data/Menu_Sales_Data.csv, at any size.
+
+The menu table has one row per (restaurant, day, item); the Yelp table one row
+per (restaurant, day). Rows are produced and appended in chunks, so even the
+50M tier never holds the whole table in memory.
+
+    python -m benchmarks.generate --tier 1m
+    python -m benchmarks.generate --rows 200000 --items 10 --days 90
+"""
+
+import argparse
+import base64
+import math
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+YELP_FILE = "Hybrid_Yelp_Restaurant_Sales.csv"
+MENU_FILE = "Menu_Sales_Data.csv"
+
+YELP_COLUMNS = [
+    "restaurant_id", "restaurant_name", "city", "state", "postal_code", "cuisine",
+    "yelp_rating", "yelp_review_count", "price_tier", "date", "day_of_week",
+    "is_weekend", "weather", "promotion", "revenue", "orders", "avg_order_value",
+]
+MENU_COLUMNS = [
+    "restaurant_id", "restaurant_name", "city", "cuisine", "date",
+    "item_name", "category", "unit_price", "units_sold", "revenue",
+]
+
+# Menu rows per tier
+TIERS: Dict[str, int] = {"10k": 10_000, "1m": 1_000_000, "50m": 50_000_000}
+
+# (item, category, unit price) – the sample data's catalogue
+CATALOGUE = [
+    ("Burger", "Main", 8.99), ("Chicken Sandwich", "Main", 9.49), ("Signature Dish", "Main", 12.99),
+    ("Pad Thai", "Main", 11.99), ("Pizza Slice", "Main", 3.99), ("Ramen", "Main", 12.49),
+    ("Fries", "Side", 3.49), ("Side Dish", "Side", 4.99), ("Garlic Knots", "Side", 4.49),
+    ("Coke", "Drink", 1.99), ("Drink", "Drink", 2.49), ("Coffee", "Drink", 2.99), ("Soda", "Drink", 1.99),
+    ("Nachos", "Appetizer", 6.99), ("Gyoza", "Appetizer", 6.49), ("Miso Soup", "Soup", 3.99),
+]
+CUISINES = ["Fast Food", "Pizza", "Sushi Bars", "Thai", "Mexican", "Italian", "Chinese", "American"]
+CITIES = ["Boston", "Brighton", "Cambridge", "Somerville", "Allston", "Brookline", "Quincy"]
+WEATHER = np.array(["Clear", "Clouds", "Rain"])
+PRICE_TIERS = np.array(["", "$", "$$", "$$$"], dtype=object)
+
+
+def _restaurants(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    ids = [
+        base64.urlsafe_b64encode(rng.bytes(16)).decode()[:22] for _ in range(n)
+    ]
+    return pd.DataFrame({
+        "restaurant_id": ids,
+        "restaurant_name": [f"RESTAURANT {i:06d}" for i in range(n)],
+        "city": rng.choice(CITIES, n),
+        "state": "MA",
+        "postal_code": rng.integers(2101, 2916, n),
+        "cuisine": rng.choice(CUISINES, n),
+        "yelp_rating": rng.integers(4, 11, n) / 2,
+        "yelp_review_count": rng.integers(5, 1600, n),
+        "price_tier": rng.choice(PRICE_TIERS, n),
+    })
+
+
+def generate(
+    out_dir: str,
+    rows: int,
+    restaurants: Optional[int] = None,
+    items: int = 8,
+    days: int = 60,
+    start: str = "2025-08-01",
+    seed: int = 0,
+    chunk_rows: int = 1_000_000,
+) -> Dict[str, str]:
+    """
+    Write both CSVs into `out_dir` and return their paths. `rows` is the menu
+    table size; unless `restaurants` is given it is derived from rows / (days × items).
+    """
+    items = min(items, len(CATALOGUE))
+    if restaurants is None:
+        restaurants = max(1, math.ceil(rows / (days * items)))
+    rng = np.random.default_rng(seed)
+    dims = _restaurants(restaurants, rng)
+    dates = pd.date_range(start, periods=days, freq="D")
+    day_names = dates.strftime("%a").to_numpy()
+    is_weekend = (dates.dayofweek >= 4).astype(np.int8)  # the sample counts Friday as weekend
+    date_text = dates.strftime("%Y-%m-%d").to_numpy()
+    menu_items = [CATALOGUE[i] for i in rng.choice(len(CATALOGUE), items, replace=False)]
+    item_names = np.array([i[0] for i in menu_items])
+    item_cats = np.array([i[1] for i in menu_items])
+    item_prices = np.array([i[2] for i in menu_items])
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {"yelp": os.path.join(out_dir, YELP_FILE), "menu": os.path.join(out_dir, MENU_FILE)}
+    per_restaurant = days * items
+    block = max(1, chunk_rows // per_restaurant)
+    written = 0
+    first = True
+
+    for lo in range(0, restaurants, block):
+        if written >= rows:
+            break
+        r = dims.iloc[lo:lo + block]
+        n = len(r)
+
+        # Yelp: one row per restaurant-day
+        ridx = np.repeat(np.arange(n), days)
+        didx = np.tile(np.arange(days), n)
+        orders = rng.integers(15, 132, n * days)
+        aov = np.round(rng.uniform(15, 35, n * days), 2)
+        yelp = r.iloc[ridx].reset_index(drop=True)
+        yelp["date"] = date_text[didx]
+        yelp["day_of_week"] = day_names[didx]
+        yelp["is_weekend"] = is_weekend[didx]
+        yelp["weather"] = WEATHER[rng.integers(0, len(WEATHER), n * days)]
+        yelp["promotion"] = (rng.random(n * days) < 0.06).astype(np.int8)
+        yelp["revenue"] = np.round(orders * aov, 2)
+        yelp["orders"] = orders
+        yelp["avg_order_value"] = aov
+        yelp[YELP_COLUMNS].to_csv(paths["yelp"], mode="w" if first else "a", header=first, index=False)
+
+        # Menu: one row per restaurant-day-item, truncated at `rows`
+        take = min(n * per_restaurant, rows - written)
+        ridx = np.repeat(np.arange(n), per_restaurant)[:take]
+        didx = np.tile(np.repeat(np.arange(days), items), n)[:take]
+        iidx = np.tile(np.arange(items), n * days)[:take]
+        units = rng.integers(10, 134, take)
+        menu = r[["restaurant_id", "restaurant_name", "city", "cuisine"]].iloc[ridx].reset_index(drop=True)
+        menu["date"] = date_text[didx]
+        menu["item_name"] = item_names[iidx]
+        menu["category"] = item_cats[iidx]
+        menu["unit_price"] = item_prices[iidx]
+        menu["units_sold"] = units
+        menu["revenue"] = np.round(item_prices[iidx] * units, 2)
+        menu[MENU_COLUMNS].to_csv(paths["menu"], mode="w" if first else "a", header=first, index=False)
+
+        written += take
+        first = False
+        print(f"🧪 {written:,}/{rows:,} menu rows written")
+    return paths
+
+
+def tier_dir(root: str, tier: str) -> str:
+    return os.path.join(root, tier)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Yelp + menu sales data.")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--tier", choices=sorted(TIERS))
+    size.add_argument("--rows", type=int)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "data"))
+    parser.add_argument("--restaurants", type=int, default=None)
+    parser.add_argument("--items", type=int, default=8)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = TIERS[args.tier] if args.tier else args.rows
+    out = tier_dir(args.out, args.tier or f"{rows}rows")
+    paths = generate(out, rows, args.restaurants, args.items, args.days, seed=args.seed)
+    print(f"✅ Wrote {paths['yelp']} and {paths['menu']}")
+
+
+if __name__ == "__main__":
+    main()
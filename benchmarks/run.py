@@ -0,0 +1,200 @@
+"""
+Benchmark suite – times each pipeline stage on synthetic data of a given tier,
+appends the results to a JSON-lines history and flags regressions against a
+stored baseline.
+
+    python -m benchmarks.run --tier 10k                  # generate if needed, run, compare
+    python -m benchmarks.run --tier 1m --update-baseline # record new reference timings
+    python -m benchmarks.run --tier 1m --parallel 4      # also time sharded aggregation
+
+Exit status is 1 when any stage is slower than baseline × (1 + threshold).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from agents.charts import render_charts
+from agents.data_store import DataStore, clear_cache
+from agents.instrumentation import Tracer
+from agents.join import join_menu_yelp
+from agents.researcher import Researcher
+from agents.retriever import Retriever
+from agents.writer import Writer
+from benchmarks.generate import MENU_FILE, TIERS, YELP_FILE, generate, tier_dir
+
+BENCH_DIR = "benchmarks"
+DATA_ROOT = os.path.join(BENCH_DIR, "data")
+HISTORY_PATH = os.path.join(BENCH_DIR, "history.jsonl")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+STAGES = ["load", "retrieval", "join", "aggregation", "charts", "drafting"]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _best(tracer: Tracer, name: str, func: Callable, repeat: int):
+    """Run `func` `repeat` times under a span; keep the fastest record and the last result."""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        with tracer.span(name) as s:
+            result = func()
+            if isinstance(result, pd.DataFrame):
+                s.set(rows=len(result))
+        runs.append(tracer.records()[-1])
+    best = min(runs, key=lambda r: r["wall_s"])
+    return {k: best[k] for k in ("wall_s", "cpu_s", "peak_rss_mb", "rows") if k in best}, result
+
+
+def run_suite(yelp_path: str, menu_path: str, repeat: int = 3, parallel: int = 0) -> Dict[str, Dict]:
+    """
+    Time each stage separately; every stage reuses the tables loaded by `load`.
+    With `parallel` > 1 the aggregation is also timed across that many worker
+    processes ("aggregation_parallel").
+    """
+    tracer = Tracer(enabled=True)
+    results: Dict[str, Dict] = {}
+    store = DataStore(yelp_path, menu_path)
+    store.menu  # first load writes the columnar copies – not part of the timed load
+
+    def load():
+        clear_cache()
+        return store.menu, store.yelp
+
+    results["load"], (menu, yelp) = _best(tracer, "load", load, repeat)
+    results["load"]["rows"] = len(menu) + len(yelp)
+
+    name = str(yelp["restaurant_name"].iloc[0])
+    results["retrieval"], _ = _best(
+        tracer, "retrieval",
+        lambda: Retriever(yelp, menu).query(f"Show top dishes at {name}"), repeat,
+    )
+    results["join"], _ = _best(
+        tracer, "join", lambda: join_menu_yelp(menu, yelp, max_rows=None), repeat,
+    )
+
+    researcher = Researcher(yelp, menu, cache_figures=False)
+    results["aggregation"], (menu_agg, _) = _best(tracer, "aggregation", researcher.aggregate, repeat)
+    results["aggregation"]["rows"] = menu_agg.rows
+    if parallel > 1:
+        sharded = Researcher(yelp, menu, cache_figures=False, parallel=parallel)
+        sharded.aggregate()  # starts the worker pool – not part of the timing
+        results["aggregation_parallel"], _ = _best(tracer, "aggregation_parallel", sharded.aggregate, repeat)
+        results["aggregation_parallel"]["rows"] = menu_agg.rows
+        results["aggregation_parallel"]["workers"] = parallel
+    facts, specs = researcher.analyze()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        results["charts"], figures = _best(
+            tracer, "charts", lambda: render_charts(specs, out_dir), repeat,
+        )
+        writer = Writer()
+        results["drafting"], _ = _best(
+            tracer, "drafting", lambda: writer.draft(facts, figures).markdown, repeat,
+        )
+    return results
+
+
+def compare(
+    current: Dict[str, Dict],
+    baseline: Dict[str, float],
+    threshold: float = 0.25,
+    min_delta: float = 0.05,
+) -> List[str]:
+    """Stages slower than baseline by more than `threshold` (relative) and `min_delta` seconds."""
+    regressions = []
+    for stage, stats in current.items():
+        ref = baseline.get(stage)
+        if ref is None:
+            continue
+        wall = stats["wall_s"]
+        if wall > ref * (1 + threshold) and wall - ref > min_delta:
+            regressions.append(f"{stage}: {wall:.3f}s vs baseline {ref:.3f}s (+{(wall / ref - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _load_json(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic data.")
+    parser.add_argument("--tier", choices=sorted(TIERS), default="10k")
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest counts")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--parallel", type=int, default=0, help="Also time aggregation across N processes")
+    args = parser.parse_args()
+
+    data_dir = tier_dir(args.data_root, args.tier)
+    yelp_path, menu_path = os.path.join(data_dir, YELP_FILE), os.path.join(data_dir, MENU_FILE)
+    if not (os.path.exists(yelp_path) and os.path.exists(menu_path)):
+        print(f"🧪 Generating {args.tier} tier into {data_dir}")
+        generate(data_dir, TIERS[args.tier])
+
+    print(f"⏱️ Benchmarking tier {args.tier} ({args.repeat} runs per stage)")
+    stages = run_suite(yelp_path, menu_path, repeat=args.repeat, parallel=args.parallel)
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tier": args.tier,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "stages": stages,
+    }
+    os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+    for stage, s in stages.items():
+        rows = f"{s['rows']:,} rows" if s.get("rows") is not None else ""
+        print(f"  {stage:<20} {s['wall_s']:>9.3f}s wall  {s['cpu_s']:>9.3f}s cpu  {rows}")
+    if "aggregation_parallel" in stages:
+        speedup = stages["aggregation"]["wall_s"] / stages["aggregation_parallel"]["wall_s"]
+        print(f"  ⇢ {args.parallel} workers: {speedup:.2f}x the single-process aggregation")
+
+    baselines = _load_json(args.baseline)
+    if args.update_baseline:
+        baselines[args.tier] = {stage: s["wall_s"] for stage, s in stages.items()}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"📌 Baseline for {args.tier} saved to {args.baseline}")
+        return
+
+    if args.tier not in baselines:
+        print("ℹ️ No baseline for this tier yet – run with --update-baseline to record one")
+        return
+    regressions = compare(stages, baselines[args.tier], args.threshold)
+    if regressions:
+        print("❌ Regressions:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
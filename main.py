@@ -1,30 +1,48 @@
-from agents.researcher import Researcher
-from agents.writer import Writer
+from agents.artifacts import RunArtifacts
+from agents.data_store import DataStore
+from agents.pipeline import report_pipeline
 from agents.reviewer import Reviewer
+from agents.rollup import rollup_cube
 import os
 
 DATA_DIR = "data"
 OUT_DIR = "outputs"
 
 def main():
-    yelp = os.path.join(DATA_DIR, "Hybrid_Yelp_Restaurant_Sales (1).csv")
+    yelp = os.path.join(DATA_DIR, "Hybrid_Yelp_Restaurant_Sales.csv")
     menu = os.path.join(DATA_DIR, "Menu_Sales_Data.csv")
+    store = DataStore(yelp, menu)
+    # Every run writes into outputs/runs/<run_id>/ so parallel runs don't collide
+    artifacts = RunArtifacts(OUT_DIR)
+    print(f"🆔 Run ID: {artifacts.run_id}")
 
-    print("🔍 Running Researcher...")
-    r = Researcher(yelp, menu, OUT_DIR).run()
-    print("Facts:", list(r.facts.keys()))
+    # Researcher analysis → chart rendering ∥ Writer draft → Reviewer
+    def on_event(stage, status, seconds):
+        if status == "done":
+            print(f"⏱️ {stage} finished in {seconds:.2f}s")
 
-    print("✍️ Writing draft...")
-    draft = Writer(OUT_DIR).draft(r.facts, r.figures)
-    print("Draft saved to:", draft.html_path)
+    pipeline = report_pipeline()
+    results = pipeline.run(
+        {
+            "yelp": store.yelp,
+            "menu": store.menu,
+            "query": None,
+            "restaurant_filter": None,
+            "cube": rollup_cube(store),
+            "backend": "pandas",
+            "artifacts": artifacts,
+            "reviewer": Reviewer(),
+        },
+        on_event=on_event,
+        targets=["render", "review"],
+    )
+    print("Facts:", list(results["facts"].keys()))
+    print("Draft saved to:", results["draft"].path)
 
-    print("🧠 Reviewing...")
-    reviewer = Reviewer()
-    result = reviewer.review(draft.markdown)
+    result = results["review"]
     print("\nFeedback:\n", result.feedback)
-    with open(os.path.join(OUT_DIR, "report_final.md"), "w", encoding="utf-8") as f:
-        f.write(result.revised)
-    print("✅ Final report saved in outputs/report_final.md")
+    final_path = artifacts.write_text("report_final.md", result.revised)
+    print(f"✅ Final report saved in {final_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,161 @@
+"""
+Tests for the Researcher aggregation engine
+Run from the PROJECT ROOT:
+    python -m pytest test_aggregation.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from agents.aggregation import MONTH, AggregationPlan, IncrementalAggregator, group_date_range
+from agents.data_store import DataStore, iter_chunks, select_rows
+
+
+def _store():
+    return DataStore("data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv")
+
+
+def _plan():
+    plan = AggregationPlan(value="revenue", date="date")
+    for dim in ("category", "item_name", "city"):
+        plan.group_by(dim)
+    return plan.group_by(MONTH)
+
+
+def test_plan_matches_pandas_groupby():
+    menu = _store().menu
+    result = _plan().execute(menu)
+
+    assert result.rows == len(menu)
+    assert np.isclose(result.value_sum, menu["revenue"].sum())
+    assert result.date_min == menu["date"].min()
+    for dim in ("category", "item_name", "city"):
+        expected = menu.groupby(dim, observed=True)["revenue"].agg(["sum", "mean"])
+        stats = result.groups[dim]
+        assert list(stats.keys) == list(expected.index)
+        assert np.allclose(stats.sums, expected["sum"])
+        assert np.allclose(stats.mean_series(), expected["mean"])
+
+    monthly = menu.groupby(menu["date"].dt.to_period("M"))["revenue"].sum()
+    assert result.groups[MONTH].sum_series().index.equals(monthly.index)
+    assert np.allclose(result.groups[MONTH].sums, monthly)
+
+
+def test_plan_handles_missing_keys_and_values():
+    frame = pd.DataFrame({
+        "category": ["Main", None, "Side", "Main"],
+        "revenue": [10.0, 5.0, np.nan, 2.0],
+        "date": pd.to_datetime(["2025-08-01", None, "2025-09-03", "2025-09-04"]),
+    })
+    result = _plan().execute(frame)
+
+    stats = result.groups["category"]
+    assert list(stats.keys) == ["Main", "Side"]
+    assert list(stats.sums) == [12.0, 0.0]
+    assert list(stats.counts) == [2, 0]
+    assert result.value_count == 3
+    assert [str(p) for p in result.groups[MONTH].keys] == ["2025-08", "2025-09"]
+    assert "item_name" not in result.groups
+
+
+def test_incremental_fold_matches_full_run(tmp_path):
+    menu = _store().menu
+    cutoff = menu["date"].max() - pd.Timedelta(days=7)
+    history, latest = menu[menu["date"] <= cutoff], menu
+
+    state_path = str(tmp_path / "state.json")
+    first = IncrementalAggregator(state_path)
+    first.fold("menu", _plan(), history)
+    first.save()
+
+    folded = IncrementalAggregator(state_path).fold("menu", _plan(), latest)
+    full = _plan().execute(latest, group_dates=True)
+
+    assert folded.rows == full.rows
+    assert np.isclose(folded.value_sum, full.value_sum)
+    assert folded.date_max == full.date_max
+    for dim in ("category", "item_name", MONTH):
+        assert list(folded.groups[dim].keys) == list(full.groups[dim].keys)
+        assert np.allclose(folded.groups[dim].sums, full.groups[dim].sums)
+        assert (folded.groups[dim].date_max == full.groups[dim].date_max).all()
+    # Facts and charts never read per-group dates, so a plain execute skips them
+    assert _plan().execute(latest).groups["category"].date_min is None
+
+
+def test_incremental_state_rebuilds_when_history_changes(tmp_path):
+    menu = _store().menu
+    state_path = str(tmp_path / "state.json")
+    state = IncrementalAggregator(state_path)
+    state.fold("menu", _plan(), menu)
+    state.save()
+
+    edited = menu.iloc[10:]  # rows removed from history, not appended
+    result = IncrementalAggregator(state_path).fold("menu", _plan(), edited)
+    assert result.rows == len(edited)
+
+
+def test_fold_csv_reads_only_appended_rows(tmp_path, monkeypatch):
+    lines = open("data/Menu_Sales_Data.csv", encoding="utf-8").read().splitlines(keepends=True)
+    csv = tmp_path / "menu.csv"
+    csv.write_text("".join(lines[:2001]), encoding="utf-8")
+    where = {"city": ["Boston", "Cambridge"]}
+    state_path = str(tmp_path / "state.json")
+    state = IncrementalAggregator(state_path)
+    state.fold_csv("menu", _plan(), str(csv), where=where)
+    state.save()
+
+    with open(csv, "a", encoding="utf-8") as f:
+        f.write("".join(lines[2001:]))
+    read = []
+    original = pd.read_csv
+    monkeypatch.setattr(pd, "read_csv", lambda *a, **k: read.append(a[0].getbuffer().nbytes) or original(*a, **k))
+    folded = IncrementalAggregator(state_path).fold_csv("menu", _plan(), str(csv), where=where)
+    monkeypatch.undo()
+    full = _plan().execute(select_rows(_store().menu, where), group_dates=True)
+
+    assert read == [len(lines[0].encode()) + len("".join(lines[2001:]).encode())]
+    assert (folded.rows, folded.date_max) == (full.rows, full.date_max)
+    assert np.isclose(folded.value_sum, full.value_sum)
+    for dim in ("category", "item_name", MONTH):
+        assert np.allclose(folded.groups[dim].sum_series().sort_index(), full.groups[dim].sum_series().sort_index())
+
+    csv.write_text("".join(lines[:1] + lines[2:]), encoding="utf-8")  # history edited
+    rebuilt = IncrementalAggregator(state_path).fold_csv("menu", _plan(), str(csv))
+    assert rebuilt.rows == len(lines) - 2
+
+
+def test_streaming_chunks_match_in_memory(tmp_path):
+    # Plain CSV copy (no columnar sidecar yet) read 500 rows at a time
+    csv = tmp_path / "menu.csv"
+    pd.read_csv("data/Menu_Sales_Data.csv").to_csv(csv, index=False)
+    where = {"city": ["Boston", "Cambridge"]}
+    streamed = _plan().execute_chunks(iter_chunks(str(csv), where=where, chunk_rows=500))
+    full = _plan().execute(select_rows(_store().menu, where))
+
+    assert (streamed.rows, streamed.date_min, streamed.date_max) == (full.rows, full.date_min, full.date_max)
+    assert np.isclose(streamed.value_sum, full.value_sum)
+    for name, stats in full.groups.items():
+        assert list(streamed.groups[name].keys) == list(stats.keys)
+        assert np.allclose(streamed.groups[name].sums, stats.sums)
+        assert (streamed.groups[name].sizes == stats.sizes).all()
+
+
+def test_group_date_range_skips_missing_codes_and_dates():
+    dates = pd.to_datetime(["2025-01-05", None, "2025-01-01", "2025-03-01", "2025-02-01", None]).to_numpy()
+    codes = np.array([0, 0, 0, 2, -1, 3])
+    date_min, date_max = group_date_range(codes, 4, dates)
+    assert list(pd.to_datetime(date_min)) == [pd.Timestamp("2025-01-01"), pd.NaT, pd.Timestamp("2025-03-01"), pd.NaT]
+    assert list(pd.to_datetime(date_max)) == [pd.Timestamp("2025-01-05"), pd.NaT, pd.Timestamp("2025-03-01"), pd.NaT]
+
+
+def test_researcher_state_on_csv_sources_skips_loading(tmp_path):
+    from agents.researcher import Researcher
+
+    yelp, menu = "data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv"
+    expected, _ = Researcher(yelp, menu, cache_figures=False).analyze()
+    for _ in range(2):  # build the state, then fold nothing new into it
+        researcher = Researcher(yelp, menu, state_path=str(tmp_path / "state.json"), cache_figures=False)
+        assert researcher.menu is None and researcher.yelp is None
+        facts, _ = researcher.analyze()
+        assert facts["top_category"] == expected["top_category"]
+        assert np.isclose(facts["total_revenue"], expected["total_revenue"])
@@ -0,0 +1,98 @@
+"""
+Tests for the execution backends – the DuckDB backend must match pandas
+Run from the PROJECT ROOT:
+    python -m pytest test_backends.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents.backends import get_backend
+from agents.data_store import DataStore
+from agents.researcher import Researcher
+from agents.retriever import Retriever
+from agents.rollup import rollup_cube
+
+pytest.importorskip("duckdb")
+
+YELP, MENU = "data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv"
+QUERIES = [
+    "Top 3 dishes by revenue in Boston between 2025-08-10 and 2025-08-20",
+    "Which restaurants have the best ratings in August?",
+    "Worst 5 categories by units sold last 30 days",
+    "Generate a business report",
+]
+
+
+def _sorted(frame: pd.DataFrame) -> pd.DataFrame:
+    columns = sorted(frame.columns)
+    frame = frame[columns].astype({c: object for c in columns if frame[c].dtype.name == "category"})
+    return frame.sort_values(columns).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("sources", ["paths", "frames"])
+@pytest.mark.parametrize("join", ["daily", "dimension"])
+def test_duckdb_retrieval_matches_pandas(sources, join):
+    if sources == "paths":
+        yelp, menu = YELP, MENU
+    else:
+        store = DataStore(YELP, MENU)
+        yelp, menu = store.yelp, store.menu
+    for query in QUERIES:
+        reference, duck = Retriever(yelp, menu), Retriever(yelp, menu, backend="duckdb")
+        expected, actual = reference.query(query, join=join), duck.query(query, join=join)
+        pd.testing.assert_frame_equal(_sorted(actual), _sorted(expected), check_dtype=False)
+        if reference.ranking is None:
+            assert duck.ranking is None
+        else:
+            assert list(duck.ranking.index) == list(reference.ranking.index)
+            np.testing.assert_allclose(duck.ranking.to_numpy(), reference.ranking.to_numpy())
+
+
+@pytest.mark.parametrize("restaurant_filter", [None, {"city": ["Boston", "Chicago"]}])
+def test_duckdb_aggregation_matches_pandas(restaurant_filter):
+    kwargs = dict(restaurant_filter=restaurant_filter, cache_figures=False)
+    reference = Researcher(YELP, MENU, **kwargs).aggregate()
+    duck = Researcher(YELP, MENU, backend="duckdb", **kwargs).aggregate()
+
+    for expected, actual in zip(reference, duck):
+        assert (actual.rows, actual.value_count) == (expected.rows, expected.value_count)
+        assert actual.value_sum == pytest.approx(expected.value_sum)
+        assert (actual.date_min, actual.date_max) == (expected.date_min, expected.date_max)
+        assert set(actual.groups) == set(expected.groups)
+        for name, stats in expected.groups.items():
+            got = actual.groups[name]
+            pd.testing.assert_series_equal(
+                got.sum_series().sort_index(), stats.sum_series().sort_index(), check_index_type=False,
+            )
+            assert list(got.sizes[np.argsort(got.keys)]) == list(stats.sizes[np.argsort(stats.keys)])
+
+
+def test_researcher_facts_match_across_backends():
+    facts = {}
+    for backend in ("pandas", "duckdb"):
+        researcher = Researcher(YELP, MENU, restaurant_filter={"city": "Boston"}, backend=backend, cache_figures=False)
+        facts[backend], _ = researcher.analyze()
+    assert facts["duckdb"].keys() == facts["pandas"].keys()
+    assert facts["duckdb"]["total_revenue"] == pytest.approx(facts["pandas"]["total_revenue"])
+    assert facts["duckdb"]["top_category"] == facts["pandas"]["top_category"]
+    assert facts["duckdb"]["weather_impact"] == pytest.approx(facts["pandas"]["weather_impact"])
+
+
+def test_explicit_backend_wins_over_cube():
+    store = DataStore(YELP, MENU)
+    cube = rollup_cube(store)
+    engines = {}
+    for backend in ("pandas", "duckdb"):
+        researcher = Researcher(store.yelp, store.menu, cube=cube, backend=backend, cache_figures=False)
+        researcher.aggregate()
+        engines[backend] = researcher.engine
+    assert engines == {"pandas": "rollup", "duckdb": "duckdb"}
+
+
+def test_get_backend_shares_instances_and_rejects_unknown_names():
+    assert get_backend("duckdb") is get_backend("duckdb")
+    assert get_backend(None).name == "pandas"
+    with pytest.raises(ValueError):
+        get_backend("sqlite")
@@ -0,0 +1,39 @@
+"""
+Tests for the nightly batch runner
+Run from the PROJECT ROOT:
+    python -m pytest test_batch.py
+"""
+
+import os
+import threading
+from types import SimpleNamespace
+
+from batch import run_batch
+
+
+class _FirstCallFails:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def review(self, text):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            raise RuntimeError("reviewer offline")
+        return SimpleNamespace(revised=text)
+
+
+def test_review_failures_are_recorded_and_the_batch_finishes(tmp_path):
+    out = str(tmp_path / "out")
+    summary = run_batch(
+        "data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv", out,
+        workers=2, review_workers=1, reviewer=_FirstCallFails(), limit=4,
+    )
+    assert summary["restaurants"] == 4
+    assert summary["reports"] == 3 and len(summary["failed"]) == 1
+    reports = os.listdir(os.path.join(out, "runs", summary["run_id"], "reports"))
+    assert len(reports) == 3 and f"{summary['failed'][0]}.md" not in reports
+    # Charts are cached under the chosen output directory, not ./outputs
+    assert os.listdir(os.path.join(out, "figure_cache"))
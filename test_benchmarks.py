@@ -0,0 +1,31 @@
+"""
+Tests for the synthetic data generator and regression check
+Run from the PROJECT ROOT:
+    python -m pytest test_benchmarks.py
+"""
+
+import pandas as pd
+
+from agents.data_store import DataStore
+from benchmarks.generate import MENU_COLUMNS, YELP_COLUMNS, generate
+from benchmarks.run import compare
+
+
+def test_generator_matches_sample_schema(tmp_path):
+    paths = generate(str(tmp_path), rows=1000, items=5, days=10, chunk_rows=300)
+    sample_menu = pd.read_csv("data/Menu_Sales_Data.csv", nrows=1)
+    sample_yelp = pd.read_csv("data/Hybrid_Yelp_Restaurant_Sales.csv", nrows=1)
+    assert list(sample_menu.columns) == MENU_COLUMNS
+    assert list(sample_yelp.columns) == YELP_COLUMNS
+
+    store = DataStore(paths["yelp"], paths["menu"])
+    assert len(store.menu) == 1000
+    assert len(store.yelp) == store.menu["restaurant_id"].nunique() * 10
+    assert not store.menu.duplicated(["restaurant_id", "date", "item_name"]).any()
+
+
+def test_compare_flags_only_real_slowdowns():
+    current = {"join": {"wall_s": 2.0}, "load": {"wall_s": 0.06}, "new": {"wall_s": 9.0}}
+    baseline = {"join": 1.0, "load": 0.01}
+    regressions = compare(current, baseline, threshold=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("join")
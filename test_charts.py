@@ -0,0 +1,60 @@
+"""
+Tests for chart rendering pools and the figure cache
+Run from the PROJECT ROOT:
+    python -m pytest test_charts.py
+"""
+
+import os
+import time
+
+from agents import charts
+
+
+def test_render_pool_is_kept_per_size():
+    small, large = charts._render_pool(2), charts._render_pool(3)
+    try:
+        assert small is not large
+        assert charts._render_pool(2) is small
+        assert small._max_workers == 2 and large._max_workers == 3
+    finally:
+        for size in (2, 3):
+            charts._POOLS.pop(size).shutdown()
+
+
+def _png(path, age_seconds=0.0, size=4096):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    stamp = time.time() - age_seconds
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+
+def test_evict_spares_fresh_and_in_use_files(tmp_path):
+    cache = charts.FigureCache(str(tmp_path), max_bytes=4096)
+    stale = _png(tmp_path / "stale.png", age_seconds=7200)
+    used = _png(tmp_path / "used.png", age_seconds=3600)
+    fresh = _png(tmp_path / "other-run.png")  # just written by another process
+    cache.evict(keep=[used])
+    assert not os.path.exists(stale)
+    assert os.path.exists(used) and os.path.exists(fresh)
+
+
+def test_evicted_chart_is_rendered_again(tmp_path):
+    cache = charts.FigureCache(str(tmp_path))
+    spec = charts.ChartSpec("trend.png", "line", "Trend", ["a", "b"], [1.0, 2.0])
+    path, = charts.render_charts([spec], str(tmp_path), max_workers=0, cache=cache)
+    os.remove(path)
+    assert cache.lookup(spec) is None
+    assert charts.render_charts([spec], str(tmp_path), max_workers=0, cache=cache) == [path]
+    assert os.path.exists(path)
+
+
+def test_charts_rendered_earlier_in_this_process_can_be_evicted(tmp_path):
+    cache = charts.FigureCache(str(tmp_path), max_bytes=1)
+    old = charts.ChartSpec("old.png", "line", "Old", ["a", "b"], [1.0, 2.0])
+    new = charts.ChartSpec("new.png", "line", "New", ["a", "b"], [3.0, 4.0])
+    old_path, = charts.render_charts([old], str(tmp_path), max_workers=0, cache=cache)
+    os.utime(old_path, (time.time() - 3600, time.time() - 3600))
+
+    new_path, = charts.render_charts([new], str(tmp_path), max_workers=0, cache=cache)
+    assert not os.path.exists(old_path) and os.path.exists(new_path)
@@ -0,0 +1,125 @@
+"""
+Tests for the shared DataStore layer
+Run from the PROJECT ROOT:
+    python -m pytest test_data_store.py
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from agents.data_store import (
+    DataStore, clear_cache, load_table, row_index, select_rows, table_columns,
+)
+
+
+CSV = (
+    "restaurant_id,city,date,item_name,category,units_sold,revenue\n"
+    "r1,Boston,2025-08-01,Burger,Main,3,26.97\n"
+    "r2,Brighton,2025-08-02,Fries,Side,2,6.98\n"
+)
+
+
+def test_typed_table_is_parsed_once(tmp_path):
+    path = tmp_path / "menu.csv"
+    path.write_text(CSV)
+    clear_cache()
+
+    first = load_table(str(path))
+    assert load_table(str(path)) is first
+    assert isinstance(first["city"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(first["date"])
+    assert first["units_sold"].dtype.itemsize == 1
+    assert first["revenue"].dtype == "float64"
+
+
+def test_table_reloads_only_when_content_changes(tmp_path):
+    path = tmp_path / "menu.csv"
+    path.write_text(CSV)
+    clear_cache()
+    first = load_table(str(path))
+
+    # Touch without changing content – same table
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+    assert load_table(str(path)) is first
+
+    path.write_text(CSV + "r3,Boston,2025-08-03,Coke,Drink,1,2.49\n")
+    reloaded = load_table(str(path))
+    assert reloaded is not first
+    assert len(reloaded) == 3
+
+
+def test_store_shares_tables_between_agents():
+    store = DataStore("data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv")
+    assert store.menu is DataStore(store.yelp_path, store.menu_path).menu
+    assert len(store.version) == 40
+
+
+def test_columnar_copy_serves_projected_columns(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "menu.csv"
+    path.write_text(CSV)
+    clear_cache()
+    load_table(str(path))
+    assert len(list(tmp_path.glob("menu.*.parquet"))) == 1
+
+    # Fresh process state: only the requested columns come back from Parquet
+    clear_cache()
+    part = load_table(str(path), columns=["category", "revenue", "not_a_column"])
+    assert list(part.columns) == ["category", "revenue"]
+    assert isinstance(part["category"].dtype, pd.CategoricalDtype)
+
+    full = load_table(str(path))
+    assert list(full.columns) == table_columns(str(path))
+    assert pd.api.types.is_datetime64_any_dtype(full["date"])
+
+
+def test_new_columnar_copy_removes_only_generated_copies(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "menu.csv"
+    path.write_text(CSV)
+    backup = tmp_path / "menu.backup.parquet"
+    backup.write_bytes(b"not ours")
+    clear_cache()
+    load_table(str(path))
+    old = list(tmp_path.glob("menu.*.parquet"))
+
+    path.write_text(CSV + "r3,Boston,2025-08-03,Coke,Drink,1,2.49\n")
+    load_table(str(path))
+    copies = set(tmp_path.glob("menu.*.parquet"))
+    assert backup in copies and len(copies) == 2
+    assert not any(p in copies for p in old if p != backup)
+
+
+def test_select_rows_uses_row_index():
+    store = DataStore("data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv")
+    menu = store.menu
+    ids = list(menu["restaurant_id"].cat.categories[:2])
+
+    picked = select_rows(menu, {"restaurant_id": ids, "category": "Main"})
+    expected = menu[menu["restaurant_id"].isin(ids) & (menu["category"] == "Main")]
+    assert picked.index.equals(expected.index)
+    assert row_index(menu, "restaurant_id") is row_index(menu, "restaurant_id")
+    assert select_rows(menu, {"city": "Nowhere"}).empty
+
+
+def test_researcher_filter_on_one_table_narrows_both_by_restaurant():
+    from agents.researcher import Researcher
+
+    store = DataStore("data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv")
+    rid = store.yelp["restaurant_id"].iloc[0]
+    rating = store.yelp.loc[store.yelp["restaurant_id"] == rid, "yelp_rating"].iloc[0]
+    researcher = Researcher(
+        store.yelp, store.menu, restaurant_filter={"yelp_rating": rating}, cache_figures=False,
+    )
+    expected = set(store.yelp.loc[store.yelp["yelp_rating"] == rating, "restaurant_id"])
+    assert set(researcher.menu["restaurant_id"]) == expected & set(store.menu["restaurant_id"])
+    assert len(researcher.menu) < len(store.menu)
+    assert (researcher.yelp["yelp_rating"] == rating).all()
+    facts, _ = researcher.analyze()
+    assert "error" not in facts
+
+    with pytest.raises(ValueError):
+        Researcher(store.yelp, store.menu, restaurant_filter={"no_such_column": 1}, cache_figures=False)
@@ -0,0 +1,55 @@
+"""
+Tests for span instrumentation
+Run from the PROJECT ROOT:
+    python -m pytest test_instrumentation.py
+"""
+
+import json
+
+from agents.instrumentation import Tracer
+
+
+def test_spans_record_nesting_and_export(tmp_path):
+    off = Tracer()
+    with off.span("ignored") as s:
+        s.set(rows=1)
+    assert off.records() == []
+
+    tracer = Tracer(enabled=True, memory=True)
+    with tracer.span("outer"):
+        with tracer.span("inner", chart="a.png") as s:
+            data = list(range(100_000))
+            s.set(rows=len(data))
+    tracer.disable()
+
+    inner, outer = tracer.records()
+    assert (inner["name"], inner["parent"], inner["rows"], inner["chart"]) == ("inner", "outer", 100_000, "a.png")
+    assert outer["parent"] is None and outer["wall_s"] >= inner["wall_s"]
+    assert inner["alloc_mb"] > 0 and "cpu_s" in inner
+
+    path = tracer.export_jsonl(str(tmp_path / "trace.jsonl"))
+    with open(path) as f:
+        assert [json.loads(line)["name"] for line in f] == ["inner", "outer"]
+
+
+def test_collect_keeps_each_runs_spans_apart():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from agents.orchestrator import Orchestrator, Stage
+
+    tracer = Tracer()
+
+    def run(tag):
+        def stage(x):
+            with tracer.span(f"{tag}.stage"):
+                return x
+        pipeline = Orchestrator([Stage("a", stage, ("x",), ("a",)), Stage("b", stage, ("x",), ("b",))])
+        with tracer.collect() as records:
+            pipeline.run({"x": tag})
+        return records
+
+    with ThreadPoolExecutor(2) as pool:
+        first, second = pool.map(run, ["one", "two"])
+    assert [r["name"] for r in first] == ["one.stage"] * 2
+    assert [r["name"] for r in second] == ["two.stage"] * 2
+    assert tracer.records() == [] and not tracer.active()
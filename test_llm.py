@@ -0,0 +1,133 @@
+"""
+Tests for the LLM client against a local stub of the Ollama HTTP API
+Run from the PROJECT ROOT:
+    python -m pytest test_llm.py
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agents.llm import FakeLLM, OllamaLLM, get_llm
+from agents.llm_cache import CachedLLM
+from agents.reviewer import REVIEW_SYSTEM_PROMPT, SECTION_SYSTEM_PROMPT, Reviewer, split_sections
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+    requests_seen = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests_seen.append(body)
+        type(self).connections.add(self.client_address)
+        tokens = ["Hello", ", ", "world"]
+        if body["stream"]:
+            lines = [json.dumps({"response": t, "done": False}) for t in tokens]
+            lines.append(json.dumps({"response": "", "done": True}))
+            payload = ("\n".join(lines) + "\n").encode()
+            content_type = "application/x-ndjson"
+        else:
+            payload = json.dumps({"response": "".join(tokens), "done": True}).encode()
+            content_type = "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _StubOllama.connections = set()
+    _StubOllama.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_chat_reuses_pooled_connection(stub_server):
+    llm = OllamaLLM(model="stub", host=stub_server, keep_alive="30m")
+    assert llm.chat("sys", "hi") == "Hello, world"
+    assert llm.chat("sys", "again") == "Hello, world"
+    assert len(_StubOllama.connections) == 1
+    assert _StubOllama.requests_seen[0]["keep_alive"] == "30m"
+    llm.close()
+
+
+def test_stream_chat_yields_tokens(stub_server):
+    llm = OllamaLLM(model="stub", host=stub_server)
+    assert list(llm.stream_chat("sys", "hi")) == ["Hello", ", ", "world"]
+    assert _StubOllama.requests_seen[0]["stream"] is True
+
+
+def test_async_variants(stub_server):
+    llm = OllamaLLM(model="stub", host=stub_server)
+
+    async def run():
+        replies = await asyncio.gather(*(llm.achat("sys", f"q{i}") for i in range(4)))
+        tokens = [t async for t in llm.astream_chat("sys", "hi")]
+        return replies, tokens
+
+    replies, tokens = asyncio.run(run())
+    assert replies == ["Hello, world"] * 4
+    assert tokens == ["Hello", ", ", "world"]
+
+
+def test_reviewer_uses_shared_client_and_falls_back():
+    fake = FakeLLM(responder=lambda system, user: user.upper())
+    result = Reviewer(llm=fake).review("# Report\nfine")
+    assert result.revised == "# REPORT\nFINE" and result.error is None
+    assert fake.calls[0][0] == REVIEW_SYSTEM_PROMPT
+
+    assert get_llm("fake", "m") is get_llm("fake", "m")
+    failing = FakeLLM(responder=lambda system, user: "")
+    fallback = Reviewer(llm=failing).review("# Report")
+    assert fallback.revised.endswith("# Report")
+    assert "error" in fallback.feedback and fallback.error
+
+
+def test_reviewer_reviews_sections_and_keeps_failed_ones():
+    report = "# Report\n---\n## A\nalpha\n### detail\nx\n\n## B\nbeta\n## C\ngamma\n"
+    assert "".join(split_sections(report)) == report
+
+    def responder(system, user):
+        if system != SECTION_SYSTEM_PROMPT:
+            return "Consistent."
+        if "beta" in user:
+            raise RuntimeError("boom")
+        return user.upper()
+
+    fake = FakeLLM(responder=responder)
+    result = Reviewer(llm=fake, mode="sections").review(report)
+    assert result.revised.startswith("# Report\n---\n## A\nALPHA\n### DETAIL")
+    assert "## B\nbeta\n" in result.revised and "## C\nGAMMA" in result.revised
+    assert "2/3 sections" in result.feedback and "Consistent." in result.feedback
+    assert len(fake.calls) == 4  # three sections + one consistency pass
+
+
+def test_cached_llm_hits_evicts_and_expires(tmp_path):
+    fake = FakeLLM(responder=lambda system, user: f"reviewed: {user}")
+    cache = CachedLLM(fake, str(tmp_path / "cache.sqlite3"), max_entries=2)
+
+    assert cache.chat("sys", "draft A") == "reviewed: draft A"
+    assert cache.chat("sys", "draft A  \r\n") == "reviewed: draft A"  # whitespace-only change
+    assert len(fake.calls) == 1
+    cache.chat("sys", "draft B")
+    cache.chat("sys", "draft C")
+    assert cache.stats == {"hits": 1, "misses": 3, "evictions": 1, "entries": 2}
+
+    # Another template version never sees these entries; zero TTL expires everything
+    other = CachedLLM(fake, cache.path, template_version="2", ttl_seconds=0)
+    other.chat("sys", "draft C")
+    assert other.stats["hits"] == 0
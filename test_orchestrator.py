@@ -0,0 +1,52 @@
+"""
+Tests for the stage-graph orchestrator
+Run from the PROJECT ROOT:
+    python -m pytest test_orchestrator.py
+"""
+
+import time
+
+import pytest
+
+from agents.orchestrator import Orchestrator, Stage
+
+
+def _sleepy(seconds, value):
+    def stage(*inputs):
+        time.sleep(seconds)
+        return value
+    return stage
+
+
+def test_independent_stages_overlap_and_memoize():
+    pipeline = Orchestrator([
+        Stage("a", _sleepy(0.3, "A"), ("x",), ("a",)),
+        Stage("b", _sleepy(0.3, "B"), ("x",), ("b",)),
+        Stage("c", lambda a, b: a + b, ("a", "b"), ("c",)),
+    ])
+    events = []
+    start = time.perf_counter()
+    result = pipeline.run({"x": 1}, on_event=lambda *e: events.append(e[:2]))
+    assert result["c"] == "AB"
+    assert time.perf_counter() - start < 0.55  # critical path, not the sum
+    assert ("c", "done") in events
+
+    events.clear()
+    pipeline.run({"x": 1}, on_event=lambda *e: events.append(e[:2]))
+    assert events == [("a", "cached"), ("b", "cached"), ("c", "cached")]
+    assert pipeline.run({"x": 2}, targets=["a"]).keys() == {"x", "a"}
+
+
+def test_graph_errors():
+    with pytest.raises(ValueError, match="Cycle"):
+        Orchestrator([Stage("a", len, ("b",), ("a",)), Stage("b", len, ("a",), ("b",))])
+    with pytest.raises(ValueError, match="No initial value"):
+        Orchestrator([Stage("a", len, ("missing",), ("a",))]).run({})
+
+    def boom(x):
+        raise RuntimeError("boom")
+
+    events = []
+    with pytest.raises(RuntimeError):
+        Orchestrator([Stage("a", boom, ("x",), ("a",))]).run({"x": 1}, on_event=lambda *e: events.append(e[:2]))
+    assert events[-1] == ("a", "failed")
@@ -0,0 +1,69 @@
+"""
+Tests for the sharded multi-process aggregation
+Run from the PROJECT ROOT:
+    python -m pytest test_parallel.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents.aggregation import MONTH, AggregationPlan
+from agents.data_store import DataStore
+from agents.parallel import PARALLEL_MIN_ROWS, execute_parallel
+from agents.researcher import Researcher
+from benchmarks.generate import MENU_FILE, YELP_FILE, generate
+
+
+def _assert_same(actual, expected):
+    assert (actual.rows, actual.has_value, actual.value_count) == (expected.rows, expected.has_value, expected.value_count)
+    assert actual.value_sum == pytest.approx(expected.value_sum)
+    assert (actual.date_min, actual.date_max) == (expected.date_min, expected.date_max)
+    assert set(actual.groups) == set(expected.groups)
+    for name, stats in expected.groups.items():
+        got = actual.groups[name]
+        assert list(got.keys) == list(stats.keys)
+        np.testing.assert_allclose(got.sums, stats.sums)
+        assert (got.counts == stats.counts).all() and (got.sizes == stats.sizes).all()
+        for ours, theirs in ((got.date_min, stats.date_min), (got.date_max, stats.date_max)):
+            assert (ours is None and theirs is None) or np.array_equal(ours, theirs, equal_nan=True)
+
+
+def _plan() -> AggregationPlan:
+    plan = AggregationPlan(value="revenue", date="date")
+    for dim in ("category", "item_name", "promotion", MONTH):
+        plan.group_by(dim)
+    return plan
+
+
+def test_parallel_matches_serial_on_sample_data():
+    menu = DataStore("data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv").menu
+    _assert_same(execute_parallel(_plan(), menu, workers=3, min_rows=0), _plan().execute(menu))
+
+
+def test_parallel_handles_missing_values_and_no_shard_column():
+    frame = pd.DataFrame({
+        "category": ["Main", None, "Side", "Main", "Drink", "Side"],
+        "item_name": pd.Categorical(["a", "b", None, "a", "c", "b"]),
+        "revenue": [10.0, np.nan, 3.5, 1.0, 2.0, np.nan],
+        "date": pd.to_datetime(["2025-01-03", "2025-02-01", None, "2025-03-31", "2025-01-15", "2025-03-01"]),
+    })
+    _assert_same(execute_parallel(_plan(), frame, workers=2, min_rows=0), _plan().execute(frame))
+
+    undated = frame.drop(columns=["date"])
+    _assert_same(execute_parallel(_plan(), undated, workers=2, min_rows=0), _plan().execute(undated))
+
+
+def test_researcher_parallel_facts_match(tmp_path):
+    generate(str(tmp_path), rows=PARALLEL_MIN_ROWS + 20_000, items=40, days=30)
+    yelp, menu = str(tmp_path / YELP_FILE), str(tmp_path / MENU_FILE)
+    facts = {}
+    for workers in (0, 2):
+        researcher = Researcher(yelp, menu, parallel=workers, cache_figures=False)
+        facts[workers], _ = researcher.analyze()
+    assert facts[2].keys() == facts[0].keys()
+    for key, value in facts[0].items():
+        if isinstance(value, (float, dict)):
+            assert facts[2][key] == pytest.approx(value)
+        else:
+            assert facts[2][key] == value
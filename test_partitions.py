@@ -0,0 +1,60 @@
+"""
+Tests for the month / restaurant-bucket partitioned store
+Run from the PROJECT ROOT:
+    python -m pytest test_partitions.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from agents.data_store import DataStore
+from agents.partitions import existing_partitions, open_partitions
+
+YELP = "data/Hybrid_Yelp_Restaurant_Sales.csv"
+MENU = "data/Menu_Sales_Data.csv"
+
+
+def test_scan_prunes_partitions_and_matches_filtered_table(tmp_path):
+    store = open_partitions(YELP, MENU, root=str(tmp_path))
+    menu = DataStore(YELP, MENU).menu
+
+    first, last = store.date_range("menu")
+    assert (first, last) == (menu["date"].min(), menu["date"].max())
+    assert store.rows("menu") == len(menu)
+
+    start = last - pd.Timedelta(days=29)
+    city = str(menu["city"].iloc[0])
+    expected = menu[(menu["date"] >= start) & (menu["city"] == city)]
+    got = store.scan("menu", start=start, cities=city)
+    assert len(got) == len(expected)
+    assert np.isclose(got["revenue"].sum(), expected["revenue"].sum())
+    assert len(store.partitions("menu", start=start, cities=city)) < len(store.metadata["tables"]["menu"]["partitions"])
+
+    rid = menu["restaurant_id"].iloc[0]
+    one = store.scan("menu", restaurants=[rid], columns=["date", "revenue"])
+    assert list(one.columns) == ["date", "revenue"]
+    assert len(one) == int((menu["restaurant_id"] == rid).sum())
+    assert store.scan("menu", start="2100-01-01").empty
+
+
+def test_partitions_rebuild_only_when_source_changes(tmp_path):
+    store = open_partitions(YELP, MENU, root=str(tmp_path))
+    built = store.metadata["tables"]["menu"]["partitions"][0]["file"]
+    stamp = (tmp_path / built).stat().st_mtime_ns
+
+    reopened = open_partitions(YELP, MENU, root=str(tmp_path))
+    assert (tmp_path / built).stat().st_mtime_ns == stamp
+    assert reopened.date_range("yelp") == store.date_range("yelp")
+
+
+def test_existing_partitions_never_builds(tmp_path):
+    root = str(tmp_path / "parts")
+    assert existing_partitions(YELP, MENU, root=root) is None
+    assert not (tmp_path / "parts").exists()
+
+    built = open_partitions(YELP, MENU, root=root)
+    found = existing_partitions(YELP, MENU, root=root)
+    assert found is not None and found.date_range("menu") == built.date_range("menu")
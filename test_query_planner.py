@@ -0,0 +1,56 @@
+"""
+Tests for the query planner and planned retrieval
+Run from the PROJECT ROOT:
+    python -m pytest test_query_planner.py
+"""
+
+import pandas as pd
+
+from agents.data_store import DataStore
+from agents.query_planner import QueryPlanner
+from agents.retriever import Retriever
+
+
+def _tables():
+    store = DataStore("data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv")
+    return store.yelp, store.menu
+
+
+def test_plan_extracts_names_dates_metric_and_top_n():
+    yelp, menu = _tables()
+    planner = QueryPlanner(yelp, menu, anchor="2025-09-29")
+
+    plan = planner.plan("Top 5 categories by units sold in Boston last 30 days")
+    assert plan.cities == ["Boston"]
+    assert (plan.start, plan.end) == (pd.Timestamp("2025-08-31"), pd.Timestamp("2025-09-29"))
+    assert (plan.metric, plan.top_n, plan.group_by) == ("units_sold", 5, "category")
+    assert not plan.needs_yelp
+
+    plan = planner.plan("Which restaurants have the best ratings in August?")
+    assert (plan.metric, plan.group_by, plan.top_n) == ("yelp_rating", "restaurant_name", 10)
+    assert (plan.start, plan.end) == (pd.Timestamp("2025-08-01"), pd.Timestamp("2025-08-31"))
+    assert plan.needs_yelp
+
+    name = str(menu["restaurant_name"].iloc[0])
+    plan = planner.plan(f"Show top dishes at {name.lower()} since 2025-09-10")
+    assert plan.restaurants == [name] and plan.restaurant_ids
+    assert plan.start == pd.Timestamp("2025-09-10") and plan.end is None
+    assert "IN (" in plan.to_sql() and plan.to_sql().endswith("LIMIT 10;")
+
+
+def test_retriever_pushes_plan_into_loading():
+    yelp, menu = _tables()
+    retriever = Retriever(yelp, menu)
+    rows = retriever.query("Top 3 dishes by revenue in Boston between 2025-08-10 and 2025-08-20")
+
+    expected = menu[
+        (menu["city"] == "Boston") & menu["date"].between("2025-08-10", "2025-08-20")
+    ]
+    assert len(rows) == len(expected)
+    assert "yelp_rating" not in rows.columns and "unit_price" in rows.columns
+    top = expected.groupby("item_name", observed=True)["revenue"].sum().nlargest(3)
+    assert list(retriever.ranking.index) == list(top.index)
+
+    # Open-ended queries keep the full joined view
+    assert len(retriever.query("Generate a business report")) == len(menu)
+    assert retriever.ranking is None
@@ -0,0 +1,85 @@
+"""
+Tests for the precomputed rollup cube
+Run from the PROJECT ROOT:
+    python -m pytest test_rollup.py
+"""
+
+import numpy as np
+
+from agents.aggregation import MONTH, AggregationPlan
+from agents.data_store import DataStore
+from agents.researcher import Researcher
+from agents.rollup import rollup_cube
+
+
+def _store():
+    return DataStore("data/Hybrid_Yelp_Restaurant_Sales.csv", "data/Menu_Sales_Data.csv")
+
+
+def test_cube_matches_raw_aggregation():
+    store = _store()
+    cube = rollup_cube(store)
+    assert rollup_cube(store) is cube
+
+    plan = AggregationPlan(value="revenue", date="date")
+    for dim in ("category", "item_name", "city", MONTH):
+        plan.group_by(dim)
+    rid = str(store.menu["restaurant_id"].iloc[0])
+    for where in (None, {"restaurant_id": [rid]}, {"city": "Boston", "category": ["Main", "Side"]}):
+        raw = plan.execute(store.menu if where is None else store.menu[
+            np.logical_and.reduce([store.menu[c].isin(v if isinstance(v, list) else [v]) for c, v in where.items()])
+        ])
+        rolled = cube.menu.execute(plan, where)
+        assert (rolled.rows, rolled.value_count, rolled.date_min, rolled.date_max) == (
+            raw.rows, raw.value_count, raw.date_min, raw.date_max
+        )
+        assert np.isclose(rolled.value_sum, raw.value_sum)
+        for name, stats in raw.groups.items():
+            assert list(rolled.groups[name].keys) == list(stats.keys)
+            assert np.allclose(rolled.groups[name].sums, stats.sums)
+            assert list(rolled.groups[name].sizes) == list(stats.sizes)
+
+
+def test_researcher_answers_from_cube():
+    store = _store()
+    rid = str(store.menu["restaurant_id"].iloc[0])
+    exact, _ = Researcher(store.yelp, store.menu, restaurant_filter=rid, cache_figures=False).analyze()
+    cubed, specs = Researcher(
+        store.yelp, store.menu, restaurant_filter=rid, cache_figures=False, cube=rollup_cube(store),
+    ).analyze()
+
+    assert cubed.keys() == exact.keys()
+    assert np.isclose(cubed["total_revenue"], exact["total_revenue"])
+    assert cubed["weather_impact"].keys() == exact["weather_impact"].keys()
+    assert cubed["top_category"] == exact["top_category"] and len(specs) == 3
+
+
+def test_cube_answers_approximate_runs_with_exact_rankings():
+    store = _store()
+    exact, _ = Researcher(store.yelp, store.menu, cache_figures=False).analyze()
+    researcher = Researcher(store.yelp, store.menu, cache_figures=False, cube=rollup_cube(store), approximate=True)
+    facts, specs = researcher.analyze()
+
+    assert researcher.engine == "rollup" and researcher.sketches is None
+    for key in ("top_category", "top_category_revenue", "top_cuisines", "unique_items"):
+        assert key in facts
+    assert facts["top_category"] == exact["top_category"] and facts["unique_items"] == exact["unique_items"]
+    assert len(specs) == 3
+
+
+def test_cubes_are_kept_per_dataset(tmp_path):
+    import shutil
+
+    sample = _store()
+    for name in ("Hybrid_Yelp_Restaurant_Sales.csv", "Menu_Sales_Data.csv"):
+        shutil.copy(f"data/{name}", tmp_path / name)
+    upload = DataStore(str(tmp_path / "Hybrid_Yelp_Restaurant_Sales.csv"), str(tmp_path / "Menu_Sales_Data.csv"))
+
+    first, other = rollup_cube(sample), rollup_cube(upload)
+    assert other is not first
+    assert rollup_cube(sample) is first and rollup_cube(upload) is other
+
+    with open(upload.menu_path, "a", encoding="utf-8") as f:
+        f.write(open(upload.menu_path, encoding="utf-8").read().splitlines(keepends=True)[1])
+    assert rollup_cube(upload) is not other
+    assert rollup_cube(sample) is first
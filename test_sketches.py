@@ -0,0 +1,84 @@
+"""
+Tests for the approximate ranking sketches
+Run from the PROJECT ROOT:
+    python -m pytest test_sketches.py
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from agents.researcher import Researcher
+from agents.sketches import HyperLogLog, SpaceSaving
+
+YELP = "data/Hybrid_Yelp_Restaurant_Sales.csv"
+MENU = "data/Menu_Sales_Data.csv"
+
+
+def test_hyperloglog_estimate_and_merge():
+    values = pd.Series([f"item-{i}" for i in range(50_000)])
+    left = HyperLogLog().add(values[:30_000])
+    right = HyperLogLog().add(values[20_000:])
+
+    merged = left.merge(right)
+    assert abs(merged.estimate() - 50_000) / 50_000 < 4 * merged.relative_error
+    assert np.array_equal(merged.registers, HyperLogLog().add(values).registers)
+    assert round(HyperLogLog().add(pd.Series(["a", "b", "a", None])).estimate()) == 2
+
+
+def test_space_saving_bounds_hold_across_merged_chunks():
+    rng = np.random.default_rng(0)
+    keys = pd.Series(rng.zipf(1.3, 200_000) % 5_000)
+    weights = rng.uniform(1, 10, len(keys))
+    exact = pd.Series(weights).groupby(keys.to_numpy()).sum()
+
+    parts = [SpaceSaving(32).add(keys[i:i + 50_000], weights[i:i + 50_000]) for i in range(0, len(keys), 50_000)]
+    summary = parts[0]
+    for part in parts[1:]:
+        summary = summary.merge(pickle.loads(pickle.dumps(part)))
+
+    top = summary.top(10)
+    assert list(top.index) == list(exact.sort_values(ascending=False).index[:10])
+    for key, estimate in top.items():
+        assert exact[key] - 1e-6 <= estimate <= exact[key] + summary.errors[key] + 1e-6
+    untracked = exact.drop(list(summary.counts), errors="ignore")
+    assert untracked.max() <= summary.error_bound + 1e-6
+
+
+def test_approximate_researcher_matches_exact_facts():
+    exact, _ = Researcher(YELP, MENU, cache_figures=False).analyze()
+    approx, specs = Researcher(YELP, MENU, cache_figures=False, approximate=True).analyze()
+
+    assert abs(approx["unique_items"] - exact["unique_items"]) <= 1
+    assert approx["top_category"] == exact["top_category"]
+    assert list(approx["top_cuisines"]) == list(exact["top_cuisines"])
+    assert approx["approximation"]["top_items_error_bound"] == 0.0
+    assert {s.filename for s in specs} >= {"top_categories_revenue.png", "top_items_revenue.png"}
+
+
+def test_approximate_researcher_bounds_hold_with_more_keys_than_capacity():
+    rng = np.random.default_rng(1)
+    rows = 20_000
+    items = pd.Series(rng.zipf(1.5, rows) % 500).map("item-{}".format)
+    menu = pd.DataFrame({
+        "restaurant_id": "r1",
+        "date": pd.Timestamp("2025-08-01"),
+        "item_name": items,
+        "category": items.str[-1],
+        "promotion": "none",
+        "revenue": rng.uniform(1, 10, rows),
+    })
+    yelp = pd.DataFrame({"restaurant_id": ["r1"], "date": [pd.Timestamp("2025-08-01")], "weather": ["Sunny"], "revenue": [1.0]})
+    researcher = Researcher(yelp, menu, cache_figures=False, approximate=True, sketch_capacity=16, chunk_rows=2_000)
+    facts, _ = researcher.analyze()
+
+    summary = researcher.sketches.top_items
+    exact = menu.groupby("item_name")["revenue"].sum()
+    assert exact.size > summary.capacity and len(summary.counts) == summary.capacity
+    assert summary.max_error() > 0  # merged from bounded slices, not one exact pass
+    assert 0 < facts["approximation"]["top_items_error_bound"] <= exact.sum() / summary.capacity
+    for key, estimate in summary.top().items():
+        assert exact[key] - 1e-6 <= estimate <= exact[key] + summary.errors[key] + 1e-6
+    untracked = exact.drop(list(summary.counts), errors="ignore")
+    assert untracked.max() <= summary.error_bound + 1e-6